@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+"""
+Hypermedia resources whose related getters are coroutines.
+
+Requires Python 3 and the httpx package:
+
+    pip install httpx
+"""
+
+import asyncio
+import functools
+import types
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .cache import now
+from .deadlines import Deadline
+from .resources import HypermediaResource
+from .transports import to_httpx_timeout, to_requests_response
+
+
+class AsyncHypermediaResource(HypermediaResource):
+    """
+    A HypermediaResource whose generated `get_<related>` methods are
+    coroutines, so a graph of links can be followed on one event loop:
+
+        author = await blog.get_authors()
+
+    Related resources that are themselves AsyncHypermediaResources
+    share the httpx.AsyncClient of the resource that fetched them.
+    Close it with `await resource.aclose()` on that resource, or use it
+    as an async context manager. Closing a related resource leaves the
+    shared client open.
+
+    A transport declared on the Meta is used instead of httpx, and run
+    in the event loop's default thread pool.
+    """
+    class Meta(HypermediaResource.Meta):
+        # The number of related URLs fetched at once
+        related_concurrency = 8
+        # An httpx.AsyncClient to send requests with. If not set, one
+        # is created when the first request is sent.
+        async_client = None
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncHypermediaResource, self).__init__(*args, **kwargs)
+        self.async_client = getattr(self.Meta, 'async_client', None)
+        # Whether async_client was handed down by the resource that
+        # fetched this one, which closes it
+        self._borrowed_async_client = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def get_async_client(self):
+        """
+        Return the httpx.AsyncClient of this resource, creating it
+        on first use.
+        """
+        if self.async_client is None:
+            if httpx is None:
+                raise ImportError(
+                    'AsyncHypermediaResource requires the httpx package')
+            self.async_client = httpx.AsyncClient()
+            self._borrowed_async_client = False
+        return self.async_client
+
+    async def aclose(self):
+        """
+        Close the httpx.AsyncClient, unless it was set on the Meta or
+        shared by the resource that fetched this one.
+        """
+        client = self.async_client
+        if self._borrowed_async_client:
+            self.async_client = None
+            self._borrowed_async_client = False
+        elif client is not None and client is not getattr(
+                self.Meta, 'async_client', None):
+            self.async_client = None
+            await client.aclose()
+        self.session.close()
+
+    async def asend_http_request(self, prepared_request, resource,
+                                 method_name, deadline=None, **kwargs):
+        """
+        Sends the prepared HTTP REQUEST without blocking the event loop
+        and returns the response, as `send_http_request` does.
+
+        returns:
+            response: A requests.Response
+
+        raises:
+            DeadlineExceededError
+        """
+        timeout, sent_decoded = self._start_request(
+            prepared_request, resource, deadline)
+        started = now()
+        try:
+            response = await self._asend(prepared_request, timeout)
+        except Exception as error:
+            self._request_failed(
+                prepared_request, method_name, error, now() - started,
+                timeout, deadline)
+            raise
+        self._request_finished(
+            prepared_request, resource, method_name, response,
+            now() - started, sent_decoded, deadline)
+        return response
+
+    async def _asend(self, prepared_request, timeout):
+        """
+        Send a request with httpx, or with the transport declared on the
+        Meta, which is run in a thread as transports block.
+        """
+        if getattr(self.Meta, 'transport', None) is not None:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, functools.partial(
+                self.transport.send, prepared_request, timeout=timeout))
+        client = self.get_async_client()
+        request = client.build_request(
+            prepared_request.method,
+            prepared_request.url,
+            headers=list(prepared_request.headers.items()),
+            content=prepared_request.body,
+            timeout=to_httpx_timeout(timeout)
+        )
+        try:
+            response = await client.send(request)
+        except httpx.TimeoutException as error:
+            raise requests.exceptions.Timeout(error, request=prepared_request)
+        except httpx.TransportError as error:
+            raise requests.exceptions.ConnectionError(
+                error, request=prepared_request)
+        return to_requests_response(response, prepared_request)
+
+    async def _acall_api_single_related_resource(
+            self, resource, full_resource_url, method_name, fields=None,
+            deadline=None, **kwargs):
+        """
+        Make an API call to a known URL, without blocking the event loop.
+        """
+        deadline = Deadline.coerce(deadline)
+        url = full_resource_url
+        if fields:
+            url = resource.get_fields_url(url=url, fields=fields)
+        params = {
+            'headers': self.get_http_headers(
+                resource.Meta.name, method_name, **kwargs),
+            'url': url
+        }
+        prepared_request = self.prepare_http_request(
+            'GET', params, **kwargs)
+        response = await self.asend_http_request(
+            prepared_request, resource, method_name, deadline=deadline,
+            **kwargs)
+        results = self._handle_response(
+            response, resource.Meta.valid_status_codes, resource,
+            fields=fields, method_name=method_name)
+        for result in results:
+            if isinstance(result, AsyncHypermediaResource) and (
+                    result.async_client is None) and (
+                    self.async_client is not None):
+                # Follow the links of the graph over the same connections
+                result.async_client = self.async_client
+                result._borrowed_async_client = True
+        return results
+
+    async def _acall_api_many_related_resources(
+            self, resource, url_list, method_name, fields=None,
+            deadline=None, **kwargs):
+        """
+        Make an API call to each of a list of known URLs, at most
+        `Meta.related_concurrency` at a time.
+
+        A deadline applies to all of the calls together.
+        """
+        deadline = Deadline.coerce(deadline)
+        semaphore = asyncio.Semaphore(
+            getattr(self.Meta, 'related_concurrency', 8))
+
+        async def fetch(url):
+            async with semaphore:
+                result = await self._acall_api_single_related_resource(
+                    resource, url, method_name, fields=fields,
+                    deadline=deadline, **kwargs)
+            return result if len(result) > 1 else result[0]
+
+        return list(await asyncio.gather(*[fetch(url) for url in url_list]))
+
+    async def expand(self, depth=1, relations=None, deadline=None, **kwargs):
+        """
+        Fetch the related resources of this resource, breadth first,
+        and set them as attributes in place of their URLs.
+
+        As HypermediaResource.expand, but every level of the graph is
+        fetched on the event loop, `Meta.related_concurrency` at a time.
+        """
+        kwargs['deadline'] = Deadline.coerce(deadline)
+        identity_map = {}
+        frontier = [self]
+        semaphore = asyncio.Semaphore(
+            getattr(self.Meta, 'related_concurrency', 8))
+
+        async def fetch(url, resource):
+            async with semaphore:
+                return await self._acall_api_single_related_resource(
+                    resource, url, self.get_method_name(resource, 'get'),
+                    **kwargs)
+
+        for _ in range(depth):
+            pending = {}
+            for node in frontier:
+                for resource, urls in node.get_related_links(
+                        relations).values():
+                    if not isinstance(urls, list):
+                        urls = [urls]
+                    for url in urls:
+                        if url not in identity_map:
+                            pending[url] = resource
+            fetched = await asyncio.gather(
+                *[fetch(url, resource) for url, resource in pending.items()])
+            for url, result in zip(pending, fetched):
+                identity_map[url] = result[0] if len(
+                    result) == 1 else result
+            for node in frontier:
+                links = node.get_related_links(relations)
+                for key, (resource, urls) in links.items():
+                    if isinstance(urls, list):
+                        value = [identity_map[url] for url in urls]
+                    else:
+                        value = identity_map[urls]
+                    setattr(node, key, value)
+            next_frontier = []
+            for url in pending:
+                result = identity_map[url]
+                if not isinstance(result, list):
+                    result = [result]
+                next_frontier.extend(
+                    x for x in result
+                    if isinstance(x, HypermediaResource))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return self
+
+    def set_related_method(self, resource, full_resource_url):
+        """
+        Generate the related method as a coroutine and attach it.
+        """
+        method_name = self.get_method_name(resource, 'get')
+
+        async def get(self, **kwargs):
+            return await self._acall_api_single_related_resource(
+                resource, full_resource_url, method_name, **kwargs
+            )
+
+        async def get_list(self, **kwargs):
+            return await self._acall_api_many_related_resources(
+                resource, full_resource_url, method_name, **kwargs
+            )
+
+        if isinstance(full_resource_url, list):
+            setattr(
+                self, method_name,
+                types.MethodType(get_list, self)
+            )
+        else:
+            setattr(
+                self, method_name,
+                types.MethodType(get, self)
+            )
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import threading
+
+import requests
+
+from .cache import now
+from .deadlines import remaining_timeout
+
+ROUND_ROBIN = 'round_robin'
+LEAST_OUTSTANDING = 'least_outstanding'
+EWMA = 'ewma'
+
+POLICIES = (ROUND_ROBIN, LEAST_OUTSTANDING, EWMA)
+
+# Methods that can safely be sent to another host after a failure
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# The default number of failures in a row that eject a host
+DEFAULT_MAX_FAILURES = 3
+
+# The default number of seconds an ejected host is left alone
+DEFAULT_COOLDOWN = 30.0
+
+# The default latency, in seconds, that a failed request counts as at
+# least, so hosts that fail fast do not look like the fastest
+DEFAULT_FAILURE_PENALTY = 2.0
+
+
+class Endpoint(object):
+    """
+    One base_url of the API, and what is known about its health.
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.outstanding = 0
+        self.latency = None
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def __repr__(self):
+        return '<Endpoint {}>'.format(self.url)
+
+    def cost(self):
+        """
+        The expected latency of one more request to this host.
+        Hosts without any latency samples yet are tried first.
+        """
+        return (self.latency or 0.0) * (self.outstanding + 1)
+
+
+class LoadBalancer(object):
+    """
+    Spreads requests over several base_urls of an API.
+
+    Requests are built against the first base_url, and the balancer
+    sends each one to the host chosen by its policy:
+
+    * round_robin: every host in turn
+    * least_outstanding: the host with the fewest requests in flight
+    * ewma: the host with the lowest recent latency, weighted by the
+      requests in flight
+
+    Hosts are checked passively. A host that fails `max_failures` times
+    in a row, with a connection error or a 5xx response, is ejected for
+    `cooldown` seconds. Failed idempotent requests are sent again to the
+    next host. A failed request counts as taking at least
+    `failure_penalty` seconds in the recent latency of its host.
+    """
+
+    def __init__(self, urls, policy=ROUND_ROBIN,
+                 max_failures=DEFAULT_MAX_FAILURES,
+                 cooldown=DEFAULT_COOLDOWN, decay=0.3,
+                 failure_penalty=DEFAULT_FAILURE_PENALTY):
+        if policy not in POLICIES:
+            raise ValueError(
+                'Unknown load balancing policy {!r}'.format(policy))
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.policy = policy
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.decay = decay
+        self.failure_penalty = failure_penalty
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def primary(self):
+        """
+        The base_url that requests are built against.
+        """
+        return self.endpoints[0].url
+
+    def healthy(self):
+        """
+        The hosts that are not ejected.
+        """
+        t = now()
+        return [e for e in self.endpoints if e.ejected_until <= t]
+
+    def choose(self, exclude=()):
+        """
+        Pick the host for the next request, or None if every host
+        has been excluded. If every other host is ejected, an ejected
+        host is still picked rather than failing the request.
+        """
+        candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            return None
+        t = now()
+        healthy = [e for e in candidates if e.ejected_until <= t]
+        candidates = healthy or candidates
+        # Rotating the candidates breaks ties evenly between hosts
+        start = next(self._counter) % len(candidates)
+        candidates = candidates[start:] + candidates[:start]
+        if self.policy == LEAST_OUTSTANDING:
+            return min(candidates, key=lambda e: e.outstanding)
+        if self.policy == EWMA:
+            return min(candidates, key=lambda e: e.cost())
+        return candidates[0]
+
+    def start(self, endpoint):
+        with self._lock:
+            endpoint.outstanding += 1
+
+    def finish(self, endpoint, seconds, ok):
+        """
+        Record the outcome of a request to a host.
+        """
+        if not ok:
+            seconds = max(seconds, self.failure_penalty)
+        with self._lock:
+            endpoint.outstanding -= 1
+            if endpoint.latency is None:
+                endpoint.latency = seconds
+            else:
+                endpoint.latency += self.decay * (seconds - endpoint.latency)
+            if ok:
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+                return
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                endpoint.ejected_until = now() + self.cooldown
+
+    def _path(self, url):
+        for endpoint in self.endpoints:
+            path = url[len(endpoint.url):]
+            if url.startswith(endpoint.url) and path[:1] in ('', '/', '?'):
+                return path
+        return None
+
+    def send(self, send, prepared_request, timeout=None, deadline=None):
+        """
+        Send a request to the chosen host, failing over to the
+        other hosts if it is idempotent.
+
+        Args:
+            send: A function that sends a prepared request
+            prepared_request: A request built against any of the base_urls
+            timeout: None, or a (connect, read) tuple of seconds
+            deadline: An optional Deadline. Every attempt after the
+                      first is sent with what is left of it, and there
+                      are no more attempts once it has run out.
+        returns:
+            response: A requests.Response
+        """
+        path = self._path(prepared_request.url)
+        if path is None:
+            # Not a URL of this API, such as an external hypermedia link
+            return send(prepared_request, timeout=timeout)
+        retry = prepared_request.method in IDEMPOTENT_METHODS
+        tried = []
+        while True:
+            endpoint = self.choose(exclude=tried)
+            tried.append(endpoint)
+            request = prepared_request.copy()
+            request.url = endpoint.url + path
+            if len(tried) > 1:
+                timeout = remaining_timeout(timeout, deadline)
+            self.start(endpoint)
+            started = now()
+            try:
+                response = send(request, timeout=timeout)
+            except requests.exceptions.RequestException as error:
+                self.finish(endpoint, now() - started, False)
+                # Read timeouts are left to the caller's deadline
+                if (not retry or len(tried) == len(self.endpoints) or
+                        not isinstance(
+                            error, requests.exceptions.ConnectionError) or
+                        (deadline is not None and deadline.expired())):
+                    raise
+                continue
+            failed = response.status_code >= 500
+            self.finish(endpoint, now() - started, not failed)
+            if failed and retry and len(tried) < len(self.endpoints) and (
+                    deadline is None or not deadline.expired()):
+                response.close()
+                continue
+            return response
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import OrderedDict
+
+from .identity import identity_key
+
+# Py3 has a clock that never goes backwards
+now = getattr(time, 'monotonic', time.time)
+
+# The default number of responses a ResponseCache holds
+DEFAULT_CACHE_SIZE = 1024
+
+
+def url_tag(url):
+    """
+    Tags cached responses fetched from, or linking to, a URL.
+    """
+    return ('url', url)
+
+
+def collection_tag(resource_url):
+    """
+    Tags cached responses listing a collection, including every page.
+    """
+    return ('collection', resource_url)
+
+
+def item_tag(resource, uid):
+    """
+    Tags cached responses that contain a single resource.
+    """
+    return ('item',) + identity_key(resource, uid)
+
+
+class ResponseCache(object):
+    """
+    A cache of the resources returned by GET calls, keyed by URL.
+
+    Every entry is stored with a set of tags for the things it depends
+    on: its own URL, the collection it lists, the resources it contains
+    and the URLs those resources link to. Invalidating a tag evicts
+    exactly the entries that depend on it.
+
+    A response fetched while a write invalidated one of its tags is out
+    of date before it arrives. Callers take a `generation()` before
+    fetching and pass it to `set()`, which then drops such responses.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._tags = {}
+        # Counts invalidations. The most recent maxsize tags remember
+        # the generation they were last invalidated in, and anything
+        # older is only known to be at or before _forgotten.
+        self._generation = 0
+        self._invalidated = OrderedDict()
+        self._forgotten = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+    def lookup(self, key):
+        """
+        Return the cached resources for a key and whether they are
+        stale, or None if they are missing or have expired.
+
+        Entries cached with a hard_ttl are stale once their ttl has
+        passed, and are still returned until their hard_ttl passes.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            current = now()
+            if entry[0] <= current:
+                self._evict(key)
+                return None
+            self._entries.pop(key)
+            self._entries[key] = entry
+            return list(entry[1]), entry[3] <= current
+
+    def get(self, key):
+        """
+        Return the cached resources for a key, or None if they are
+        missing or have expired.
+        """
+        found = self.lookup(key)
+        return found and found[0]
+
+    def generation(self):
+        """
+        The current generation, to pass to `set()` for a response
+        fetched from now on.
+        """
+        with self._lock:
+            return self._generation
+
+    def _invalidated_since(self, generation, tags):
+        if generation < self._forgotten:
+            return True
+        invalidated = self._invalidated
+        return any(invalidated.get(tag, 0) > generation for tag in tags)
+
+    def set(self, key, resources, ttl, tags=(), hard_ttl=None,
+            generation=None):
+        """
+        Cache a list of resources.
+
+        Args:
+            key: The cache key, usually the URL
+            resources: The list of resources to cache
+            ttl: The number of seconds to cache them for
+            tags: The tags this entry depends on
+            hard_ttl: The number of seconds to keep returning them
+                      for once they are stale, counted from now
+            generation: The generation taken before the resources were
+                        fetched. If any of the tags has been invalidated
+                        since, the resources are not cached.
+        Returns:
+            cached: Whether the resources were cached
+        """
+        tags = frozenset(tags) | frozenset([url_tag(key)])
+        current = now()
+        expires = current + max(ttl, hard_ttl or 0)
+        with self._lock:
+            if generation is not None and self._invalidated_since(
+                    generation, tags):
+                return False
+            self._evict(key)
+            self._entries[key] = (
+                expires, list(resources), tags, current + ttl)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._evict(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, *tags):
+        """
+        Evict every entry that depends on any of the given tags.
+
+        Returns:
+            evicted: The number of entries evicted
+        """
+        evicted = 0
+        with self._lock:
+            self._generation += 1
+            invalidated = self._invalidated
+            for tag in tags:
+                invalidated.pop(tag, None)
+                invalidated[tag] = self._generation
+                for key in list(self._tags.get(tag, ())):
+                    evicted += self._evict(key)
+            while len(invalidated) > self.maxsize:
+                self._forgotten = invalidated.popitem(last=False)[1]
+        return evicted
+
+    def clear(self):
+        """
+        Evict every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._generation += 1
+            self._invalidated.clear()
+            self._forgotten = self._generation
+
+
+def response_tags(resource, resource_url, uid, results):
+    """
+    The tags a cached GET response depends on.
+
+    Args:
+        resource: The resource class
+        resource_url: The URL of the resource collection
+        uid: The identifier requested, if any
+        results: The resources returned
+    """
+    tags = set()
+    if uid is None:
+        tags.add(collection_tag(resource_url))
+    else:
+        tags.add(item_tag(resource, uid))
+    identifier = getattr(resource.Meta, 'identifier', None)
+    for instance in results:
+        value = getattr(instance, identifier, None) if identifier else None
+        if value is not None:
+            tags.add(item_tag(type(instance), value))
+        get_related_links = getattr(instance, 'get_related_links', None)
+        if get_related_links is not None:
+            for _, urls in get_related_links().values():
+                if not isinstance(urls, list):
+                    urls = [urls]
+                tags.update(url_tag(url) for url in urls)
+    return tags
+
+
+def write_tags(resource, resource_url, uid, url):
+    """
+    The tags a write to a resource makes stale.
+
+    Args:
+        resource: The resource class
+        resource_url: The URL of the resource collection
+        uid: The identifier written to, if any
+        url: The URL written to
+    """
+    tags = set([collection_tag(resource_url), url_tag(url)])
+    if uid is not None:
+        tags.add(item_tag(resource, uid))
+    return tags
@@ -1,15 +1,66 @@
 # -*- coding: utf-8 -*-
 
+import threading
 import types
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
+from .balancing import DEFAULT_COOLDOWN, DEFAULT_MAX_FAILURES, LoadBalancer
+from .cache import (
+    DEFAULT_CACHE_SIZE,
+    ResponseCache,
+    now,
+    response_tags,
+    write_tags
+)
+from .compression import (
+    DEFAULT_COMPRESSION_THRESHOLD,
+    TransferStats,
+    body_length,
+    compress_request,
+    wire_length
+)
 from .constants import (
     DEFAULT_VALID_STATUS_CODES,
+    HTTP_DELETE,
+    HTTP_GET,
+    OVERLOADED_STATUS_CODES,
     SINGLE_RESOURCE_METHODS,
-    VALID_METHODS
+    VALID_METHODS,
+    WRITE_METHODS
+)
+from .converters import build_resources
+from .deadlines import Deadline, request_timeout
+from .exceptions import (
+    ClientClosedError,
+    DeadlineExceededError,
+    InvalidStatusCodeError,
+    MissingUidException
 )
-from .exceptions import InvalidStatusCodeError, MissingUidException
+from .hedging import DEFAULT_HEDGE_BUDGET, Hedger
+from .identity import IdentityMap
+from .limits import (
+    DEFAULT_INITIAL_LIMIT,
+    DEFAULT_MAX_LIMIT,
+    DEFAULT_MIN_LIMIT,
+    make_limiter
+)
+from .parallel import DEFAULT_PARALLEL_THRESHOLD, ParallelMaterializer
+from .profiling import CallProfiler
+from .scheduling import make_scheduler
+from .transports import make_transport
+
+
+def _wait_timeout(deadline):
+    # The most seconds a request may wait to be sent
+    return deadline.remaining() if deadline is not None else None
+
+
+def _deadline_ran_out(prepared_request, timeout, deadline):
+    return DeadlineExceededError(
+        prepared_request.url, timeout, deadline.elapsed(),
+        deadline=deadline.budget, timings=deadline.timings)
 
 
 class HTTPClient(object):
@@ -18,6 +69,32 @@ class HTTPClient(object):
     various objects that require HTTP functionality
     """
 
+    # The transport that sends requests, see beckett.transports.
+    transport = None
+    # Byte counters for the traffic of this client, if enabled.
+    transfer_stats = None
+    # Builds huge list responses in worker processes, if enabled.
+    materializer = None
+    # Shares one instance per resource identifier, if enabled.
+    identity_map = None
+    # Caches GET responses for resources with a Meta.cache_ttl.
+    response_cache = None
+    # Hedges slow GET requests for resources with a Meta.hedge_after.
+    hedger = None
+    # Spreads requests over several base_urls, if more than one is set.
+    balancer = None
+    # Records traffic metrics, if a MetricsRegistry is set on the Meta.
+    metrics = None
+    # Profiles a sample of calls, if a CallProfiler is set.
+    profiler = None
+    # Tunes the requests in flight at once, if a limit is set.
+    limiter = None
+    # Shares the requests in flight between priorities, if set.
+    scheduler = None
+    # The headers of the tenant this client serves, which are passed on
+    # to the HypermediaResources it builds, see beckett.tenancy.
+    tenant_headers = None
+
     def prepare_http_request(self, method_type, params, **kwargs):
         """
         Prepares the HTTP REQUEST and returns it.
@@ -52,11 +129,203 @@ class HTTPClient(object):
             'X-METHOD': method_name,
             'content-type': 'application/json'
         }
+        accept_encoding = getattr(self.Meta, 'accept_encoding', None)
+        if accept_encoding:
+            headers['Accept-Encoding'] = ', '.join(accept_encoding)
         return headers
 
+    def send_http_request(self, prepared_request, resource, method_name,
+                          deadline=None, priority=None, hedge=True,
+                          **kwargs):
+        """
+        Sends the prepared HTTP REQUEST and returns the response.
+
+        Request bodies are compressed here if the resource asks for it,
+        and the resource's timeouts and any deadline are applied.
+
+        Args:
+            prepared_request: The prepared HTTP request
+            resource: The resource class this request is for
+            method_name: The method name triggering this HTTP request.
+            deadline: An optional Deadline this request must finish within.
+            priority: The priority class to schedule this request in,
+                      instead of the resource's Meta.priority.
+            hedge: Whether the request may be hedged, if the resource
+                   asks for it.
+            kwargs: Any extra keyword arguements passed into a client method.
+
+        returns:
+            response: An HTTP response object
+
+        raises:
+            DeadlineExceededError
+        """
+        timeout, sent_decoded = self._start_request(
+            prepared_request, resource, deadline)
+        hedge_after = None
+        if hedge and self.hedger is not None and (
+                prepared_request.method == HTTP_GET):
+            hedge_after = self.hedger.delay_for(resource)
+        if priority is None:
+            priority = getattr(resource.Meta, 'priority', None)
+        cost = getattr(resource.Meta, 'request_cost', 1)
+        started = now()
+        try:
+            if hedge_after is None:
+                response = self._send(
+                    prepared_request, timeout=timeout, priority=priority,
+                    cost=cost, deadline=deadline)
+            else:
+                response = self.hedger.send(
+                    self.get_background_executor(),
+                    lambda r: self._send(
+                        r, timeout=timeout, priority=priority, cost=cost,
+                        deadline=deadline),
+                    prepared_request, hedge_after
+                )
+        except Exception as error:
+            self._request_failed(
+                prepared_request, method_name, error, now() - started,
+                timeout, deadline)
+            raise
+        self._request_finished(
+            prepared_request, resource, method_name, response,
+            now() - started, sent_decoded, deadline)
+        return response
+
+    def _start_request(self, prepared_request, resource, deadline):
+        """
+        Compress the body of a request about to be sent and work out its
+        timeout. Shared by every way of sending a request.
+
+        returns:
+            (timeout, the length of the body before compression)
+
+        raises:
+            DeadlineExceededError: if the deadline has already run out
+        """
+        sent_decoded = body_length(prepared_request.body)
+        encoding = getattr(resource.Meta, 'request_compression', None)
+        if encoding:
+            compress_request(
+                prepared_request, encoding,
+                getattr(resource.Meta, 'request_compression_threshold',
+                        DEFAULT_COMPRESSION_THRESHOLD)
+            )
+        timeout = request_timeout(resource, deadline)
+        if deadline is not None and deadline.expired():
+            raise _deadline_ran_out(prepared_request, timeout, deadline)
+        if self.metrics is not None:
+            self.metrics.request_started(self.Meta.name)
+        return timeout, sent_decoded
+
+    def _request_failed(self, prepared_request, method_name, error, elapsed,
+                        timeout, deadline):
+        """
+        Record a request that raised `error`. Timeouts are raised again
+        as a DeadlineExceededError.
+        """
+        metrics = self.metrics
+        if isinstance(error, DeadlineExceededError):
+            # The deadline ran out while the request waited to be sent
+            if metrics is not None:
+                metrics.request_failed(
+                    self.Meta.name, method_name, 'timeout', elapsed)
+            return
+        if isinstance(error, requests.exceptions.Timeout):
+            if metrics is not None:
+                metrics.request_failed(
+                    self.Meta.name, method_name, 'timeout', elapsed)
+            timings = [(prepared_request.url, elapsed)]
+            if deadline is not None:
+                deadline.record(prepared_request.url, elapsed)
+                timings = deadline.timings
+            raise DeadlineExceededError(
+                prepared_request.url, timeout, elapsed,
+                deadline=deadline and deadline.budget, timings=timings)
+        if metrics is not None:
+            metrics.request_failed(
+                self.Meta.name, method_name,
+                'connection_error' if isinstance(
+                    error, requests.exceptions.ConnectionError
+                ) else 'error',
+                elapsed)
+
+    def _request_finished(self, prepared_request, resource, method_name,
+                          response, elapsed, sent_decoded, deadline):
+        """
+        Record the timings and transfer sizes of a request that got a
+        response.
+        """
+        metrics = self.metrics
+        if deadline is not None:
+            deadline.record(prepared_request.url, elapsed)
+        if self.hedger is not None and getattr(
+                resource.Meta, 'hedge_after', None) is not None:
+            self.hedger.record(resource, elapsed)
+        if self.transfer_stats is not None or metrics is not None:
+            sent = body_length(prepared_request.body)
+            received = wire_length(response)
+            if self.transfer_stats is not None:
+                self.transfer_stats.record(
+                    sent, sent_decoded, received,
+                    len(response.content or b''))
+            if metrics is not None:
+                metrics.request_finished(
+                    self.Meta.name, method_name, elapsed, sent, received)
+
+    def _send(self, prepared_request, timeout=None, priority=None, cost=1,
+              deadline=None):
+        """
+        Send a request with the transport, through the load balancer
+        if there is one, once the scheduler and the concurrency limit
+        allow it.
+        """
+        scheduler = self.scheduler
+        if scheduler is None:
+            return self._send_limited(prepared_request, timeout, deadline)
+        priority = scheduler.priority_of(priority)
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.request_queued(self.Meta.name, priority)
+        try:
+            granted = scheduler.acquire(
+                priority, cost, timeout=_wait_timeout(deadline))
+        finally:
+            if metrics is not None:
+                metrics.request_dequeued(self.Meta.name, priority)
+        if granted is None:
+            raise _deadline_ran_out(prepared_request, timeout, deadline)
+        try:
+            return self._send_limited(prepared_request, timeout, deadline)
+        finally:
+            scheduler.release()
+
+    def _send_limited(self, prepared_request, timeout, deadline=None):
+        limiter = self.limiter
+        if limiter is None:
+            return self._send_now(prepared_request, timeout, deadline)
+        if not limiter.acquire(_wait_timeout(deadline)):
+            raise _deadline_ran_out(prepared_request, timeout, deadline)
+        started = now()
+        failed = True
+        try:
+            response = self._send_now(prepared_request, timeout, deadline)
+            failed = response.status_code in OVERLOADED_STATUS_CODES
+            return response
+        finally:
+            limiter.release(now() - started, failed)
+
+    def _send_now(self, prepared_request, timeout, deadline=None):
+        if self.balancer is None:
+            return self.transport.send(prepared_request, timeout=timeout)
+        return self.balancer.send(
+            self.transport.send, prepared_request, timeout=timeout,
+            deadline=deadline)
+
     def call_api(self, method_type, method_name,
                  valid_status_codes, resource, data,
-                 uid, **kwargs):
+                 uid, fields=None, deadline=None, priority=None, **kwargs):
         """
         Make HTTP calls.
 
@@ -68,6 +337,12 @@ class HTTPClient(object):
             resource: The resource class that will be generated
             data: The post data being sent.
             uid: The unique identifier of the resource.
+            fields: An optional list of attribute names to request and
+                    render, instead of the full representation.
+            deadline: An optional number of seconds, or Deadline, that the
+                      whole call must finish within.
+            priority: The priority class to schedule the call in, instead
+                      of the resource's Meta.priority.
         Returns:
 
         kwargs is a list of keyword arguments. Additional custom keyword
@@ -78,14 +353,118 @@ class HTTPClient(object):
         - prepare_http_request
         - get_http_headers
         """
-        url = resource.get_resource_url(
-            resource, base_url=self.Meta.base_url
+        if self.profiler is not None and self.profiler.sample():
+            return self.profiler.profile(
+                method_name, self._call_api, method_type, method_name,
+                valid_status_codes, resource, data, uid, fields=fields,
+                deadline=deadline, priority=priority, **kwargs)
+        return self._call_api(
+            method_type, method_name, valid_status_codes, resource, data,
+            uid, fields=fields, deadline=deadline, priority=priority,
+            **kwargs)
+
+    def _call_api(self, method_type, method_name, valid_status_codes,
+                  resource, data, uid, fields=None, deadline=None,
+                  priority=None, **kwargs):
+        base_url = self.Meta.base_url
+        if self.balancer is not None:
+            base_url = self.balancer.primary
+        resource_url = resource.get_resource_url(
+            resource, base_url=base_url
         )
+        url = resource_url
         if method_type in SINGLE_RESOURCE_METHODS:
             if not uid and not kwargs:
                 raise MissingUidException
             url = resource.get_url(
                 url=url, uid=uid, **kwargs)
+        request_url = url
+        if fields:
+            request_url = resource.get_fields_url(url=url, fields=fields)
+
+        cache_ttl = getattr(resource.Meta, 'cache_ttl', None)
+        cacheable = (
+            method_type == HTTP_GET and cache_ttl and
+            self.response_cache is not None
+        )
+        if cacheable:
+            found = self.response_cache.lookup(request_url)
+            if found is not None:
+                cached, stale = found
+                if stale:
+                    self._revalidate(
+                        method_name, valid_status_codes, resource, uid,
+                        request_url, resource_url, fields=fields, **kwargs)
+                return cached
+
+        if cacheable:
+            # Writes that finish while this GET is in flight make
+            # its response stale before it is cached
+            generation = self.response_cache.generation()
+        results = None
+        try:
+            results = self._fetch_resources(
+                method_type, method_name, valid_status_codes, resource,
+                data, request_url, fields=fields,
+                deadline=Deadline.coerce(deadline), priority=priority,
+                **kwargs)
+        finally:
+            if method_type in WRITE_METHODS:
+                self.invalidate_after_write(
+                    method_type, resource, uid, results,
+                    resource_url=resource_url, url=url)
+        if cacheable:
+            self.response_cache.set(
+                request_url, results, cache_ttl,
+                response_tags(resource, resource_url, uid, results),
+                hard_ttl=getattr(resource.Meta, 'cache_hard_ttl', None),
+                generation=generation)
+        return results
+
+    def _revalidate(self, method_name, valid_status_codes, resource, uid,
+                    request_url, resource_url, fields=None, **kwargs):
+        """
+        Refresh a stale cached response on the client's background
+        thread pool, unless it is already being refreshed. Callers keep
+        getting the stale response until the refresh is cached.
+
+        Refreshes are not hedged, as nobody is waiting for them, and a
+        refresh waiting for its hedges on the same pool could starve it.
+        """
+        with self._revalidating_lock:
+            if request_url in self._revalidating:
+                return
+            self._revalidating.add(request_url)
+
+        def refresh():
+            try:
+                generation = self.response_cache.generation()
+                results = self._fetch_resources(
+                    HTTP_GET, method_name, valid_status_codes, resource,
+                    None, request_url, fields=fields, hedge=False, **kwargs)
+                self.response_cache.set(
+                    request_url, results, resource.Meta.cache_ttl,
+                    response_tags(resource, resource_url, uid, results),
+                    hard_ttl=getattr(resource.Meta, 'cache_hard_ttl', None),
+                    generation=generation)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(request_url)
+
+        try:
+            self.get_background_executor().submit(refresh)
+        except RuntimeError:
+            # The client has been closed
+            with self._revalidating_lock:
+                self._revalidating.discard(request_url)
+
+    def _fetch_resources(self, method_type, method_name, valid_status_codes,
+                         resource, data, url, fields=None, deadline=None,
+                         priority=None, hedge=True, **kwargs):
+        """
+        Make a single HTTP call to a URL and build the resources
+        from the response.
+        """
         params = {
             'headers': self.get_http_headers(
                 self.Meta.name, method_name, **kwargs),
@@ -95,10 +474,41 @@ class HTTPClient(object):
             params.update(json=data)
         prepared_request = self.prepare_http_request(
             method_type, params, **kwargs)
-        response = self.session.send(prepared_request)
-        return self._handle_response(response, valid_status_codes, resource)
+        response = self.send_http_request(
+            prepared_request, resource, method_name, deadline=deadline,
+            priority=priority, hedge=hedge, **kwargs)
+        return self._handle_response(
+            response, valid_status_codes, resource, fields=fields,
+            method_name=method_name)
+
+    def invalidate_after_write(self, method_type, resource, uid, results,
+                               resource_url=None, url=None):
+        """
+        Forget anything this client holds about a resource that
+        has just been changed.
+
+        Cached GET responses that depend on the resource, its collection
+        or its URL are evicted. Deleted resources, and resources whose
+        new state was not returned, are removed from the identity map.
+        Resources that were returned have already been updated in place.
 
-    def _handle_response(self, response, valid_status_codes, resource):
+        Args:
+            method_type: The HTTP method that changed the resource
+            resource: The resource class
+            uid: The unique identifier of the resource
+            results: The resources returned, or None if the call failed
+            resource_url: The URL of the resource collection
+            url: The URL that was written to
+        """
+        if self.response_cache is not None and resource_url is not None:
+            self.response_cache.invalidate(
+                *write_tags(resource, resource_url, uid, url or resource_url))
+        if self.identity_map is not None and uid is not None:
+            if method_type == HTTP_DELETE or not results:
+                self.identity_map.invalidate(resource, uid)
+
+    def _handle_response(self, response, valid_status_codes, resource,
+                         fields=None, method_name=None):
         """
         Handles Response objects
 
@@ -106,31 +516,83 @@ class HTTPClient(object):
             response: An HTTP reponse object
             valid_status_codes: A tuple list of valid status codes
             resource: The resource class to build from this response
+            fields: An optional list of attribute names to render
+            method_name: The method name that made the request
 
         returns:
             resources: A list of Resource instances
         """
-        if response.status_code not in valid_status_codes:
-            raise InvalidStatusCodeError(
-                status_code=response.status_code,
-                expected_status_codes=valid_status_codes
-                )
+        self._check_status(response, valid_status_codes, method_name)
         if response.content:
             data = response.json()
             if isinstance(data, list):
                 # A list of results is always rendered
-                return [resource(**x) for x in data]
+                return self._build_resources(resource, data, fields)
             else:
                 # Try and find the paginated resources
                 key = getattr(resource.Meta, 'pagination_key', None)
                 if isinstance(data.get(key), list):
                     # Only return the paginated responses
-                    return [resource(**x) for x in data.get(key)]
+                    return self._build_resources(
+                        resource, data.get(key), fields)
                 else:
                     # Attempt to render this whole response as a resource
-                    return [resource(**data)]
+                    return self._build_resources(resource, [data], fields)
         return []
 
+    def _check_status(self, response, valid_status_codes, method_name=None):
+        """
+        Raise InvalidStatusCodeError, and count the error, if the
+        response does not have one of the valid status codes.
+        """
+        if response.status_code not in valid_status_codes:
+            if self.metrics is not None:
+                self.metrics.record_error(
+                    self.Meta.name, method_name, response.status_code)
+            raise InvalidStatusCodeError(
+                status_code=response.status_code,
+                expected_status_codes=valid_status_codes
+                )
+
+    def _build_resources(self, resource, items, fields=None):
+        """
+        Render a list of decoded items into resource instances.
+
+        Args:
+            resource: The resource class to build
+            items: A list of dictionaries decoded from the response
+            fields: An optional list of attribute names to render.
+                    The resource identifier is always kept.
+
+        returns:
+            resources: A list of Resource instances
+        """
+        if fields:
+            keep = tuple(fields)
+            identifier = getattr(resource.Meta, 'identifier', None)
+            if identifier not in keep:
+                keep += (identifier,)
+            items = [
+                dict((k, x[k]) for k in keep if k in x) for x in items
+            ]
+        if self.materializer is not None and not issubclass(
+                resource, HTTPClient):
+            # HypermediaResources hold sessions and generated methods,
+            # so they can not be sent between processes.
+            results = self.materializer.build_resources(resource, items)
+        else:
+            results = build_resources(resource, items)
+        if self.tenant_headers and issubclass(resource, HTTPClient):
+            # So their related resources are fetched for the same tenant
+            for result in results:
+                result.tenant_headers = self.tenant_headers
+        if self.identity_map is not None:
+            results = self.identity_map.merge_all(results)
+        if self.metrics is not None:
+            self.metrics.record_materialized(
+                self.Meta.name, resource.Meta.name, len(results))
+        return results
+
 
 class HTTPHypermediaClient(HTTPClient):
     """
@@ -139,12 +601,23 @@ class HTTPHypermediaClient(HTTPClient):
     Inherits all HTTPClient methods too
     """
 
+    def get_http_headers(self, client_name, method_name, **kwargs):
+        headers = super(HTTPHypermediaClient, self).get_http_headers(
+            client_name, method_name, **kwargs)
+        if self.tenant_headers:
+            headers.update(self.tenant_headers)
+        return headers
+
     def _call_api_single_related_resource(self, resource, full_resource_url,
-                                          method_name, **kwargs):
+                                          method_name, fields=None,
+                                          deadline=None, **kwargs):
         """
         For HypermediaResource - make an API call to a known URL
         """
+        deadline = Deadline.coerce(deadline)
         url = full_resource_url
+        if fields:
+            url = resource.get_fields_url(url=url, fields=fields)
         params = {
             'headers': self.get_http_headers(
                 resource.Meta.name, method_name, **kwargs),
@@ -152,17 +625,26 @@ class HTTPHypermediaClient(HTTPClient):
         }
         prepared_request = self.prepare_http_request(
             'GET', params, **kwargs)
-        response = self.session.send(prepared_request)
+        response = self.send_http_request(
+            prepared_request, resource, method_name, deadline=deadline,
+            **kwargs)
         return self._handle_response(
-            response, resource.Meta.valid_status_codes, resource)
+            response, resource.Meta.valid_status_codes, resource,
+            fields=fields, method_name=method_name)
 
     def _call_api_many_related_resources(self, resource, url_list,
-                                         method_name, **kwargs):
+                                         method_name, fields=None,
+                                         deadline=None, **kwargs):
         """
         For HypermediaResource - make an API call to a list of known URLs
+
+        A deadline applies to all of the calls together.
         """
+        deadline = Deadline.coerce(deadline)
         responses = []
         for url in url_list:
+            if fields:
+                url = resource.get_fields_url(url=url, fields=fields)
             params = {
                 'headers': self.get_http_headers(
                     resource.Meta.name, method_name, **kwargs),
@@ -170,9 +652,12 @@ class HTTPHypermediaClient(HTTPClient):
             }
             prepared_request = self.prepare_http_request(
                 'GET', params, **kwargs)
-            response = self.session.send(prepared_request)
+            response = self.send_http_request(
+                prepared_request, resource, method_name, deadline=deadline,
+                **kwargs)
             result = self._handle_response(
-                response, resource.Meta.valid_status_codes, resource)
+                response, resource.Meta.valid_status_codes, resource,
+                fields=fields, method_name=method_name)
             if len(result) > 1:
                 responses.append(result)
             else:
@@ -185,16 +670,173 @@ class BaseClient(HTTPClient):
     class Meta:
         # The name of this client API
         name = NotImplemented
-        # The base_url for the API of this client.
+        # The base_url for the API of this client, or a list of
+        # base_urls to spread requests over.
         base_url = NotImplemented
+        # How to pick a base_url: round_robin, least_outstanding or ewma
+        load_balancing = 'round_robin'
+        # Failures in a row before a base_url is ejected
+        max_host_failures = DEFAULT_MAX_FAILURES
+        # Seconds an ejected base_url is left alone
+        host_cooldown = DEFAULT_COOLDOWN
         # A list of registered resources.
         resources = NotImplemented
+        # Content encodings to accept in responses, i.e. ('gzip', 'deflate')
+        accept_encoding = None
+        # Build huge list responses in this many worker processes
+        materialization_workers = None
+        # Lists shorter than this are always built in the calling thread
+        parallel_materialization_threshold = DEFAULT_PARALLEL_THRESHOLD
+        # Items per worker task, calculated from the list size if not set
+        materialization_chunk_size = None
+        # Share one instance per resource identifier, keeping this many
+        # recently used resources alive
+        identity_map_size = None
+        # The number of GET responses cached for resources with a cache_ttl
+        response_cache_size = DEFAULT_CACHE_SIZE
+        # The most threads this client runs requests on at once
+        executor_workers = 8
+        # Also generate submit_<method> variants that return Futures
+        submit_methods = False
+        # The share of requests that may be hedged
+        hedge_budget = DEFAULT_HEDGE_BUDGET
+        # The transport that sends requests, see beckett.transports
+        transport = None
+        # A MetricsRegistry to record traffic metrics in, see beckett.metrics
+        metrics = None
+        # Tune the requests in flight at once with 'aimd' or 'vegas',
+        # or share an AdaptiveLimiter, see beckett.limits
+        concurrency_limit = None
+        initial_concurrency = DEFAULT_INITIAL_LIMIT
+        min_concurrency = DEFAULT_MIN_LIMIT
+        max_concurrency = DEFAULT_MAX_LIMIT
+        # Share the requests in flight between priorities, with the
+        # capacity of a new RequestScheduler or a shared one, see
+        # beckett.scheduling
+        request_scheduler = None
+        # The weight of each priority class, see beckett.scheduling
+        priority_weights = None
+        # Profile this share of calls, see beckett.profiling
+        profile_sample_rate = None
+        # Also record the memory allocated by profiled calls
+        profile_allocations = False
 
     def __init__(self, *args, **kwargs):
         super(BaseClient, self).__init__(*args, **kwargs)
         self.assign_resources(self.Meta.resources)
         self.resources = self.Meta.resources
         self.session = requests.Session()
+        self.transport = make_transport(self.Meta, self.session)
+        if isinstance(self.Meta.base_url, (list, tuple)):
+            self.balancer = LoadBalancer(
+                self.Meta.base_url,
+                policy=getattr(self.Meta, 'load_balancing', 'round_robin'),
+                max_failures=getattr(
+                    self.Meta, 'max_host_failures', DEFAULT_MAX_FAILURES),
+                cooldown=getattr(
+                    self.Meta, 'host_cooldown', DEFAULT_COOLDOWN)
+            )
+        self.transfer_stats = TransferStats()
+        self.metrics = getattr(self.Meta, 'metrics', None)
+        self.limiter = make_limiter(self.Meta)
+        self.scheduler = make_scheduler(self.Meta)
+        sample_rate = getattr(self.Meta, 'profile_sample_rate', None)
+        if sample_rate:
+            self.profiler = CallProfiler(
+                sample_rate,
+                trace_allocations=getattr(
+                    self.Meta, 'profile_allocations', False)
+            )
+        workers = getattr(self.Meta, 'materialization_workers', None)
+        if workers:
+            self.materializer = ParallelMaterializer(
+                workers,
+                threshold=getattr(
+                    self.Meta, 'parallel_materialization_threshold',
+                    DEFAULT_PARALLEL_THRESHOLD),
+                chunk_size=getattr(
+                    self.Meta, 'materialization_chunk_size', None)
+            )
+        identity_map_size = getattr(self.Meta, 'identity_map_size', None)
+        if identity_map_size:
+            self.identity_map = IdentityMap(identity_map_size)
+        self.response_cache = ResponseCache(
+            getattr(self.Meta, 'response_cache_size', DEFAULT_CACHE_SIZE))
+        self.hedger = Hedger(
+            getattr(self.Meta, 'hedge_budget', DEFAULT_HEDGE_BUDGET))
+        self._executor = None
+        self._background_executor = None
+        self._executor_lock = threading.Lock()
+        self._closed = False
+        # The URLs of stale cached responses being refreshed
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+
+    def get_executor(self):
+        """
+        Return the thread pool that submit_<method> calls run on,
+        starting it the first time it is needed.
+
+        raises:
+            ClientClosedError: if the client has been closed
+        """
+        return self._get_pool('_executor')
+
+    def get_background_executor(self):
+        """
+        Return the thread pool that hedged requests and background
+        refreshes are sent on. It is kept apart from the pool of
+        submit_<method> calls, so calls waiting for their requests never
+        hold the threads those requests need.
+
+        raises:
+            ClientClosedError: if the client has been closed
+        """
+        return self._get_pool('_background_executor')
+
+    def _get_pool(self, name):
+        executor = getattr(self, name)
+        if executor is None:
+            with self._executor_lock:
+                if self._closed:
+                    raise ClientClosedError(
+                        '{} has been closed'.format(self.Meta.name))
+                executor = getattr(self, name)
+                if executor is None:
+                    executor = ThreadPoolExecutor(
+                        max_workers=getattr(self.Meta, 'executor_workers', 8))
+                    setattr(self, name, executor)
+        return executor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Release the resources held by this client, such as the
+        HTTP connection pool and any worker processes.
+
+        Requests already submitted to the thread pool are finished first.
+        The thread pools cannot be used again afterwards.
+        """
+        with self._executor_lock:
+            self._closed = True
+        # Submitted calls may still hedge, so their pool goes first
+        for name in ('_executor', '_background_executor'):
+            executor = getattr(self, name)
+            if executor is not None:
+                executor.shutdown()
+                setattr(self, name, None)
+        if self.materializer is not None:
+            self.materializer.close()
+        if self.transport is not getattr(self.Meta, 'transport', None):
+            # A transport instance on the Meta may be shared with other
+            # clients, so only the ones built here are closed
+            self.transport.close()
+        self.session.close()
 
     def assign_resources(self, resource_class_list):
         """
@@ -301,3 +943,19 @@ class BaseClient(HTTPClient):
             self, method_name,
             types.MethodType(method_map[method_type], self)
         )
+        if getattr(self.Meta, 'submit_methods', False):
+            setattr(
+                self, 'submit_' + method_name,
+                types.MethodType(self._submit_method(method_name), self)
+            )
+
+    @staticmethod
+    def _submit_method(method_name):
+        """
+        Build the submit_<method> variant of a generated method, which
+        runs it on the client's thread pool and returns a Future.
+        """
+        def submit(self, *args, **kwargs):
+            return self.get_executor().submit(
+                getattr(self, method_name), *args, **kwargs)
+        return submit
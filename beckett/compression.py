@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# The default minimum body size in bytes before a request is compressed
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+
+def _gzip(body):
+    buffer = io.BytesIO()
+    # A fixed mtime, so the same body always compresses to the same bytes
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as f:
+        f.write(body)
+    return buffer.getvalue()
+
+
+def _gunzip(body):
+    with gzip.GzipFile(fileobj=io.BytesIO(body), mode='rb') as f:
+        return f.read()
+
+
+def _zstd(body):
+    if zstandard is None:
+        raise ImportError(
+            'zstd request compression requires the zstandard package')
+    return zstandard.ZstdCompressor().compress(body)
+
+
+def _unzstd(body):
+    if zstandard is None:
+        raise ImportError(
+            'zstd request compression requires the zstandard package')
+    return zstandard.ZstdDecompressor().decompress(body)
+
+
+COMPRESSORS = {
+    'gzip': _gzip,
+    'deflate': zlib.compress,
+    'zstd': _zstd,
+}
+
+DECOMPRESSORS = {
+    'gzip': _gunzip,
+    'deflate': zlib.decompress,
+    'zstd': _unzstd,
+}
+
+
+def compress_request(prepared_request, encoding, threshold):
+    """
+    Compress the body of a prepared request in place.
+
+    Bodies smaller than the threshold are left alone, as the overhead
+    of compressing them is not worth the saving.
+
+    Args:
+        prepared_request: The prepared HTTP request
+        encoding: One of 'gzip', 'deflate' or 'zstd'
+        threshold: The minimum body size in bytes to compress
+    """
+    body = prepared_request.body
+    if not body or encoding is None:
+        return
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    if len(body) < threshold:
+        return
+    try:
+        compressor = COMPRESSORS[encoding]
+    except KeyError:
+        raise ValueError(
+            'Unsupported request compression: {}'.format(encoding))
+    prepared_request.body = compressor(body)
+    prepared_request.headers['Content-Encoding'] = encoding
+    prepared_request.headers['Content-Length'] = str(
+        len(prepared_request.body))
+
+
+def decompress_body(body, encoding):
+    """
+    Undo compress_request, returning the body as it was before it was
+    compressed with `encoding`. Bodies with no encoding are returned
+    as they are.
+    """
+    if not body or not encoding:
+        return body
+    try:
+        decompressor = DECOMPRESSORS[encoding]
+    except KeyError:
+        raise ValueError(
+            'Unsupported request compression: {}'.format(encoding))
+    return decompressor(body)
+
+
+def body_length(body):
+    """
+    The length in bytes of a request body.
+    """
+    if not body:
+        return 0
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8')
+    return len(body)
+
+
+def wire_length(response):
+    """
+    The number of bytes read off the wire for a response,
+    before any Content-Encoding was decoded.
+    """
+    try:
+        length = response.raw.tell()
+    except Exception:
+        length = None
+    if length:
+        return length
+    content_length = response.headers.get('Content-Length', '')
+    if content_length.isdigit():
+        return int(content_length)
+    return len(response.content or b'')
+
+
+class TransferStats(object):
+    """
+    Byte counters for the traffic sent and received by a client.
+
+    `bytes_sent` and `bytes_received` are the sizes on the wire,
+    the `_decoded` counters are the sizes before compression.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Set all counters back to zero.
+        """
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.bytes_sent_decoded = 0
+            self.bytes_received = 0
+            self.bytes_received_decoded = 0
+
+    def record(self, sent, sent_decoded, received, received_decoded):
+        """
+        Record a single request and response exchange.
+        """
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.bytes_sent_decoded += sent_decoded
+            self.bytes_received += received
+            self.bytes_received_decoded += received_decoded
+
+    def as_dict(self):
+        """
+        Return a snapshot of the counters.
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'bytes_sent': self.bytes_sent,
+                'bytes_sent_decoded': self.bytes_sent_decoded,
+                'bytes_received': self.bytes_received,
+                'bytes_received_decoded': self.bytes_received_decoded,
+            }
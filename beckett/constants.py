@@ -29,3 +29,20 @@ SINGLE_RESOURCE_METHODS = (
     HTTP_PATCH,
     HTTP_DELETE,
 )
+
+# Methods that change the state of a resource
+WRITE_METHODS = (
+    HTTP_POST,
+    HTTP_PUT,
+    HTTP_PATCH,
+    HTTP_DELETE,
+)
+
+# Status codes that mean the API is overloaded, which lower an
+# adaptive concurrency limit
+OVERLOADED_STATUS_CODES = (
+    429,
+    502,
+    503,
+    504,
+)
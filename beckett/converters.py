@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import decimal
+import re
+import sys
+import threading
+
+from .exceptions import AttributeConversionError
+
+string_types = (str, type(u''))
+
+if hasattr(sys, 'intern'):
+    # Py3
+    _intern_str = sys.intern
+else:
+    # Py2 can only intern byte strings
+    _intern_str = intern  # noqa: F821
+
+# The ids of instances whose attributes build_resources has already
+# converted, kept per thread.
+_batch = threading.local()
+
+# Marks a value that is not pending conversion
+_MISSING = object()
+
+_ISO_DATETIME_RE = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?'
+    r'(Z|[+-]\d{2}:?\d{2})?)?$'
+)
+
+if hasattr(datetime, 'timezone'):
+    # Py3
+    UTC = datetime.timezone.utc
+
+    def _make_tzinfo(offset_minutes):
+        return datetime.timezone(datetime.timedelta(minutes=offset_minutes))
+else:
+    # Py2 has no concrete tzinfo, so we normalise to naive UTC
+    UTC = None
+
+    def _make_tzinfo(offset_minutes):
+        return None
+
+
+def to_datetime(value):
+    """
+    Convert an ISO 8601 string or a UNIX timestamp into a datetime.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if UTC is None:
+            return datetime.datetime.utcfromtimestamp(value)
+        return datetime.datetime.fromtimestamp(value, UTC)
+    match = _ISO_DATETIME_RE.match(value)
+    if not match:
+        raise ValueError('Not an ISO 8601 datetime: {}'.format(value))
+    (year, month, day, hour, minute, second,
+     fraction, offset) = match.groups()
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+    result = datetime.datetime(
+        int(year), int(month), int(day),
+        int(hour or 0), int(minute or 0), int(second or 0),
+        microsecond
+    )
+    if offset:
+        if offset == 'Z':
+            minutes = 0
+        else:
+            sign = -1 if offset[0] == '-' else 1
+            digits = offset[1:].replace(':', '')
+            minutes = sign * (int(digits[:2]) * 60 + int(digits[2:]))
+        tzinfo = _make_tzinfo(minutes)
+        if tzinfo is None:
+            result = result - datetime.timedelta(minutes=minutes)
+        else:
+            result = result.replace(tzinfo=tzinfo)
+    return result
+
+
+def to_date(value):
+    """
+    Convert an ISO 8601 date string into a date.
+    """
+    return to_datetime(value).date()
+
+
+def to_decimal(value):
+    """
+    Convert a JSON number or string into a Decimal without picking up
+    binary floating point noise.
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    return decimal.Decimal(value)
+
+
+def to_bool(value):
+    """
+    Convert common JSON truthy values into a bool.
+    """
+    if isinstance(value, string_types):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 'on')
+    return bool(value)
+
+
+# Named converters that can be declared in Meta.attribute_types.
+# Each entry is (target type, conversion function).
+NAMED_CONVERTERS = {
+    'int': (int, int),
+    'float': (float, float),
+    'decimal': (decimal.Decimal, to_decimal),
+    'datetime': (datetime.datetime, to_datetime),
+    'date': (datetime.date, to_date),
+    'bool': (bool, to_bool),
+    'str': (str, str),
+}
+
+# Types that map onto a smarter conversion function than their constructor.
+TYPE_CONVERTERS = {
+    decimal.Decimal: to_decimal,
+    datetime.datetime: to_datetime,
+    datetime.date: to_date,
+    bool: to_bool,
+}
+
+# Types whose values are immutable, so a converted value can safely be
+# shared between resources that received the same raw value.
+IMMUTABLE_TYPES = (
+    int, float, str, bool,
+    decimal.Decimal, datetime.datetime, datetime.date,
+)
+
+
+def _is_immutable_type(target):
+    if target is None:
+        return False
+    if issubclass(target, IMMUTABLE_TYPES):
+        return True
+    # Enum members are singletons
+    return hasattr(target, '__members__')
+
+
+def compile_converter(field, declared):
+    """
+    Compile a single Meta.attribute_types declaration into a converter.
+
+    Args:
+        field: The attribute name, used in error messages.
+        declared: A name from NAMED_CONVERTERS, a type (including Enums)
+                  or any callable.
+    Returns:
+        (convert, shareable): The conversion function and whether its
+                              results are immutable and can be shared.
+    """
+    if isinstance(declared, string_types):
+        try:
+            target, function = NAMED_CONVERTERS[declared]
+        except KeyError:
+            raise ValueError(
+                'Unknown attribute type {!r} for {!r}'.format(declared, field))
+    elif isinstance(declared, type):
+        target = declared
+        function = TYPE_CONVERTERS.get(declared, declared)
+    elif callable(declared):
+        target, function = None, declared
+    else:
+        raise ValueError(
+            'Attribute type for {!r} must be callable'.format(field))
+
+    def convert(value):
+        if target is not None and type(value) is target:
+            return value
+        try:
+            return function(value)
+        except (ValueError, TypeError, ArithmeticError) as error:
+            raise AttributeConversionError(field, value, error)
+
+    return convert, _is_immutable_type(target)
+
+
+class InternPool(object):
+    """
+    Dedupes repeated string values, so every resource holding the
+    same value shares one string object.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def __call__(self, value):
+        if type(value) is str:
+            return _intern_str(value)
+        if type(value) in string_types:
+            return self._values.setdefault(value, value)
+        return value
+
+
+class ConverterPipeline(object):
+    """
+    The compiled form of a resource's Meta.attribute_types
+    and Meta.intern_fields.
+
+    Built once per resource class by `get_converters`.
+    """
+
+    def __init__(self, attribute_types, lazy=False, intern_fields=()):
+        compiled = []
+        for field, declared in attribute_types.items():
+            convert, shareable = compile_converter(field, declared)
+            compiled.append((field, convert, shareable))
+        self.converters = tuple(compiled)
+        self.by_field = dict((f, c) for f, c, _ in compiled)
+        self.lazy = lazy
+        self.intern_fields = tuple(intern_fields)
+        self.intern = InternPool()
+
+    def __bool__(self):
+        return bool(self.converters or self.intern_fields)
+
+    __nonzero__ = __bool__
+
+    def intern_values(self, kwargs):
+        """
+        Dedupe the string values of the interned fields in place.
+        """
+        intern = self.intern
+        for field in self.intern_fields:
+            value = kwargs.get(field)
+            if value is not None:
+                kwargs[field] = intern(value)
+        return kwargs
+
+    def convert(self, kwargs):
+        """
+        Convert the typed values of a single attribute dictionary in place.
+        """
+        for field, convert, _ in self.converters:
+            value = kwargs.get(field)
+            if value is not None:
+                kwargs[field] = convert(value)
+        if self.intern_fields:
+            self.intern_values(kwargs)
+        return kwargs
+
+    def convert_many(self, items):
+        """
+        Convert a list of attribute dictionaries in place, one column at
+        a time. Repeated raw values in a column are only converted once
+        when they are strings and the converted type is immutable.
+        """
+        for field, convert, shareable in self.converters:
+            if shareable:
+                seen = {}
+                for item in items:
+                    value = item.get(field)
+                    if value is None:
+                        continue
+                    if type(value) in string_types:
+                        try:
+                            item[field] = seen[value]
+                        except KeyError:
+                            item[field] = seen[value] = convert(value)
+                    else:
+                        item[field] = convert(value)
+            else:
+                for item in items:
+                    value = item.get(field)
+                    if value is not None:
+                        item[field] = convert(value)
+        intern = self.intern
+        for field in self.intern_fields:
+            for item in items:
+                value = item.get(field)
+                if value is not None:
+                    item[field] = intern(value)
+        return items
+
+
+_EMPTY_PIPELINE = ConverterPipeline({})
+
+
+def get_converters(resource_class):
+    """
+    Return the compiled ConverterPipeline for a resource class,
+    compiling it on first use.
+    """
+    pipeline = resource_class.__dict__.get('_attribute_converters')
+    if pipeline is None:
+        meta = getattr(resource_class, 'Meta', None)
+        attribute_types = getattr(meta, 'attribute_types', None)
+        intern_fields = getattr(meta, 'intern_fields', None)
+        if attribute_types or intern_fields:
+            pipeline = ConverterPipeline(
+                attribute_types or {},
+                lazy=bool(attribute_types) and getattr(
+                    meta, 'lazy_attribute_types', False),
+                intern_fields=intern_fields or ()
+            )
+        else:
+            pipeline = _EMPTY_PIPELINE
+        setattr(resource_class, '_attribute_converters', pipeline)
+    return pipeline
+
+
+def build_resources(resource_class, items):
+    """
+    Build a list of resource instances, converting typed attributes
+    across the whole list at once instead of per instance.
+    """
+    pipeline = get_converters(resource_class)
+    if not pipeline or pipeline.lazy:
+        return [resource_class(**x) for x in items]
+    raw_items = None
+    if getattr(resource_class.Meta, 'keep_raw_data', False):
+        # Convert copies, so instances keep the data they were built from
+        raw_items, items = items, [dict(x) for x in items]
+    pipeline.convert_many(items)
+    converted = getattr(_batch, 'converted', None)
+    if converted is None:
+        converted = _batch.converted = set()
+    results = []
+    for index, item in enumerate(items):
+        instance = resource_class.__new__(resource_class)
+        # Marked outside the instance, so every instance of the class
+        # gets the same attribute layout and can share its dict keys.
+        converted.add(id(instance))
+        try:
+            instance.__init__(**item)
+        finally:
+            converted.discard(id(instance))
+        if raw_items is not None:
+            instance._raw_data = raw_items[index]
+        results.append(instance)
+    return results
+
+
+class TypedAttributesMixin(object):
+    """
+    Gives resources support for Meta.attribute_types.
+
+    Typed values are converted as they are set, or on first access
+    when Meta.lazy_attribute_types is True.
+    """
+
+    def convert_attributes(self, kwargs):
+        """
+        Convert the typed values in kwargs, returning the values that
+        should be set now. Lazily converted values are held back until
+        they are first accessed.
+        """
+        converted = getattr(_batch, 'converted', None)
+        if converted and id(self) in converted:
+            return kwargs
+        pipeline = get_converters(type(self))
+        if not pipeline:
+            return kwargs
+        if not pipeline.lazy:
+            return pipeline.convert(kwargs)
+        if pipeline.intern_fields:
+            pipeline.intern_values(kwargs)
+        attributes = self.Meta.attributes
+        pending = {}
+        for field in pipeline.by_field:
+            if field in attributes and kwargs.get(field) is not None:
+                pending[field] = kwargs.pop(field)
+                # Discard any previously converted value
+                self.__dict__.pop(field, None)
+        self._unconverted = pending
+        return kwargs
+
+    def __getattr__(self, name):
+        values = self.__dict__
+        pending = values.get('_unconverted')
+        if pending:
+            raw = pending.get(name, _MISSING)
+            if raw is not _MISSING:
+                convert = get_converters(type(self)).by_field[name]
+                value = convert(raw)
+                setattr(self, name, value)
+                # Dropped only once set, so a thread that finds neither
+                # the pending value nor the attribute can not exist
+                pending.pop(name, None)
+                return value
+            try:
+                # Converted by another thread since this lookup began
+                return values[name]
+            except KeyError:
+                pass
+        raise AttributeError(name)
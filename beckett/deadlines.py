@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from .cache import now
+
+
+class Deadline(object):
+    """
+    A time budget for a whole logical operation, shared by every
+    HTTP request made while carrying it out.
+
+    Usage:
+
+        deadline = Deadline(2.5)
+        client.get_product(uid=1, deadline=deadline)
+        client.get_designer(uid=2, deadline=deadline)
+    """
+
+    def __init__(self, seconds):
+        self.budget = seconds
+        self.started = now()
+        self.timings = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def coerce(cls, deadline):
+        """
+        Turn a number of seconds into a Deadline. Deadlines and None
+        are returned as they are, so a deadline can be passed on.
+        """
+        if deadline is None or isinstance(deadline, cls):
+            return deadline
+        return cls(deadline)
+
+    def elapsed(self):
+        """
+        The number of seconds since this deadline started.
+        """
+        return now() - self.started
+
+    def remaining(self):
+        """
+        The number of seconds left before this deadline expires.
+        """
+        return max(0.0, self.budget - self.elapsed())
+
+    def expired(self):
+        return self.elapsed() >= self.budget
+
+    def record(self, url, seconds):
+        """
+        Record how long a request made under this deadline took.
+        """
+        with self._lock:
+            self.timings.append((url, seconds))
+
+
+def _smallest(*values):
+    values = [v for v in values if v is not None]
+    return min(values) if values else None
+
+
+def request_timeout(resource, deadline=None):
+    """
+    The (connect, read) timeout for a request to a resource, taking
+    the resource's Meta timeouts and any deadline into account.
+
+    Returns:
+        timeout: A (connect, read) tuple, or None for no timeout
+    """
+    connect = getattr(resource.Meta, 'connect_timeout', None)
+    read = getattr(resource.Meta, 'read_timeout', None)
+    if deadline is not None:
+        remaining = deadline.remaining()
+        connect = _smallest(connect, remaining)
+        read = _smallest(read, remaining)
+    if connect is None and read is None:
+        return None
+    return (connect, read)
+
+
+def remaining_timeout(timeout, deadline=None):
+    """
+    Cap a (connect, read) timeout at what is left of a deadline, i.e.
+    before sending a request again.
+    """
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    if timeout is None:
+        return (remaining, remaining)
+    return tuple(_smallest(t, remaining) for t in timeout)
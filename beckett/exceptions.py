@@ -1,10 +1,48 @@
 # -*- coding: utf-8 -*-
 
 
+class AttributeConversionError(Exception):
+    """ An attribute value could not be converted to its declared type """
+
+    def __init__(self, field, value, error=None):
+        self.field = field
+        self.value = value
+        self.error = error
+
+    def __str__(self):
+        return 'Could not convert attribute {}={!r}: {}'.format(
+            self.field, self.value, self.error
+            )
+
+
 class BadURLException(Exception):
     """ An Invalid URL was parsed """
 
 
+class ClientClosedError(RuntimeError):
+    """ A client was used after it was closed """
+
+
+class DeadlineExceededError(Exception):
+    """ A request timed out, or its deadline ran out """
+
+    def __init__(self, url, timeout, elapsed, deadline=None, timings=()):
+        self.url = url
+        self.timeout = timeout
+        self.elapsed = elapsed
+        self.deadline = deadline
+        self.timings = list(timings)
+
+    def __str__(self):
+        if self.deadline is not None:
+            return 'Deadline of {}s exceeded after {:.3f}s calling {}'.format(
+                self.deadline, self.elapsed, self.url
+                )
+        return 'Timed out after {:.3f}s (timeout: {}) calling {}'.format(
+            self.elapsed, self.timeout, self.url
+            )
+
+
 class InvalidStatusCodeError(Exception):
     """ An invalid status code was returned for this resource """
 
@@ -20,3 +58,14 @@ class InvalidStatusCodeError(Exception):
 
 class MissingUidException(Exception):
     """ A uid attribute was missing! """
+
+
+class UnrecordedRequestError(Exception):
+    """ A ReplayTransport received a request that was never recorded """
+
+    def __init__(self, method, url):
+        self.method = method
+        self.url = url
+
+    def __str__(self):
+        return 'No recorded response for {} {}'.format(self.method, self.url)
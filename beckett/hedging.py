@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# The default share of requests that may be hedged
+DEFAULT_HEDGE_BUDGET = 0.1
+
+# The number of latency samples needed before an adaptive delay is used
+MIN_LATENCY_SAMPLES = 20
+
+
+class LatencyTracker(object):
+    """
+    Keeps a sliding window of recent latencies per key and
+    reports percentiles over it.
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key, percent):
+        """
+        The latency at this percentile, or None if there are
+        too few samples to tell.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = int(round((percent / 100.0) * (len(samples) - 1)))
+        return samples[index]
+
+
+class HedgeBudget(object):
+    """
+    Limits hedged requests to a share of all requests, so hedging can
+    never double the load on the API.
+
+    Every request earns `ratio` of a token and every hedge spends one.
+    Up to `burst` tokens can be saved up.
+    """
+
+    def __init__(self, ratio=DEFAULT_HEDGE_BUDGET, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self.hedged = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_acquire(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            self.hedged += 1
+            return True
+
+
+def _discard(future):
+    """
+    Release the connection of a response that lost the race.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    future.result().close()
+
+
+class Hedger(object):
+    """
+    Sends a duplicate of a slow GET request, and uses whichever
+    response arrives first.
+
+    The delay before hedging comes from the resource's Meta.hedge_after.
+    It is either a number of seconds or 'p95', which uses the 95th
+    percentile latency recently seen for that resource.
+    """
+
+    def __init__(self, budget=DEFAULT_HEDGE_BUDGET):
+        self.budget = HedgeBudget(budget)
+        self.latencies = LatencyTracker()
+
+    def delay_for(self, resource):
+        """
+        The number of seconds to wait before hedging a request to
+        this resource, or None to not hedge it.
+        """
+        hedge_after = getattr(resource.Meta, 'hedge_after', None)
+        if hedge_after == 'p95':
+            return self.latencies.percentile(resource, 95)
+        return hedge_after
+
+    def record(self, resource, seconds):
+        self.latencies.record(resource, seconds)
+
+    def send(self, executor, send, prepared_request, delay):
+        """
+        Send a request, hedging it if it takes longer than delay.
+
+        Args:
+            executor: The executor to send requests on
+            send: A function that sends a prepared request
+            prepared_request: The prepared HTTP request
+            delay: Seconds to wait before sending a duplicate
+        returns:
+            response: The first successful response
+        """
+        self.budget.record_request()
+        primary = executor.submit(send, prepared_request)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.budget.try_acquire():
+            return primary.result()
+        hedge = executor.submit(send, prepared_request.copy())
+        pending = set([primary, hedge])
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winners = [f for f in done if f.exception() is None]
+            if winners or not pending:
+                break
+        for future in (primary, hedge):
+            if winners and future is not winners[0]:
+                if not future.cancel():
+                    future.add_done_callback(_discard)
+        if winners:
+            return winners[0].result()
+        # Both failed, so report the original request's error
+        return primary.result()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import weakref
+from collections import OrderedDict
+
+# The default number of recently used resources the identity map keeps alive
+DEFAULT_IDENTITY_MAP_SIZE = 1000
+
+
+def identity_key(resource, uid):
+    """
+    The key for a resource in an identity map. Identifiers are compared
+    as text, so `1` and `'1'` refer to the same resource.
+    """
+    return (resource, u'{}'.format(uid))
+
+
+class IdentityMap(object):
+    """
+    Makes sure each resource, identified by its class and
+    `Meta.identifier` value, is only materialized once.
+
+    Resources that are still referenced elsewhere are found through weak
+    references. The `maxsize` most recently used resources are also kept
+    alive by the map itself.
+    """
+
+    def __init__(self, maxsize=DEFAULT_IDENTITY_MAP_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+        self._recent = OrderedDict()
+        self._resources = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._resources)
+
+    def _touch(self, key, instance):
+        self._recent.pop(key, None)
+        self._recent[key] = instance
+        while len(self._recent) > self.maxsize:
+            self._recent.popitem(last=False)
+
+    def get(self, resource, uid):
+        """
+        Return the resource instance for this identifier, if there is one.
+        """
+        key = identity_key(resource, uid)
+        with self._lock:
+            instance = self._resources.get(key)
+            if instance is not None:
+                self._touch(key, instance)
+            return instance
+
+    def merge(self, instance):
+        """
+        Add a freshly built resource to the map.
+
+        If the map already holds this resource, it is updated in place
+        with the new attributes and returned instead.
+        """
+        resource = type(instance)
+        identifier = getattr(resource.Meta, 'identifier', None)
+        uid = getattr(instance, identifier, None) if identifier else None
+        if uid is None:
+            return instance
+        key = identity_key(resource, uid)
+        with self._lock:
+            existing = self._resources.get(key)
+            if existing is None:
+                self._resources[key] = instance
+                self._touch(key, instance)
+                return instance
+            # Lazily typed attributes on the new instance replace
+            # any values converted on the existing one.
+            for field in instance.__dict__.get('_unconverted') or ():
+                existing.__dict__.pop(field, None)
+            existing.__dict__.update(instance.__dict__)
+            self._touch(key, existing)
+            return existing
+
+    def merge_all(self, instances):
+        """
+        Merge a list of freshly built resources, keeping their order.
+        """
+        return [self.merge(instance) for instance in instances]
+
+    def invalidate(self, resource, uid=None):
+        """
+        Remove a resource from the map, so the next time it is
+        materialized a new instance is built.
+
+        Args:
+            resource: The resource class
+            uid: The identifier to remove. If not set, every
+                 instance of this resource class is removed.
+        """
+        with self._lock:
+            if uid is not None:
+                keys = [identity_key(resource, uid)]
+            else:
+                keys = [k for k in self._resources.keys() if k[0] is resource]
+            for key in keys:
+                self._resources.pop(key, None)
+                self._recent.pop(key, None)
+
+    def clear(self):
+        """
+        Remove every resource from the map.
+        """
+        with self._lock:
+            self._resources.clear()
+            self._recent.clear()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+import math
+import threading
+from collections import deque, namedtuple
+
+from .cache import now
+
+# The ways a limit can be tuned
+AIMD = 'aimd'
+VEGAS = 'vegas'
+
+DEFAULT_INITIAL_LIMIT = 10
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 100
+
+# One change to the limit, and why it was made
+Decision = namedtuple('Decision', ('time', 'old', 'new', 'reason'))
+
+
+def _log10(limit):
+    return max(1.0, math.log10(limit))
+
+
+class AdaptiveLimiter(object):
+    """
+    Limits the requests in flight at once, and tunes the limit from
+    the latency and errors of the requests sent.
+
+    Requests over the limit wait for another request to finish. The
+    limit is only raised while the requests in flight use at least half
+    of it, so a quiet client does not build up a limit it never tested.
+
+    Args:
+        policy: 'aimd' raises the limit by one for every limit's worth
+                of successful requests, and cuts it by `backoff` on an
+                error or a request slower than `latency_threshold`.
+                'vegas' compares each latency to the lowest one seen,
+                estimates how many requests are queueing upstream, and
+                lowers the limit once too many are, before any fail.
+        initial_limit: The limit to start from
+        min_limit: The lowest the limit can go
+        max_limit: The highest the limit can go
+        backoff: The share of the limit kept after a failure
+        latency_threshold: Seconds after which aimd treats a request as
+                           a failure, if set
+        probe_interval: Vegas forgets the lowest latency after this many
+                        requests, so it follows lasting changes upstream
+        history: The number of recent decisions to keep
+    """
+
+    def __init__(self, policy=AIMD, initial_limit=DEFAULT_INITIAL_LIMIT,
+                 min_limit=DEFAULT_MIN_LIMIT, max_limit=DEFAULT_MAX_LIMIT,
+                 backoff=0.9, latency_threshold=None, probe_interval=1000,
+                 history=100):
+        if policy not in (AIMD, VEGAS):
+            raise ValueError('Unknown concurrency policy {!r}'.format(policy))
+        self.policy = policy
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+        self.probe_interval = probe_interval
+        self.decisions = deque(maxlen=history)
+        self.in_flight = 0
+        self.min_latency = None
+        self._limit = float(max(min_limit, min(max_limit, initial_limit)))
+        self._samples = 0
+        self._condition = threading.Condition(threading.Lock())
+
+    @property
+    def limit(self):
+        """
+        The most requests allowed in flight at once.
+        """
+        return int(self._limit)
+
+    def acquire(self, timeout=None):
+        """
+        Wait until another request can be sent, and count it in flight.
+
+        Args:
+            timeout: The most seconds to wait, i.e. what is left of a
+                     deadline, or None to wait for as long as it takes
+        Returns:
+            acquired: False if the timeout ran out first
+        """
+        with self._condition:
+            if timeout is not None:
+                ends = now() + timeout
+            while self.in_flight >= int(self._limit):
+                if timeout is None:
+                    self._condition.wait()
+                    continue
+                remaining = ends - now()
+                if remaining <= 0:
+                    # Pass on a wake up this request may have taken
+                    self._condition.notify()
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency, failed=False):
+        """
+        Count a request as finished, and tune the limit from it.
+
+        Args:
+            latency: The seconds the request took
+            failed: Whether it failed, i.e. timed out or was overloaded
+        """
+        with self._condition:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+            old = int(self._limit)
+            if self.policy == AIMD:
+                reason = self._aimd(latency, failed, in_flight)
+            else:
+                reason = self._vegas(latency, failed, in_flight)
+            self._limit = max(
+                float(self.min_limit), min(float(self.max_limit), self._limit))
+            new = int(self._limit)
+            if new != old:
+                self.decisions.append(Decision(now(), old, new, reason))
+            self._condition.notify(max(1, new - self.in_flight))
+
+    def _aimd(self, latency, failed, in_flight):
+        if failed:
+            self._limit *= self.backoff
+            return 'error'
+        if self.latency_threshold is not None and (
+                latency > self.latency_threshold):
+            self._limit *= self.backoff
+            return 'latency'
+        if in_flight * 2 >= self._limit:
+            self._limit += 1.0 / self._limit
+            return 'growth'
+        return None
+
+    def _vegas(self, latency, failed, in_flight):
+        self._samples += 1
+        if self._samples % self.probe_interval == 0:
+            self.min_latency = None
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        if failed:
+            self._limit *= self.backoff
+            return 'error'
+        if latency <= 0:
+            return None
+        limit = self._limit
+        # The requests estimated to be waiting upstream
+        queueing = limit * (1 - self.min_latency / latency)
+        if queueing > 6 * _log10(limit):
+            self._limit -= _log10(limit)
+            return 'queueing'
+        if queueing < 3 * _log10(limit) and in_flight * 2 >= limit:
+            self._limit += _log10(limit) / limit
+            return 'growth'
+        return None
+
+
+def make_limiter(meta):
+    """
+    Build the limiter declared on a Meta class.
+
+    Meta.concurrency_limit may be 'aimd', 'vegas' or an AdaptiveLimiter
+    to share between clients. If it is not set, there is no limit.
+    """
+    limiter = getattr(meta, 'concurrency_limit', None)
+    if limiter is None or isinstance(limiter, AdaptiveLimiter):
+        return limiter
+    return AdaptiveLimiter(
+        limiter,
+        initial_limit=getattr(
+            meta, 'initial_concurrency', DEFAULT_INITIAL_LIMIT),
+        min_limit=getattr(meta, 'min_concurrency', DEFAULT_MIN_LIMIT),
+        max_limit=getattr(meta, 'max_concurrency', DEFAULT_MAX_LIMIT)
+    )
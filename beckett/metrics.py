@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import threading
+
+# Latency buckets in seconds, from 5ms to 10s
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return u'{}'.format(value).replace('\\', '\\\\').replace(
+        '\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(k, _escape(v)) for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric(object):
+    """
+    A metric family, with a value per combination of label values.
+
+    Every thread updates its own shard of values, so recording never
+    takes a lock. Shards are only added up when the metric is read, and
+    the shards of threads that have exited are folded into one total.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # (thread, shard) pairs of the threads that have recorded values
+        self._shards = []
+        # The totals of the threads that have exited
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._retire()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire(self):
+        # Short lived threads, such as the pools of expand(), would
+        # otherwise leave a shard behind each. Called with the lock held.
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._merge(self._retired, shard)
+        self._shards = live
+
+    def _merge(self, totals, shard):
+        raise NotImplementedError
+
+    def _snapshots(self):
+        with self._lock:
+            self._retire()
+            shards = [shard for _, shard in self._shards]
+            retired = dict(self._retired)
+        # Copying a dict is atomic, so writers never need to wait
+        return [retired] + [dict(shard) for shard in shards]
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up, such as a number of requests.
+    """
+
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self):
+        """
+        The totals per tuple of label values.
+        """
+        totals = {}
+        for shard in self._snapshots():
+            self._merge(totals, shard)
+        return totals
+
+    def _merge(self, totals, shard):
+        for labels, value in shard.items():
+            totals[labels] = totals.get(labels, 0) + value
+
+    def value(self, labels=()):
+        return self.values().get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self.values().items()):
+            yield self.name, labels, (), value
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down, such as the requests in flight.
+    """
+
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """
+    Counts observations, such as latencies, into buckets.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels, value):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # One count per bucket and one for +Inf, then the sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def values(self):
+        """
+        The bucket counts and sum per tuple of label values.
+        """
+        totals = {}
+        for shard in self._snapshots():
+            self._merge(totals, shard)
+        return totals
+
+    def _merge(self, totals, shard):
+        for labels, counts in shard.items():
+            total = totals.get(labels)
+            if total is None:
+                totals[labels] = list(counts)
+            else:
+                totals[labels] = [a + b for a, b in zip(total, counts)]
+
+    def count(self, labels=()):
+        counts = self.values().get(labels)
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self):
+        bounds = self.buckets + (float('inf'),)
+        for labels, counts in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield (self.name + '_bucket', labels,
+                       (('le', _format_value(float(bound))),), cumulative)
+            yield self.name + '_sum', labels, (), counts[-1]
+            yield self.name + '_count', labels, (), cumulative
+
+
+class MetricsRegistry(object):
+    """
+    Steady state metrics on the traffic of one or more clients, labelled
+    by the client's `Meta.name` and the method name, i.e. `get_product`.
+
+    Share one registry between clients by declaring it on their Meta:
+
+        METRICS = MetricsRegistry()
+
+        class MyClient(clients.BaseClient):
+
+            class Meta:
+                ...
+                metrics = METRICS
+
+    and serve `METRICS.expose()` to Prometheus.
+    """
+
+    def __init__(self, prefix='beckett', buckets=DEFAULT_BUCKETS):
+        self.requests = Counter(
+            prefix + '_requests_total',
+            'HTTP requests sent.', ('client', 'method'))
+        self.errors = Counter(
+            prefix + '_request_errors_total',
+            'HTTP requests that failed, by status code or error.',
+            ('client', 'method', 'status'))
+        self.in_flight = Gauge(
+            prefix + '_requests_in_flight',
+            'HTTP requests waiting for a response.', ('client',))
+        self.latency = Histogram(
+            prefix + '_request_duration_seconds',
+            'Seconds taken to receive a response.', ('client', 'method'),
+            buckets=buckets)
+        self.bytes_sent = Counter(
+            prefix + '_sent_bytes_total',
+            'Request body bytes sent over the wire.', ('client',))
+        self.bytes_received = Counter(
+            prefix + '_received_bytes_total',
+            'Response body bytes received over the wire.', ('client',))
+        self.materialized = Counter(
+            prefix + '_resources_materialized_total',
+            'Resource instances built from responses.',
+            ('client', 'resource'))
+        self.queued = Gauge(
+            prefix + '_requests_queued',
+            'HTTP requests waiting for the scheduler.',
+            ('client', 'priority'))
+        self.metrics = (
+            self.requests, self.errors, self.in_flight, self.latency,
+            self.bytes_sent, self.bytes_received, self.materialized,
+            self.queued)
+
+    def request_started(self, client):
+        self.in_flight.inc((client,))
+
+    def request_finished(self, client, method, seconds, sent, received):
+        self.in_flight.dec((client,))
+        self.requests.inc((client, method))
+        self.latency.observe((client, method), seconds)
+        self.bytes_sent.inc((client,), sent)
+        self.bytes_received.inc((client,), received)
+
+    def request_failed(self, client, method, status, seconds):
+        """
+        Record a request that got no response, because of a timeout
+        or a connection error.
+        """
+        self.in_flight.dec((client,))
+        self.requests.inc((client, method))
+        self.latency.observe((client, method), seconds)
+        self.record_error(client, method, status)
+
+    def record_error(self, client, method, status):
+        self.errors.inc((client, method, u'{}'.format(status)))
+
+    def record_materialized(self, client, resource, count):
+        self.materialized.inc((client, resource), count)
+
+    def request_queued(self, client, priority):
+        self.queued.inc((client, priority))
+
+    def request_dequeued(self, client, priority):
+        self.queued.dec((client, priority))
+
+    def expose(self):
+        """
+        All of the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append('# HELP {} {}'.format(
+                metric.name, metric.documentation))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.kind))
+            for name, labels, extra, value in metric.samples():
+                lines.append('{}{} {}'.format(
+                    name, _format_labels(metric.labelnames, labels, extra),
+                    _format_value(value)))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from .converters import build_resources
+
+# The default number of items before a list is materialized in parallel.
+# Not measured on multi-core hardware, see bench_materialization.py
+DEFAULT_PARALLEL_THRESHOLD = 50000
+
+
+def _materialize_chunk(resource, items):
+    """
+    Build one chunk of resources inside a worker process.
+    """
+    return build_resources(resource, items)
+
+
+class ParallelMaterializer(object):
+    """
+    Builds very large lists of resources in a pool of worker processes.
+
+    The list is split into ordered chunks, each chunk is built into
+    resources by a worker and the results are joined back in order.
+    Lists smaller than `threshold` are built in the calling thread, where
+    the cost of sending items to the workers would outweigh the gain.
+    """
+
+    def __init__(self, workers, threshold=DEFAULT_PARALLEL_THRESHOLD,
+                 chunk_size=None):
+        self.workers = workers
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _chunks(self, items):
+        size = self.chunk_size
+        if not size:
+            # A few chunks per worker keeps them all busy
+            size = max(1, len(items) // (self.workers * 4))
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def build_resources(self, resource, items):
+        """
+        Build a list of resource instances, in parallel if the
+        list is large enough.
+
+        Args:
+            resource: The resource class to build
+            items: A list of dictionaries decoded from the response
+
+        returns:
+            resources: A list of Resource instances, in the same
+                       order as items
+        """
+        if len(items) < self.threshold:
+            return build_resources(resource, items)
+        results = []
+        chunks = self._get_executor().map(
+            _materialize_chunk, repeat(resource), self._chunks(items))
+        for chunk in chunks:
+            results.extend(chunk)
+        return results
+
+    def close(self):
+        """
+        Shut down the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
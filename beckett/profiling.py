@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import cProfile
+import io
+import pstats
+import random
+import sys
+import threading
+
+try:
+    import tracemalloc
+except ImportError:
+    # Py2
+    tracemalloc = None
+
+try:
+    # Py2, where pstats writes byte strings that io.StringIO refuses
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# The phases of a call, found by the function that starts each one.
+# A module of None matches the function in any module, so that
+# overridden methods on resources are counted too.
+PHASES = (
+    ('io', 'beckett/clients.py', '_send'),
+    ('decode', 'requests/models.py', 'json'),
+    ('build', 'beckett/clients.py', '_build_resources'),
+    ('set_attributes', None, 'set_attributes'),
+    ('set_subresources', None, 'set_subresources'),
+    ('match_urls', None, 'match_urls_to_resources'),
+    ('convert', 'beckett/converters.py', 'convert_attributes'),
+    ('convert', 'beckett/converters.py', 'convert_many'),
+    ('pluralize', 'inflect', 'plural'),
+)
+
+
+class _MethodProfile(object):
+    """
+    The profiles aggregated for one client method.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.stats = None
+        self.allocations = {}
+
+    def add(self, profile, allocations):
+        self.calls += 1
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+        for stat in allocations:
+            key = str(stat.traceback[0])
+            size, count = self.allocations.get(key, (0, 0))
+            self.allocations[key] = (
+                size + stat.size_diff, count + stat.count_diff)
+
+
+class CallProfiler(object):
+    """
+    Profiles a sample of the calls made by a client, and aggregates
+    the profiles per client method, i.e. `get_product`.
+
+    Sampled calls are run under cProfile and, if `trace_allocations`
+    is set, tracemalloc. Only one call is profiled at a time; calls
+    made while another one is being profiled are not sampled.
+
+    Args:
+        sample_rate: The share of calls to profile, from 0 to 1
+        trace_allocations: Also record the memory each call allocates
+        seed: Seed the sampling, to profile the same calls every run
+    """
+
+    def __init__(self, sample_rate=0.01, trace_allocations=False, seed=None):
+        if trace_allocations and tracemalloc is None:
+            raise ImportError('Tracing allocations requires Python 3')
+        self.sample_rate = sample_rate
+        self.trace_allocations = trace_allocations
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._methods = {}
+
+    def sample(self):
+        """
+        Decide whether to profile the next call.
+        """
+        return self._random.random() < self.sample_rate
+
+    def profile(self, method_name, func, *args, **kwargs):
+        """
+        Call func, profiling it under method_name.
+        """
+        if not self._lock.acquire(False):
+            return func(*args, **kwargs)
+        try:
+            return self._profile(method_name, func, args, kwargs)
+        finally:
+            self._lock.release()
+
+    def _profile(self, method_name, func, args, kwargs):
+        tracing = self.trace_allocations
+        started_tracing = tracing and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot() if tracing else None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already running
+            if started_tracing:
+                tracemalloc.stop()
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            allocations = ()
+            if tracing:
+                ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+                after = tracemalloc.take_snapshot().filter_traces(ignore)
+                allocations = after.compare_to(
+                    before.filter_traces(ignore), 'lineno')
+                if started_tracing:
+                    tracemalloc.stop()
+            method = self._methods.get(method_name)
+            if method is None:
+                method = self._methods[method_name] = _MethodProfile()
+            method.add(profile, allocations)
+
+    def methods(self):
+        """
+        The names of the methods with sampled calls.
+        """
+        return sorted(self._methods)
+
+    def stats(self, method_name):
+        """
+        The pstats.Stats of every sampled call to a method.
+        """
+        return self._methods[method_name].stats
+
+    def phases(self, method_name):
+        """
+        The seconds spent in each phase of the sampled calls to a method.
+        """
+        totals = {}
+        for (filename, _, function), row in self.stats(
+                method_name).stats.items():
+            filename = filename.replace('\\', '/')
+            for phase, module, name in PHASES:
+                if function == name and (module is None or module in filename):
+                    totals[phase] = totals.get(phase, 0.0) + row[3]
+        return totals
+
+    def allocations(self, method_name, top=10):
+        """
+        The lines that allocated the most memory in the sampled calls to
+        a method, as (line, bytes, blocks) tuples.
+        """
+        allocations = self._methods[method_name].allocations
+        rows = sorted(
+            ((k, size, count) for k, (size, count) in allocations.items()),
+            key=lambda row: -row[1])
+        return rows[:top]
+
+    def report(self, top=10):
+        """
+        A text report of the phases, top functions and top allocations
+        of every sampled method.
+        """
+        out = StringIO()
+        for method_name in self.methods():
+            method = self._methods[method_name]
+            stats = method.stats
+            out.write(u'{} - {} sampled calls, {:.6f}s\n'.format(
+                method_name, method.calls, stats.total_tt))
+            out.write(u'\nPhases:\n')
+            phases = self.phases(method_name)
+            for phase, seconds in sorted(
+                    phases.items(), key=lambda x: -x[1]):
+                out.write(u'  {:<18} {:.6f}s\n'.format(phase, seconds))
+            out.write(u'\nTop functions:\n')
+            stats.stream = out
+            stats.sort_stats('cumulative').print_stats(top)
+            stats.stream = sys.stdout
+            if method.allocations:
+                out.write(u'Top allocations:\n')
+                for line, size, count in self.allocations(method_name, top):
+                    out.write(u'  {} {} bytes in {} blocks\n'.format(
+                        line, size, count))
+            out.write(u'\n')
+        return out.getvalue()
+
+    def dump(self, path, top=10):
+        """
+        Write the report to a file.
+        """
+        with io.open(path, 'w') as f:
+            f.write(self.report(top))
+
+    def reset(self):
+        """
+        Forget every sampled call.
+        """
+        with self._lock:
+            self._methods = {}
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 
 import sys
+import threading
 import types
+from concurrent.futures import ThreadPoolExecutor
 
 import inflect
 
@@ -9,7 +11,19 @@ import requests
 
 from .clients import HTTPHypermediaClient
 from .constants import DEFAULT_VALID_STATUS_CODES
+from .converters import TypedAttributesMixin, build_resources
+from .deadlines import Deadline
+from .transports import BaseTransport, make_transport
 from .exceptions import BadURLException
+from .limits import (
+    DEFAULT_INITIAL_LIMIT,
+    DEFAULT_MAX_LIMIT,
+    DEFAULT_MIN_LIMIT,
+    AdaptiveLimiter,
+    make_limiter
+)
+from .serializers import get_serializer
+from .urls import quote_value
 
 if sys.version_info[0] == 3:
     # Py3
@@ -18,8 +32,15 @@ else:
     # Py2
     from urlparse import urlparse
 
+# Building an inflect engine is slow, so share one
+_inflect = inflect.engine()
 
-class BaseResource(object):
+# Guards building the transports and limiters shared by a
+# HypermediaResource class
+_class_lock = threading.Lock()
+
+
+class BaseResource(TypedAttributesMixin):
     """
     A simple representation of a resource.
 
@@ -68,9 +89,53 @@ class BaseResource(object):
         )
         # When receiving paginated results, use this key to render instances.
         pagination_key = 'results'
+        # Optional types to convert attributes into, i.e. {'price': 'decimal'}
+        attribute_types = {}
+        # Convert typed attributes when they are first accessed instead
+        lazy_attribute_types = False
+        # Low cardinality attributes whose string values are shared
+        # between instances, i.e. ('status', 'country')
+        intern_fields = ()
+        # The query used to request a subset of fields, i.e. ?fields=a,b
+        fields_template = 'fields={}'
+        # Compress request bodies with 'gzip', 'deflate' or 'zstd'
+        request_compression = None
+        # Only compress request bodies of at least this many bytes
+        request_compression_threshold = 1024
+        # The query parameter the cursor of a SyncedCollection is sent
+        # in, i.e. 'updated_since', see beckett.sync
+        sync_param = None
+        # The attribute whose largest value is the next cursor, i.e.
+        # 'updated_at'. Defaults to the identifier.
+        sync_field = None
+        # The key of the sync token in responses, used as the next cursor
+        sync_token_key = None
+        # The attribute that marks a deleted resource, i.e. 'deleted'
+        sync_deleted_field = None
+        # The priority class of requests for this resource, i.e.
+        # 'interactive' or 'bulk', see beckett.scheduling
+        priority = None
+        # The relative cost of a request for this resource when scheduled
+        request_cost = 1
+        # Cache the results of GET calls for this many seconds
+        cache_ttl = None
+        # Keep returning cached results for this many seconds after they
+        # were fetched, refreshing them in the background once they are
+        # older than cache_ttl
+        cache_hard_ttl = None
+        # Seconds to wait to connect to, and to read from, the API
+        connect_timeout = None
+        read_timeout = None
+        # Hedge slow GET requests after this many seconds, or 'p95'
+        hedge_after = None
+        # Keep the data each instance was built from, so unchanged
+        # instances can be serialized by passing it through
+        keep_raw_data = False
 
     def __init__(self, **kwargs):
         self._subresource_map = getattr(self.Meta, 'subresources', {})
+        if getattr(self.Meta, 'keep_raw_data', False):
+            self._raw_data = kwargs
         self.set_attributes(**kwargs)
 
     def __str__(self):
@@ -93,7 +158,7 @@ class BaseResource(object):
                 value = None
             elif isinstance(sub_attr, list):
                 # A list of subresources is supported
-                value = [resource(**x) for x in sub_attr]
+                value = build_resources(resource, sub_attr)
             else:
                 # So is a single resource
                 value = resource(**sub_attr)
@@ -114,9 +179,12 @@ class BaseResource(object):
             for key in self._subresource_map.keys():
                 # Don't let these attributes be overridden later
                 kwargs.pop(key, None)
-        for field, value in kwargs.items():
-            if field in self.Meta.attributes:
-                setattr(self, field, value)
+        kwargs = self.convert_attributes(kwargs)
+        # Set attributes in the order they are declared, so that every
+        # instance has the same layout and shares its dictionary keys.
+        for field in self.Meta.attributes:
+            if field in kwargs:
+                setattr(self, field, kwargs[field])
 
     @classmethod
     def get_resource_url(cls, resource, base_url):
@@ -131,19 +199,27 @@ class BaseResource(object):
 
         http://myapi.com/api/resource/1
 
+        The URL is built and validated once per resource and base URL.
+
         Args:
             resource: The resource class instance
             base_url: The Base URL of this API service.
         returns:
             resource_url: The URL for this resource
         """
-        if resource.Meta.resource_name:
-            url = '{}/{}'.format(base_url, resource.Meta.resource_name)
-        else:
-            p = inflect.engine()
-            plural_name = p.plural(resource.Meta.name.lower())
-            url = '{}/{}'.format(base_url, plural_name)
-        return cls._parse_url_and_validate(url)
+        urls = resource.__dict__.get('_resource_urls')
+        if urls is None:
+            urls = {}
+            setattr(resource, '_resource_urls', urls)
+        url = urls.get(base_url)
+        if url is None:
+            if resource.Meta.resource_name:
+                url = '{}/{}'.format(base_url, resource.Meta.resource_name)
+            else:
+                plural_name = _inflect.plural(resource.Meta.name.lower())
+                url = '{}/{}'.format(base_url, plural_name)
+            url = urls[base_url] = cls._parse_url_and_validate(url)
+        return url
 
     @classmethod
     def get_url(cls, url, uid, **kwargs):
@@ -152,6 +228,9 @@ class BaseResource(object):
 
         http://myapi.com/api/resource/1
 
+        The url has already been validated by `get_resource_url`, so
+        only the percent-encoded uid is appended to it.
+
         Args:
             url: The url for this resource
             uid: The unique identifier for an individual resource
@@ -160,10 +239,34 @@ class BaseResource(object):
             final_url: The URL for this individual resource
         """
         if uid:
-            url = '{}/{}'.format(url, uid)
-        else:
-            url = url
-        return cls._parse_url_and_validate(url)
+            return url + '/' + quote_value(uid)
+        return url
+
+    @classmethod
+    def get_fields_url(cls, url, fields):
+        """
+        Add a projection query for a subset of fields to a URL.
+
+        http://myapi.com/api/resource/1?fields=name,slug
+
+        Args:
+            url: The url for this resource
+            fields: A list of attribute names to request
+        returns:
+            final_url: The URL with the projection query added
+        """
+        template = getattr(cls.Meta, 'fields_template', 'fields={}')
+        query = template.format(
+            ','.join(quote_value(field) for field in fields))
+        separator = '&' if '?' in url else '?'
+        return '{}{}{}'.format(url, separator, query)
+
+    def to_dict(self):
+        """
+        The attributes, subresources and related links of this resource
+        as plain data. See beckett.serializers.
+        """
+        return get_serializer(type(self)).to_dict(self)
 
     @staticmethod
     def get_method_name(resource, method_type):
@@ -202,10 +305,149 @@ class HypermediaResource(BaseResource, HTTPHypermediaClient):
         # HypermediaResource requires a base_url attribute
         base_url = NotImplemented
         related_resources = ()
+        # The number of related URLs fetched at once by expand()
+        related_concurrency = 8
+        # The transport that sends requests, see beckett.transports
+        transport = None
+        # A MetricsRegistry to record traffic metrics in, see beckett.metrics
+        metrics = None
+        # Tune the related requests in flight at once with 'aimd' or
+        # 'vegas', or share an AdaptiveLimiter, see beckett.limits
+        concurrency_limit = None
+        initial_concurrency = DEFAULT_INITIAL_LIMIT
+        min_concurrency = DEFAULT_MIN_LIMIT
+        max_concurrency = DEFAULT_MAX_LIMIT
 
     def __init__(self, *args, **kwargs):
         super(HypermediaResource, self).__init__(*args, **kwargs)
         self.session = requests.Session()
+        self.transport = self.get_class_transport(self.session)
+        self.metrics = getattr(self.Meta, 'metrics', None)
+        self.limiter = self.get_class_limiter()
+
+    @classmethod
+    def get_class_transport(cls, session):
+        """
+        Return the transport for an instance of this class to send
+        requests with.
+
+        A transport class or factory declared on the Meta is only called
+        once per resource class, so every instance, including the ones
+        built from responses, shares its connections.
+        """
+        declared = getattr(cls.Meta, 'transport', None)
+        if declared is None or isinstance(declared, BaseTransport):
+            return make_transport(cls.Meta, session)
+        built = cls.__dict__.get('_class_transport')
+        if built is None or built[0] is not declared:
+            with _class_lock:
+                built = cls.__dict__.get('_class_transport')
+                if built is None or built[0] is not declared:
+                    built = (declared, make_transport(cls.Meta, session))
+                    cls._class_transport = built
+        return built[1]
+
+    @classmethod
+    def get_class_limiter(cls):
+        """
+        Return the limiter for the requests of this class.
+
+        A limiter declared by policy is only built once per resource
+        class, so every instance, including the ones built from
+        responses, tunes the same limit.
+        """
+        declared = getattr(cls.Meta, 'concurrency_limit', None)
+        if declared is None or isinstance(declared, AdaptiveLimiter):
+            return declared
+        built = cls.__dict__.get('_class_limiter')
+        if built is None or built[0] is not declared:
+            with _class_lock:
+                built = cls.__dict__.get('_class_limiter')
+                if built is None or built[0] is not declared:
+                    built = (declared, make_limiter(cls.Meta))
+                    cls._class_limiter = built
+        return built[1]
+
+    def get_related_links(self, relations=None):
+        """
+        Return the related links matched on this resource.
+
+        Args:
+            relations: An optional list of attribute names to filter by
+        Returns:
+            links: A dictionary of attribute names and
+                   (resource class, URL or list of URLs) tuples
+        """
+        links = self.__dict__.get('_related_links', {})
+        if relations is None:
+            return links
+        return dict((k, v) for k, v in links.items() if k in relations)
+
+    def expand(self, depth=1, relations=None, deadline=None, **kwargs):
+        """
+        Fetch the related resources of this resource, breadth first,
+        and set them as attributes in place of their URLs.
+
+        Each level of the graph is fetched concurrently, and every URL is
+        only fetched once. Resources linked from several places are
+        the same instance.
+
+        Args:
+            depth: How many levels of related resources to fetch
+            relations: An optional list of attribute names to follow
+            deadline: An optional number of seconds, or Deadline, that the
+                      whole expansion must finish within
+            kwargs: Passed into each related resource call
+        Returns:
+            self: This resource, with its related resources expanded
+        """
+        kwargs['deadline'] = Deadline.coerce(deadline)
+        identity_map = {}
+        frontier = [self]
+        workers = getattr(self.Meta, 'related_concurrency', 8)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in range(depth):
+                pending = {}
+                for node in frontier:
+                    for resource, urls in node.get_related_links(
+                            relations).values():
+                        if not isinstance(urls, list):
+                            urls = [urls]
+                        for url in urls:
+                            if url not in identity_map:
+                                pending[url] = resource
+                futures = dict(
+                    (url, executor.submit(
+                        self._call_api_single_related_resource,
+                        resource, url,
+                        self.get_method_name(resource, 'get'),
+                        **kwargs))
+                    for url, resource in pending.items()
+                )
+                for url, future in futures.items():
+                    result = future.result()
+                    identity_map[url] = result[0] if len(
+                        result) == 1 else result
+                next_frontier = []
+                for node in frontier:
+                    links = node.get_related_links(relations)
+                    for key, (resource, urls) in links.items():
+                        if isinstance(urls, list):
+                            value = [identity_map[url] for url in urls]
+                        else:
+                            value = identity_map[urls]
+                        setattr(node, key, value)
+                for url in futures:
+                    result = identity_map[url]
+                    if not isinstance(result, list):
+                        result = [result]
+                    next_frontier.extend(
+                        x for x in result
+                        if isinstance(x, HypermediaResource))
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+        return self
 
     def set_related_method(self, resource, full_resource_url):
         """
@@ -246,6 +488,7 @@ class HypermediaResource(BaseResource, HTTPHypermediaClient):
             valid_values: The values that are valid
         """
         valid_values = {}
+        links = self.__dict__.setdefault('_related_links', {})
         for resource in self.Meta.related_resources:
             for k, v in url_values.items():
                 resource_url = resource.get_resource_url(
@@ -254,9 +497,11 @@ class HypermediaResource(BaseResource, HTTPHypermediaClient):
                     if all([resource_url in i for i in v]):
                         self.set_related_method(resource, v)
                         valid_values[k] = v
+                        links[k] = (resource, v)
                 elif resource_url in v:
                     self.set_related_method(resource, v)
                     valid_values[k] = v
+                    links[k] = (resource, v)
         return valid_values
 
     def set_attributes(self, **kwargs):
@@ -288,12 +533,13 @@ class HypermediaResource(BaseResource, HTTPHypermediaClient):
         for k in assigned_values.keys():
             kwargs.pop(k, None)
         # Assign the rest as attributes.
-        for field, value in kwargs.items():
-            if field in self.Meta.attributes:
-                setattr(self, field, value)
+        kwargs = self.convert_attributes(kwargs)
+        for field in self.Meta.attributes:
+            if field in kwargs:
+                setattr(self, field, kwargs[field])
 
 
-class SubResource(object):
+class SubResource(TypedAttributesMixin):
     """
     A "mini resource" within a larger resource. Similarly to BaseResource but
     minus some features.
@@ -319,8 +565,16 @@ class SubResource(object):
         identifier = 'id'
         # Acceptable attributes that you want to display in this resource.
         attributes = (identifier,)
+        # Optional types to convert attributes into, i.e. {'price': 'decimal'}
+        attribute_types = {}
+        # Attributes whose string values are shared, see BaseResource
+        intern_fields = ()
+        # Keep the data each instance was built from, see BaseResource
+        keep_raw_data = False
 
     def __init__(self, **kwargs):
+        if getattr(self.Meta, 'keep_raw_data', False):
+            self._raw_data = kwargs
         self.set_attributes(**kwargs)
 
     def __str__(self):
@@ -331,6 +585,12 @@ class SubResource(object):
         return '<{} | {}>'.format(
             self.Meta.name, getattr(self, self.Meta.identifier, ''))
 
+    def to_dict(self):
+        """
+        The attributes of this subresource as plain data.
+        """
+        return get_serializer(type(self)).to_dict(self)
+
     def set_attributes(self, **kwargs):
         """
         Set the resource attributes from the kwargs.
@@ -339,6 +599,7 @@ class SubResource(object):
         Args:
             kwargs: Keyword arguements passed into the init of this class
         """
-        for field, value in kwargs.items():
-            if field in self.Meta.attributes:
-                setattr(self, field, value)
+        kwargs = self.convert_attributes(kwargs)
+        for field in self.Meta.attributes:
+            if field in kwargs:
+                setattr(self, field, kwargs[field])
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import threading
+
+from .cache import now
+
+# The priority classes requests are scheduled in
+INTERACTIVE = 'interactive'
+DEFAULT = 'default'
+BULK = 'bulk'
+
+# The share of the capacity each priority class gets while they all
+# have requests waiting
+DEFAULT_WEIGHTS = {
+    INTERACTIVE: 8,
+    DEFAULT: 4,
+    BULK: 1,
+}
+
+
+class _Waiter(object):
+
+    __slots__ = ('priority', 'granted', 'cancelled')
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+
+
+class RequestScheduler(object):
+    """
+    Lets at most `capacity` requests be sent at once, and shares that
+    capacity between priority classes with weighted fair queuing.
+
+    Every waiting request is tagged with a virtual finish time, its
+    cost divided by the weight of its class, counted from the later of
+    the last request dispatched and the last request queued in its class.
+    Free slots go to the smallest tag first. While every class has
+    requests waiting, each gets slots in proportion to its weight, so a
+    queue of bulk requests only delays an interactive request by a few
+    slots, and bulk requests take all of the capacity left over.
+
+    Args:
+        capacity: The most requests in flight at once
+        weights: A dictionary of priority classes and their weights
+        default_priority: The class of requests that do not name one
+    """
+
+    def __init__(self, capacity, weights=None, default_priority=DEFAULT):
+        self.capacity = capacity
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        if default_priority not in self.weights:
+            raise ValueError(
+                'Unknown default priority {!r}'.format(default_priority))
+        self.default_priority = default_priority
+        self.in_flight = 0
+        self._virtual_time = 0.0
+        self._last_finish = dict((p, 0.0) for p in self.weights)
+        self._queue = []
+        self._depths = dict((p, 0) for p in self.weights)
+        self._dispatched = dict((p, 0) for p in self.weights)
+        self._waited = dict((p, 0.0) for p in self.weights)
+        self._order = itertools.count()
+        self._condition = threading.Condition(threading.Lock())
+
+    def priority_of(self, priority):
+        """
+        The priority class of a request, checking that it exists.
+        """
+        if priority is None:
+            return self.default_priority
+        if priority not in self.weights:
+            raise ValueError('Unknown priority {!r}'.format(priority))
+        return priority
+
+    def acquire(self, priority=None, cost=1, timeout=None):
+        """
+        Wait for a slot to send a request in.
+
+        Args:
+            priority: The priority class of the request
+            cost: The relative cost of the request, i.e. higher for
+                  requests for large lists
+            timeout: The most seconds to wait, i.e. what is left of a
+                     deadline, or None to wait for as long as it takes
+        Returns:
+            priority: The priority class the slot was granted to, or
+                      None if the timeout ran out first
+        """
+        priority = self.priority_of(priority)
+        started = now()
+        with self._condition:
+            if self.in_flight < self.capacity and not self._queue:
+                self.in_flight += 1
+                self._dispatched[priority] += 1
+                return priority
+            start = max(self._virtual_time, self._last_finish[priority])
+            finish = start + float(cost) / self.weights[priority]
+            self._last_finish[priority] = finish
+            waiter = _Waiter(priority)
+            heapq.heappush(self._queue, (finish, next(self._order), waiter))
+            self._depths[priority] += 1
+            while not waiter.granted:
+                if timeout is None:
+                    self._condition.wait()
+                    continue
+                remaining = started + timeout - now()
+                if remaining <= 0:
+                    # Left in the queue, and skipped when its turn comes
+                    waiter.cancelled = True
+                    self._depths[priority] -= 1
+                    self._waited[priority] += now() - started
+                    return None
+                self._condition.wait(remaining)
+            self._waited[priority] += now() - started
+        return priority
+
+    def release(self):
+        """
+        Free the slot of a request that has finished.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        granted = False
+        while self._queue and self.in_flight < self.capacity:
+            finish, _, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            self._virtual_time = finish
+            self._depths[waiter.priority] -= 1
+            self._dispatched[waiter.priority] += 1
+            self.in_flight += 1
+            waiter.granted = True
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+    def queue_depths(self):
+        """
+        The number of requests waiting in each priority class.
+        """
+        with self._condition:
+            return dict(self._depths)
+
+    def stats(self):
+        """
+        The requests waiting, sent and the total seconds waited, for
+        each priority class.
+        """
+        with self._condition:
+            return dict(
+                (p, {
+                    'queued': self._depths[p],
+                    'dispatched': self._dispatched[p],
+                    'waited': self._waited[p],
+                })
+                for p in self.weights)
+
+
+def make_scheduler(meta):
+    """
+    Build the scheduler declared on a Meta class.
+
+    Meta.request_scheduler may be the capacity of a new scheduler, or a
+    RequestScheduler to share between clients. If it is not set,
+    requests are not scheduled.
+    """
+    scheduler = getattr(meta, 'request_scheduler', None)
+    if scheduler is None or isinstance(scheduler, RequestScheduler):
+        return scheduler
+    return RequestScheduler(
+        scheduler, weights=getattr(meta, 'priority_weights', None))
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import decimal
+import json
+
+from .converters import get_converters
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _default(value):
+    """
+    Turn the values that typed attributes hold into JSON types.
+    """
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        # Keep every digit, which a float would not
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(type(value), '__members__'):
+        # An Enum member
+        return value.value
+    if hasattr(value, 'Meta'):
+        # A related resource hydrated by expand()
+        return get_serializer(type(value)).to_dict(value, copy=False)
+    raise TypeError('{!r} is not serializable'.format(value))
+
+
+def _copy(value):
+    """
+    Copy decoded JSON, so callers can change it without changing the
+    raw data of a resource. Faster than copy.deepcopy on plain data.
+    """
+    if isinstance(value, dict):
+        return dict((k, _copy(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+class Serializer(object):
+    """
+    Turns instances of one resource class back into plain data.
+
+    Built once per resource class by `get_serializer`.
+
+    Resources with `Meta.keep_raw_data` keep the dictionary they were
+    built from. While none of their attributes or subresources have been
+    replaced since, that dictionary is passed through, copied when it
+    is handed to the caller rather than encoded.
+    """
+
+    def __init__(self, resource_class):
+        meta = resource_class.Meta
+        subresources = getattr(meta, 'subresources', None) or {}
+        self.fields = tuple(
+            f for f in meta.attributes if f not in subresources)
+        self.subresources = tuple(subresources.items())
+        self.keep_raw_data = getattr(meta, 'keep_raw_data', False)
+        pipeline = get_converters(resource_class)
+        self.converters = pipeline.by_field
+        self.intern_fields = frozenset(pipeline.intern_fields)
+
+    def unchanged(self, instance):
+        """
+        Whether an instance still holds exactly the values it was
+        built from, so its raw data can be passed through.
+        """
+        values = instance.__dict__
+        raw = values.get('_raw_data')
+        if raw is None:
+            return False
+        for field in self.fields:
+            if field not in values:
+                # Unset, or still waiting to be converted lazily
+                continue
+            value = values[field]
+            raw_value = raw.get(field)
+            if value is raw_value:
+                continue
+            # Typed and interned values were set from the raw ones
+            convert = self.converters.get(field)
+            if convert is not None:
+                if raw_value is None or value != convert(raw_value):
+                    return False
+            elif field not in self.intern_fields or value != raw_value:
+                return False
+        for name, resource in self.subresources:
+            value = values.get(name)
+            raw_value = raw.get(name)
+            if value is None or raw_value is None:
+                if value is not raw_value:
+                    return False
+                continue
+            serializer = get_serializer(resource)
+            if isinstance(value, list):
+                if len(value) != len(raw_value):
+                    return False
+            else:
+                value = [value]
+            for item in value:
+                if not serializer.unchanged(item):
+                    return False
+        return True
+
+    def to_dict(self, instance, copy=True):
+        """
+        The attributes, subresources and related links of an instance.
+
+        Raw data that is passed through is copied, unless copy is False
+        and the result is only going to be encoded.
+        """
+        values = instance.__dict__
+        if self.keep_raw_data and self.unchanged(instance):
+            raw = values['_raw_data']
+            return _copy(raw) if copy else raw
+        pending = values.get('_unconverted')
+        data = {}
+        for field in self.fields:
+            if field in values:
+                data[field] = values[field]
+            elif pending and field in pending:
+                data[field] = getattr(instance, field)
+        links = values.get('_related_links')
+        if links:
+            for key, (_, urls) in links.items():
+                # Keep the resources expand() has put in place of the URLs
+                data[key] = values.get(key, urls)
+        for name, resource in self.subresources:
+            if name not in values:
+                continue
+            value = values[name]
+            if value is None:
+                data[name] = None
+            elif isinstance(value, list):
+                to_dict = get_serializer(resource).to_dict
+                data[name] = [to_dict(item, copy) for item in value]
+            else:
+                data[name] = get_serializer(resource).to_dict(value, copy)
+        return data
+
+
+def get_serializer(resource_class):
+    """
+    Return the Serializer for a resource class, building it on first use.
+    """
+    serializer = resource_class.__dict__.get('_serializer')
+    if serializer is None:
+        serializer = Serializer(resource_class)
+        setattr(resource_class, '_serializer', serializer)
+    return serializer
+
+
+def to_dict(resources, copy=True):
+    """
+    Turn a resource, or a list of resources, into plain data.
+    Raw data that is passed through is copied unless copy is False.
+    """
+    if isinstance(resources, list):
+        if not resources:
+            return []
+        # Lists from a client hold a single resource class
+        to_dict = get_serializer(type(resources[0])).to_dict
+        first = type(resources[0])
+        return [
+            to_dict(x, copy) if type(x) is first
+            else get_serializer(type(x)).to_dict(x, copy)
+            for x in resources
+        ]
+    return get_serializer(type(resources)).to_dict(resources, copy)
+
+
+def to_json(resources):
+    """
+    Serialize a resource, or a list of resources, as JSON bytes.
+    """
+    # Encoding leaves the data alone, so raw data needs no copy
+    return json.dumps(
+        to_dict(resources, copy=False), separators=(',', ':'), default=_default
+    ).encode('utf-8')
+
+
+def to_msgpack(resources):
+    """
+    Serialize a resource, or a list of resources, as msgpack bytes.
+    Requires the msgpack package.
+    """
+    if msgpack is None:
+        raise ImportError('to_msgpack requires the msgpack package')
+    return msgpack.packb(
+        to_dict(resources, copy=False), default=_default, use_bin_type=True)
@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+
+"""
+A compact binary format for lists of resources, to share materialized
+responses between processes without pickling them.
+
+A snapshot is laid out by the resource's Meta.attributes and
+Meta.subresources. Every attribute is stored as a column: a table of
+its distinct values, so repeated strings are stored once, and an array
+with the index of each resource's value in that table. Subresources
+are stored as nested snapshots.
+
+Values that JSON has no type for are tagged in the tables. Enum members
+are stored by value and converted back by the attribute's type.
+"""
+
+import datetime
+import decimal
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from .converters import get_converters, to_date, to_datetime
+
+MAGIC = b'BKSN'
+VERSION = 1
+
+# The array typecode of a 32 bit unsigned index
+INDEX_TYPE = 'I' if array('I').itemsize == 4 else 'L'
+
+# Columns of plain integers are stored as 64 bit values, where supported
+try:
+    INT_TYPE = 'q'
+    array(INT_TYPE)
+except ValueError:
+    # Py2
+    INT_TYPE = None
+INT_RANGE = (-2 ** 63, 2 ** 63)
+
+# Index values with a special meaning
+MISSING = 0xFFFFFFFF
+NONE = 0xFFFFFFFE
+LIST = 0xFFFFFFFD
+
+_PREFIX = struct.Struct('<4sII')
+
+try:
+    _tobytes = array.tobytes
+except AttributeError:
+    # Py2
+    _tobytes = array.tostring
+
+# Whether index arrays can be read in place, as Py2 memoryviews can
+# not be cast
+_CAST = hasattr(memoryview, 'cast')
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    # Py2
+    _intern = intern  # noqa: F821
+
+
+class _Missing(object):
+    """
+    Marks an attribute that a resource did not have.
+    """
+
+
+_MISSING = _Missing()
+
+
+def _encode_value(value, typed=False):
+    """
+    Tag the values JSON has no type for, so they can be restored.
+    """
+    if isinstance(value, datetime.datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {'$dec': str(value)}
+    if isinstance(value, list):
+        return [_encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {'$o': dict((k, _encode_value(v)) for k, v in value.items())}
+    if hasattr(type(value), '__members__'):
+        if not typed:
+            raise TypeError(
+                'Enum members can only be stored as the value of an '
+                'attribute in Meta.attribute_types, not {!r}'.format(value))
+        # Stored by value, and converted back by the attribute's type
+        return {'$e': _encode_value(value.value)}
+    return value
+
+
+def _decode_value(value, convert=None):
+    if isinstance(value, list):
+        return [_decode_value(v) for v in value]
+    if isinstance(value, dict):
+        if '$o' in value:
+            return dict(
+                (k, _decode_value(v)) for k, v in value['$o'].items())
+        if '$dt' in value:
+            return to_datetime(value['$dt'])
+        if '$d' in value:
+            return to_date(value['$d'])
+        if '$dec' in value:
+            return decimal.Decimal(value['$dec'])
+        if '$e' in value:
+            return convert(_decode_value(value['$e']))
+    return value
+
+
+def _layout(resource_class):
+    meta = resource_class.Meta
+    subresources = getattr(meta, 'subresources', None) or {}
+    fields = tuple(f for f in meta.attributes if f not in subresources)
+    return fields, tuple(subresources.items())
+
+
+class _Writer(object):
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        # Keep every chunk 4 byte aligned, so index arrays can be
+        # read straight out of a memory map.
+        offset = self.size
+        padding = -len(data) % 4
+        self.chunks.append(data)
+        if padding:
+            self.chunks.append(b'\0' * padding)
+        self.size += len(data) + padding
+        return [offset, len(data)]
+
+    def write_index(self, values):
+        return self.write(_tobytes(array(INDEX_TYPE, values)))
+
+    def write_ints(self, values):
+        return self.write(_tobytes(array(INT_TYPE, values)))
+
+
+def _int_column(values):
+    """
+    Whether a column can be stored as plain 64 bit integers.
+    """
+    if INT_TYPE is None or not values:
+        return False
+    low, high = INT_RANGE
+    for value in values:
+        if type(value) is not int or not low <= value < high:
+            return False
+    return True
+
+
+def _get(instance, field):
+    values = instance.__dict__
+    if field in values:
+        return values[field]
+    pending = values.get('_unconverted')
+    if pending and field in pending:
+        # Store lazily typed values converted
+        return getattr(instance, field)
+    return _MISSING
+
+
+def _dump_block(writer, resource_class, resources):
+    fields, subresources = _layout(resource_class)
+    typed = get_converters(resource_class).by_field
+    columns = []
+    for field in fields:
+        column = [_get(instance, field) for instance in resources]
+        if _int_column(column):
+            # Unique values, such as identifiers, gain nothing from a table
+            columns.append({'name': field, 'ints': writer.write_ints(column)})
+            continue
+        table = []
+        positions = {}
+        indexes = []
+        missing = False
+        for value in column:
+            if value is _MISSING:
+                indexes.append(MISSING)
+                missing = True
+                continue
+            # 1, 1.0 and True are equal, but must not share a value
+            key = (type(value), value)
+            try:
+                position = positions.get(key)
+            except TypeError:
+                # Unhashable values, such as lists, are never shared
+                position = None
+                hashable = False
+            else:
+                hashable = True
+            if position is None:
+                position = len(table)
+                table.append(_encode_value(value, field in typed))
+                if hashable:
+                    positions[key] = position
+            indexes.append(position)
+        if not table:
+            # No resource has this attribute
+            continue
+        columns.append({
+            'name': field,
+            'missing': missing,
+            'table': writer.write(json.dumps(
+                table, separators=(',', ':')).encode('utf-8')),
+            'index': writer.write_index(indexes),
+        })
+    nested = []
+    for name, child_class in subresources:
+        children = []
+        indexes = []
+        starts = [0]
+        many = False
+        for instance in resources:
+            value = _get(instance, name)
+            if value is _MISSING:
+                indexes.append(MISSING)
+            elif value is None:
+                indexes.append(NONE)
+            elif isinstance(value, list):
+                many = True
+                indexes.append(LIST)
+                children.extend(value)
+            else:
+                indexes.append(len(children))
+                children.append(value)
+            starts.append(len(children))
+        entry = {
+            'name': name,
+            'many': many,
+            'index': writer.write_index(indexes),
+            'block': _dump_block(writer, child_class, children),
+        }
+        if many:
+            entry['starts'] = writer.write_index(starts)
+        nested.append(entry)
+    return {'rows': len(resources), 'columns': columns, 'subresources': nested}
+
+
+def dumps(resources, resource_class=None):
+    """
+    Write a list of resources into snapshot bytes.
+
+    Args:
+        resources: A list of resources of a single class
+        resource_class: The resource class, if the list may be empty
+    """
+    if resource_class is None:
+        resource_class = type(resources[0])
+    writer = _Writer()
+    header = _dump_block(writer, resource_class, resources)
+    header['byteorder'] = sys.byteorder
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-len(header) % 4)
+    return b''.join(
+        [_PREFIX.pack(MAGIC, VERSION, len(header)), header] + writer.chunks)
+
+
+def dump(resources, path, resource_class=None):
+    """
+    Write a list of resources into a snapshot file.
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(resources, resource_class))
+
+
+class _Block(object):
+    """
+    Reads the resources of one class out of a snapshot, decoding
+    each column the first time it is needed.
+    """
+
+    def __init__(self, buffer, start, header, resource_class, swap):
+        self.buffer = buffer
+        self.start = start
+        self.header = header
+        self.resource_class = resource_class
+        self.swap = swap
+        self.rows = header['rows']
+        self._columns = None
+        self._subresources = None
+        if hasattr(resource_class, 'call_api'):
+            raise TypeError(
+                'HypermediaResources can not be loaded from snapshots')
+        self._init_map = hasattr(resource_class, 'set_subresources')
+        self._subresource_map = getattr(
+            resource_class.Meta, 'subresources', None) or {}
+
+    def _bytes(self, location):
+        offset, length = location
+        offset += self.start
+        return self.buffer[offset:offset + length]
+
+    def _index(self, location, typecode=INDEX_TYPE):
+        offset, length = location
+        offset += self.start
+        if _CAST and not self.swap:
+            view = memoryview(self.buffer)[offset:offset + length]
+            return view.cast(typecode)
+        values = array(typecode, bytes(self.buffer[offset:offset + length]))
+        if self.swap:
+            values.byteswap()
+        return values
+
+    def columns(self):
+        """
+        A (name, table, indexes, missing) tuple per column. Integer
+        columns have no table, and hold their values in indexes.
+        """
+        if self._columns is None:
+            typed = get_converters(self.resource_class).by_field
+            columns = []
+            for column in self.header['columns']:
+                if 'ints' in column:
+                    columns.append((
+                        column['name'], None,
+                        self._index(column['ints'], INT_TYPE), False))
+                    continue
+                convert = typed.get(column['name'])
+                table = [
+                    _intern(v) if type(v) is str
+                    else _decode_value(v, convert)
+                    for v in json.loads(
+                        bytes(self._bytes(column['table'])).decode('utf-8'))
+                ]
+                # The missing marker goes at the end of the table
+                table.append(_MISSING)
+                columns.append((
+                    column['name'], table, self._index(column['index']),
+                    column['missing']))
+            self._columns = columns
+        return self._columns
+
+    def subresources(self):
+        if self._subresources is None:
+            nested = []
+            for entry in self.header['subresources']:
+                child_class = self._subresource_map[entry['name']]
+                block = _Block(
+                    self.buffer, self.start, entry['block'], child_class,
+                    self.swap)
+                starts = None
+                if entry['many']:
+                    starts = self._index(entry['starts'])
+                nested.append((
+                    entry['name'], self._index(entry['index']), starts, block))
+            self._subresources = nested
+        return self._subresources
+
+    def _new(self):
+        resource_class = self.resource_class
+        instance = resource_class.__new__(resource_class)
+        if self._init_map:
+            instance._subresource_map = self._subresource_map
+        return instance
+
+    def _subresource_value(self, indexes, starts, block, i):
+        position = indexes[i]
+        if position == MISSING:
+            return _MISSING
+        if position == NONE:
+            return None
+        if position == LIST:
+            return [block.get(j) for j in range(starts[i], starts[i + 1])]
+        return block.get(position)
+
+    def get(self, i):
+        """
+        Build the resource at row i.
+        """
+        instance = self._new()
+        values = instance.__dict__
+        for name, table, indexes, missing in self.columns():
+            if table is None:
+                values[name] = indexes[i]
+                continue
+            position = indexes[i]
+            if position != MISSING:
+                values[name] = table[position]
+        for name, indexes, starts, block in self.subresources():
+            value = self._subresource_value(indexes, starts, block, i)
+            if value is not _MISSING:
+                values[name] = value
+        return instance
+
+    def load(self):
+        """
+        Build every resource, one column at a time.
+        """
+        rows = self.rows
+        names = []
+        values = []
+        missing = False
+        for name, table, indexes, has_missing in self.columns():
+            names.append(name)
+            if table is None:
+                values.append(indexes.tolist())
+                continue
+            if has_missing:
+                last = len(table) - 1
+                values.append([
+                    table[last if p == MISSING else p] for p in indexes])
+                missing = True
+            else:
+                values.append(list(map(table.__getitem__, indexes)))
+        for name, indexes, starts, block in self.subresources():
+            children = block.load()
+            column = []
+            for i in range(rows):
+                position = indexes[i]
+                if position == MISSING:
+                    column.append(_MISSING)
+                elif position == NONE:
+                    column.append(None)
+                elif position == LIST:
+                    column.append(children[starts[i]:starts[i + 1]])
+                else:
+                    column.append(children[position])
+            names.append(name)
+            values.append(column)
+            missing = True
+        if self._init_map:
+            names.append('_subresource_map')
+            values.append([self._subresource_map] * rows)
+        if not names:
+            return [self._new() for _ in range(rows)]
+        resource_class = self.resource_class
+        new = resource_class.__new__
+        results = []
+        for row in zip(*values):
+            instance = new(resource_class)
+            if missing:
+                instance.__dict__ = dict(
+                    (k, v) for k, v in zip(names, row) if v is not _MISSING)
+            else:
+                instance.__dict__ = dict(zip(names, row))
+            results.append(instance)
+        return results
+
+
+def _read_header(buffer):
+    magic, version, length = _PREFIX.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError('Not a beckett snapshot')
+    if version != VERSION:
+        raise ValueError('Unsupported snapshot version {}'.format(version))
+    start = _PREFIX.size + length
+    header = json.loads(
+        bytes(buffer[_PREFIX.size:start]).decode('utf-8'))
+    return header, start, header.pop('byteorder') != sys.byteorder
+
+
+def loads(data, resource_class):
+    """
+    Build every resource in snapshot bytes.
+
+    The resources are built without calling __init__, so they hold the
+    values, already converted, that were dumped. They do not keep raw
+    data for serializing.
+    """
+    header, start, swap = _read_header(data)
+    return _Block(data, start, header, resource_class, swap).load()
+
+
+def load(path, resource_class):
+    """
+    Build every resource in a snapshot file.
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read(), resource_class)
+
+
+class SnapshotView(object):
+    """
+    A read only list of the resources in a snapshot file, which
+    is memory mapped. Nothing is read until it is needed, and each
+    resource is built when it is accessed.
+
+    Usage:
+
+        products = SnapshotView('products.snapshot', ProductResource)
+        len(products)
+        products[500000].name
+    """
+
+    def __init__(self, path, resource_class):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header, start, swap = _read_header(self._mmap)
+        self._block = _Block(self._mmap, start, header, resource_class, swap)
+
+    def __len__(self):
+        return self._block.rows
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._block.get(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('snapshot index out of range')
+        return self._block.get(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._block.get(i)
+
+    def load(self):
+        """
+        Build every resource in the snapshot.
+        """
+        return self._block.load()
+
+    def close(self):
+        """
+        Unmap the file. Resources already built stay usable.
+        """
+        self._block = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from .constants import HTTP_GET
+from .urls import add_query
+
+# The kinds of change a sync can report
+ADDED = 'added'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+# One change to a synced collection. `resource` is the new instance,
+# or the removed one for a deletion.
+Change = namedtuple('Change', ('kind', 'key', 'resource'))
+
+
+def _key(uid):
+    # Identifiers are compared as text, as in the identity map
+    return u'{}'.format(uid)
+
+
+class SyncedCollection(object):
+    """
+    A local copy of a resource collection, kept up to date by only
+    fetching the resources that changed since the last sync.
+
+    Usage:
+
+        products = SyncedCollection(client, ProductResource)
+        for change in products.sync():
+            ...
+        products['sluggy']
+
+    The resource's Meta says how to ask for the changes:
+
+        class ProductResource(BaseResource):
+            class Meta(BaseResource.Meta):
+                ...
+                sync_param = 'updated_since'
+                sync_field = 'updated_at'
+
+    The first sync fetches the whole collection. After that the cursor is
+    sent in the `sync_param` query parameter. The cursor is the largest
+    `sync_field` value seen so far, which defaults to the identifier, or
+    the `sync_token_key` of the last response if the API hands out sync
+    tokens. Items with a truthy `sync_deleted_field` are removed.
+    Cursor values are kept as they were received, before any
+    `attribute_types` conversion, so they are sent back unchanged.
+
+    Args:
+        client: The client to send requests with
+        resource: The resource class of the collection
+        cursor: The cursor to start from, i.e. one saved from a
+                previous run
+    """
+
+    def __init__(self, client, resource, cursor=None):
+        meta = resource.Meta
+        self.client = client
+        self.resource = resource
+        self.identifier = getattr(meta, 'identifier', None)
+        if not self.identifier:
+            raise ValueError(
+                '{} has no identifier to sync by'.format(meta.name))
+        self.param = getattr(meta, 'sync_param', None)
+        if not self.param:
+            raise ValueError('{} has no sync_param'.format(meta.name))
+        self.field = getattr(meta, 'sync_field', None) or self.identifier
+        self.token_key = getattr(meta, 'sync_token_key', None)
+        self.deleted_field = getattr(meta, 'sync_deleted_field', None)
+        self.cursor = cursor
+        self._items = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __contains__(self, uid):
+        return _key(uid) in self._items
+
+    def __getitem__(self, uid):
+        return self._items[_key(uid)]
+
+    def get(self, uid, default=None):
+        return self._items.get(_key(uid), default)
+
+    def subscribe(self, callback):
+        """
+        Call `callback(change)` for every change found by later syncs.
+        """
+        self._listeners.append(callback)
+
+    def _request(self):
+        """
+        Fetch the changes since the cursor, as decoded JSON.
+        """
+        client = self.client
+        resource = self.resource
+        base_url = client.Meta.base_url
+        if client.balancer is not None:
+            base_url = client.balancer.primary
+        url = resource.get_resource_url(resource, base_url=base_url)
+        if self.cursor is not None:
+            url = add_query(url, {self.param: self.cursor})
+        method_name = resource.get_method_name(resource, 'sync')
+        params = {
+            'headers': client.get_http_headers(
+                client.Meta.name, method_name),
+            'url': url
+        }
+        prepared_request = client.prepare_http_request(HTTP_GET, params)
+        response = client.send_http_request(
+            prepared_request, resource, method_name)
+        # The items are built by sync(), once the cursor is read
+        client._check_status(
+            response, resource.Meta.valid_status_codes, method_name)
+        return response.json() if response.content else []
+
+    def _items_of(self, data):
+        if isinstance(data, list):
+            return data
+        key = getattr(self.resource.Meta, 'pagination_key', None)
+        if isinstance(data.get(key), list):
+            return data[key]
+        return [data]
+
+    def sync(self):
+        """
+        Fetch the changes since the last sync, and merge them in.
+
+        Returns:
+            changes: A list of Changes, in the order they were received
+        """
+        with self._lock:
+            data = self._request()
+            items = self._items_of(data)
+            deleted_field = self.deleted_field
+            deleted = [
+                bool(deleted_field and item.get(deleted_field))
+                for item in items]
+            # The cursor is read from the items as they came over the
+            # wire, as building the resources converts typed values
+            cursor = self.cursor
+            if not self.token_key:
+                for item in items:
+                    value = item.get(self.field)
+                    if value is not None and (
+                            cursor is None or value > cursor):
+                        cursor = value
+            # Only the items that were added or updated are built
+            built = iter(self.client._build_resources(self.resource, [
+                item for item, gone in zip(items, deleted) if not gone
+            ]))
+            changes = []
+            for item, gone in zip(items, deleted):
+                if gone:
+                    key = _key(item.get(self.identifier))
+                    instance = self._items.pop(key, None)
+                    if instance is not None:
+                        changes.append(Change(DELETED, key, instance))
+                    continue
+                instance = next(built)
+                key = _key(getattr(instance, self.identifier))
+                kind = UPDATED if key in self._items else ADDED
+                self._items[key] = instance
+                changes.append(Change(kind, key, instance))
+            if self.token_key and isinstance(data, dict):
+                cursor = data.get(self.token_key, cursor)
+            self.cursor = cursor
+        for change in changes:
+            for callback in self._listeners:
+                callback(change)
+        return changes
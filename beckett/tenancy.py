@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import types
+from collections import OrderedDict
+
+import requests
+
+from .cache import DEFAULT_CACHE_SIZE, ResponseCache
+from .identity import IdentityMap
+
+# The default number of tenant handles a factory keeps
+DEFAULT_MAX_TENANTS = 1000
+
+
+class TenantClientFactory(object):
+    """
+    Serves many tenants of one API from a single client.
+
+    The client is built once, so its generated methods, connection pool,
+    thread pool and load balancer are shared. Each tenant gets a handle
+    that sends its own headers, i.e. its credentials, and keeps its own
+    response cache and identity map, so tenants never see each other's
+    resources.
+
+    Usage:
+
+        factory = TenantClientFactory(MyClient, max_connections=20)
+        client = factory.tenant('acme', {'Authorization': 'Bearer ...'})
+        client.get_product(uid=1)
+
+    Args:
+        client_class: The BaseClient subclass to build
+        max_connections: The most connections to keep open to each host,
+                         across all tenants. Requests wait for a free
+                         connection once they are all in use.
+        max_tenants: The most recently used tenant handles to keep
+    """
+
+    def __init__(self, client_class, max_connections=None,
+                 max_tenants=DEFAULT_MAX_TENANTS):
+        self.client = client_class()
+        if max_connections:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_maxsize=max_connections, pool_block=True)
+            self.client.session.mount('http://', adapter)
+            self.client.session.mount('https://', adapter)
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._tenants = OrderedDict()
+        self._handle_class = _tenant_class(self.client)
+
+    def __len__(self):
+        return len(self._tenants)
+
+    def tenant(self, tenant_id, headers=None):
+        """
+        Return the handle for a tenant, creating it on first use.
+
+        Args:
+            tenant_id: Anything that identifies the tenant
+            headers: HTTP headers to send with every request of the
+                     tenant. Replaces any headers given before.
+        Raises:
+            KeyError: if the tenant has no handle, i.e. it was never
+                      seen, forgotten or evicted, and no headers are
+                      given to create one with
+        """
+        with self._lock:
+            handle = self._tenants.pop(tenant_id, None)
+            if handle is None:
+                if headers is None:
+                    # A handle without the tenant's credentials would
+                    # send its requests unauthenticated
+                    raise KeyError(tenant_id)
+                handle = self._handle_class.for_tenant(
+                    self.client, tenant_id)
+            if headers is not None:
+                handle.tenant_headers = dict(headers)
+            self._tenants[tenant_id] = handle
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+            return handle
+
+    def forget(self, tenant_id):
+        """
+        Drop the handle of a tenant, along with its cached resources.
+        """
+        with self._lock:
+            self._tenants.pop(tenant_id, None)
+
+    def close(self):
+        """
+        Close the shared client.
+        """
+        with self._lock:
+            self._tenants.clear()
+        self.client.close()
+
+
+class TenantClient(object):
+    """
+    Mixed into a client class to make the handles of a
+    TenantClientFactory. Handles are not built with __init__, but share
+    the state of a built client.
+
+    The tenant's headers are passed on to the HypermediaResources a
+    handle builds, so their related resources are fetched with them too.
+    """
+
+    tenant_id = None
+    tenant_headers = {}
+
+    @classmethod
+    def for_tenant(cls, shared, tenant_id):
+        handle = object.__new__(cls)
+        state = dict(
+            (k, v) for k, v in shared.__dict__.items()
+            if k not in cls._methods)
+        handle.__dict__.update(state)
+        handle._shared = shared
+        handle.tenant_id = tenant_id
+        # Resources are cached per tenant, as they may differ per tenant
+        handle.response_cache = ResponseCache(getattr(
+            shared.Meta, 'response_cache_size', DEFAULT_CACHE_SIZE))
+        if shared.identity_map is not None:
+            handle.identity_map = IdentityMap(shared.identity_map.maxsize)
+        handle._revalidating = set()
+        handle._revalidating_lock = threading.Lock()
+        return handle
+
+    def get_http_headers(self, client_name, method_name, **kwargs):
+        headers = super(TenantClient, self).get_http_headers(
+            client_name, method_name, **kwargs)
+        headers.update(self.tenant_headers)
+        return headers
+
+    def get_executor(self):
+        return self._shared.get_executor()
+
+    def get_background_executor(self):
+        return self._shared.get_background_executor()
+
+    def close(self):
+        """
+        Clear the tenant's caches. The shared client is closed by the
+        factory.
+        """
+        self.response_cache.clear()
+
+    def __repr__(self):
+        return '<{} | {}>'.format(type(self).__name__, self.tenant_id)
+
+
+def _tenant_class(shared):
+    """
+    Build the class of the tenant handles of a client, holding the
+    methods generated on it so they are shared by every handle.
+    """
+    methods = dict(
+        (k, v.__func__) for k, v in shared.__dict__.items()
+        if isinstance(v, types.MethodType) and v.__self__ is shared)
+    attributes = dict(methods)
+    attributes['_methods'] = frozenset(methods)
+    client_class = type(shared)
+    return type(
+        client_class.__name__ + 'Tenant', (TenantClient, client_class),
+        attributes)
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import datetime
+import hashlib
+import json
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .compression import decompress_body
+from .exceptions import UnrecordedRequestError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class BaseTransport(object):
+    """
+    Sends prepared HTTP requests for a client.
+
+    Subclass this to change how requests go over the wire. Every request
+    made by `call_api` and the hypermedia methods is sent through the
+    `send` method of the client's transport.
+    """
+
+    def send(self, prepared_request, timeout=None):
+        """
+        Send a prepared request.
+
+        Args:
+            prepared_request: A prepared requests.PreparedRequest
+            timeout: None, or a (connect, read) tuple of seconds
+        returns:
+            response: A requests.Response
+        raises:
+            requests.exceptions.Timeout, requests.exceptions.ConnectionError
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release any connections held by this transport.
+        """
+
+
+class RequestsTransport(BaseTransport):
+    """
+    The default transport, sending requests with a requests.Session.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def send(self, prepared_request, timeout=None):
+        return self.session.send(prepared_request, timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class _WireBytes(object):
+    """
+    Stands in for the raw urllib3 response, so the bytes downloaded
+    can still be counted.
+    """
+
+    def __init__(self, count):
+        self.count = count
+
+    def tell(self):
+        return self.count
+
+
+def to_requests_response(response, prepared_request):
+    """
+    Convert an httpx response into a requests.Response.
+    """
+    result = requests.Response()
+    result.status_code = response.status_code
+    result.reason = response.reason_phrase
+    result.headers = CaseInsensitiveDict(response.headers.items())
+    result._content = response.content
+    # The body is already read, so close() leaves the stand-in raw alone
+    result._content_consumed = True
+    result.encoding = response.encoding
+    result.url = str(response.url)
+    result.request = prepared_request
+    result.elapsed = response.elapsed
+    result.raw = _WireBytes(response.num_bytes_downloaded)
+    result.http_version = response.http_version
+    return result
+
+
+def to_httpx_timeout(timeout):
+    if timeout is None:
+        return httpx.Timeout(None)
+    connect, read = timeout
+    return httpx.Timeout(None, connect=connect, read=read, write=read)
+
+
+class HTTP2Transport(BaseTransport):
+    """
+    Sends requests over HTTP/2 with httpx, so many concurrent requests
+    share a few multiplexed connections.
+
+    Requires the httpx and h2 packages:
+
+        pip install httpx[http2]
+
+    Args:
+        max_connections: The most connections to open to the API
+        client_kwargs: Passed into httpx.Client, i.e. `http1=False` to
+                       talk HTTP/2 to a plain text `http://` API
+    """
+
+    def __init__(self, max_connections=10, **client_kwargs):
+        if httpx is None:
+            raise ImportError(
+                'HTTP2Transport requires the httpx and h2 packages')
+        client_kwargs.setdefault('http2', True)
+        client_kwargs.setdefault('limits', httpx.Limits(
+            max_connections=max_connections))
+        self.client = httpx.Client(**client_kwargs)
+
+    def send(self, prepared_request, timeout=None):
+        request = self.client.build_request(
+            prepared_request.method,
+            prepared_request.url,
+            headers=list(prepared_request.headers.items()),
+            content=prepared_request.body,
+            timeout=to_httpx_timeout(timeout)
+        )
+        try:
+            response = self.client.send(request)
+        except httpx.ConnectTimeout as error:
+            raise requests.exceptions.ConnectTimeout(
+                error, request=prepared_request)
+        except httpx.TimeoutException as error:
+            raise requests.exceptions.ReadTimeout(
+                error, request=prepared_request)
+        except httpx.TransportError as error:
+            raise requests.exceptions.ConnectionError(
+                error, request=prepared_request)
+        return to_requests_response(response, prepared_request)
+
+    def close(self):
+        self.client.close()
+
+
+def exchange_key(method, url, body, encoding=None):
+    """
+    The key a recorded exchange is stored and looked up under.
+
+    Compressed bodies are hashed decoded, so the key does not depend
+    on how, or whether, the body was compressed.
+    """
+    if body:
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        body = decompress_body(body, encoding)
+        digest = hashlib.sha1(body).hexdigest()[:16]
+    else:
+        digest = ''
+    return '{} {} {}'.format(method, url, digest)
+
+
+class RecordingTransport(BaseTransport):
+    """
+    Sends requests with another transport, and records every exchange
+    to a file that a ReplayTransport can serve later.
+
+    The file has one JSON exchange per line.
+
+    Args:
+        path: The file to append the exchanges to
+        inner: The transport that really sends the requests. Defaults
+               to a RequestsTransport with its own session.
+    """
+
+    def __init__(self, path, inner=None):
+        if inner is None:
+            inner = RequestsTransport(requests.Session())
+        self.inner = inner
+        self.path = path
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def send(self, prepared_request, timeout=None):
+        started = time.time()
+        response = self.inner.send(prepared_request, timeout=timeout)
+        content = response.content or b''
+        try:
+            text, encoded = content.decode('utf-8'), False
+        except UnicodeDecodeError:
+            text, encoded = base64.b64encode(content).decode('ascii'), True
+        exchange = {
+            'key': exchange_key(
+                prepared_request.method, prepared_request.url,
+                prepared_request.body,
+                prepared_request.headers.get('Content-Encoding')),
+            'status': response.status_code,
+            'headers': [
+                [k, v] for k, v in response.headers.items()
+                # The content is stored decoded
+                if k.lower() not in ('content-encoding', 'content-length',
+                                     'transfer-encoding')
+            ],
+            'content': text,
+            'base64': encoded,
+            'elapsed': round(time.time() - started, 6),
+        }
+        line = json.dumps(exchange, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        self.inner.close()
+
+
+class ReplayTransport(BaseTransport):
+    """
+    Serves the exchanges recorded by a RecordingTransport from memory,
+    without touching the network.
+
+    Requests are matched on their method, URL and body. When the same
+    request was recorded several times, the recorded responses are
+    served in order, and the last one is repeated after that. Replays
+    are deterministic, so they suit benchmarks and CI.
+
+    Args:
+        path: The file of recorded exchanges
+        latency: An optional synthetic delay for every response. Either
+                 a number of seconds, 'recorded' to use the latency seen
+                 while recording, or a function of the prepared request.
+    """
+
+    def __init__(self, path, latency=None):
+        self.latency = latency
+        self._exchanges = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                exchange = json.loads(line)
+                if exchange['base64']:
+                    content = base64.b64decode(exchange['content'])
+                else:
+                    content = exchange['content'].encode('utf-8')
+                exchange['content'] = content
+                self._exchanges.setdefault(
+                    exchange['key'], []).append(exchange)
+
+    def __len__(self):
+        return sum(len(x) for x in self._exchanges.values())
+
+    def _delay(self, prepared_request, exchange):
+        if self.latency is None:
+            return 0
+        if self.latency == 'recorded':
+            return exchange['elapsed']
+        if callable(self.latency):
+            return self.latency(prepared_request)
+        return self.latency
+
+    def send(self, prepared_request, timeout=None):
+        key = exchange_key(
+            prepared_request.method, prepared_request.url,
+            prepared_request.body,
+            prepared_request.headers.get('Content-Encoding'))
+        exchanges = self._exchanges.get(key)
+        if not exchanges:
+            raise UnrecordedRequestError(
+                prepared_request.method, prepared_request.url)
+        with self._lock:
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+        exchange = exchanges[min(index, len(exchanges) - 1)]
+        delay = self._delay(prepared_request, exchange)
+        if delay:
+            time.sleep(delay)
+        response = requests.Response()
+        response.status_code = exchange['status']
+        response.headers = CaseInsensitiveDict(exchange['headers'])
+        response._content = exchange['content']
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = prepared_request.url
+        response.request = prepared_request
+        response.elapsed = datetime.timedelta(seconds=delay)
+        response.raw = _WireBytes(len(exchange['content']))
+        return response
+
+
+def make_transport(meta, session):
+    """
+    Build the transport declared on a Meta class.
+
+    Meta.transport may be a transport instance, a transport class or
+    any callable returning a transport. If it is not set, requests are
+    sent with the session.
+    """
+    transport = getattr(meta, 'transport', None)
+    if transport is None:
+        return RequestsTransport(session)
+    if isinstance(transport, BaseTransport):
+        return transport
+    return transport()
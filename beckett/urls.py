@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import re
+import sys
+
+if sys.version_info[0] == 3:
+    # Py3
+    from urllib.parse import quote
+    text_type = str
+else:
+    # Py2
+    from urllib import quote
+    text_type = unicode  # noqa: F821
+
+# Values made only of these characters never need percent-encoding
+_is_safe = re.compile(r'^[A-Za-z0-9_.~-]*$').match
+
+
+def quote_value(value):
+    """
+    Percent-encode a value for use as a single path segment or query
+    value. Plain values, such as numbers and slugs, are returned as
+    they are without calling `quote`.
+    """
+    if not isinstance(value, text_type):
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        else:
+            value = text_type(value)
+    if _is_safe(value):
+        return value
+    return quote(value.encode('utf-8'), safe='')
+
+
+def encode_query(params):
+    """
+    Encode a dictionary, or a sequence of pairs, as a query string.
+    Parameters with a value of None are left out, and lists are
+    repeated once per item.
+
+        >>> encode_query({'id': 123, 'country': 'GB'})
+        'id=123&country=GB'
+    """
+    if hasattr(params, 'items'):
+        params = params.items()
+    parts = []
+    for key, value in params:
+        if value is None:
+            continue
+        key = quote_value(key)
+        if isinstance(value, (list, tuple)):
+            parts.extend(key + '=' + quote_value(v) for v in value)
+        else:
+            parts.append(key + '=' + quote_value(value))
+    return '&'.join(parts)
+
+
+def add_query(url, params):
+    """
+    Append query parameters to a URL, which may already have a query.
+
+        >>> add_query('http://myapi.com/api/products', {'page': 2})
+        'http://myapi.com/api/products?page=2'
+    """
+    query = encode_query(params)
+    if not query:
+        return url
+    return url + ('&' if '?' in url else '?') + query
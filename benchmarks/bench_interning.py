@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the memory each materialized resource keeps, for list payloads
+shaped like the test fixtures:
+
+    before       as resources were built before Meta.intern_fields,
+                 reading __dict__ and setting attributes in payload
+                 order
+    layout only  attributes set in Meta.attributes order
+    interned     as layout only, with Meta.intern_fields
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/bench_interning.py [items]
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from beckett.converters import build_resources, get_converters
+
+from tests.fixtures import BlogResource, SubResourcePeopleResource
+
+
+class InternedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        intern_fields = ('slug', 'content')
+
+
+class InternedPeopleResource(SubResourcePeopleResource):
+
+    class Meta(SubResourcePeopleResource.Meta):
+        intern_fields = ('another_thing',)
+
+
+def blogs(count):
+    return json.dumps([
+        {
+            'id': i,
+            'title': 'Blog post {}'.format(i),
+            'slug': ['news', 'reviews', 'interviews'][i % 3],
+            'content': ['draft', 'published'][i % 2],
+        }
+        for i in range(count)
+    ])
+
+
+def people(count):
+    return json.dumps([
+        {
+            'slug': 'person-{}'.format(i),
+            'another_thing': ['GB', 'FR', 'DE', 'US'][i % 4],
+            'author': {'name': 'author-{}'.format(i % 10)},
+        }
+        for i in range(count)
+    ])
+
+
+def _marked(resource):
+    # build_resources marked the instances it had already converted
+    pipeline = get_converters(resource)
+    return bool(pipeline) and not pipeline.lazy
+
+
+def _old_layout(instance, item, marked):
+    """
+    Rebuild an instance, and its subresources, as resources were built
+    before attributes were set in declared order: with the batch
+    converted marker set first, `__dict__` read to pop it, then the
+    attributes in payload order.
+    """
+    values = instance.__dict__
+    attributes = type(instance).Meta.attributes
+    old = object.__new__(type(instance))
+    if marked:
+        old._attributes_converted = True
+    for key, value in values.items():
+        if key in attributes:
+            continue
+        if hasattr(value, 'Meta'):
+            # A single subresource was built on its own, unmarked
+            value = _old_layout(value, item[key], False)
+        elif isinstance(value, list) and value and hasattr(value[0], 'Meta'):
+            marked_items = _marked(type(value[0]))
+            value = [
+                _old_layout(x, i, marked_items)
+                for x, i in zip(value, item[key])]
+        setattr(old, key, value)
+    # Reading __dict__ makes CPython 3.11+ build a real dictionary in
+    # place of the instance's inline values
+    old.__dict__.pop('_attributes_converted', False)
+    for key in item:
+        if key in attributes and key in values:
+            setattr(old, key, values[key])
+    return old
+
+
+def build_old_layout(resource, items):
+    originals = [dict(item) for item in items]
+    return [
+        _old_layout(instance, item, _marked(resource))
+        for instance, item in zip(build_resources(resource, items), originals)
+    ]
+
+
+def bytes_per_item(build, resource, payload, count):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # Decode the payload as a client would, one response at a time
+    resources = build(resource, json.loads(payload))
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(resources) == count
+    return (after - before) / float(count)
+
+
+def main(count):
+    print('{:>28} {:>10} {:>12} {:>10}'.format(
+        '', 'before', 'layout only', 'interned'))
+    for name, plain, interned, make in (
+            ('BlogResource', BlogResource, InternedBlogResource, blogs),
+            ('SubResourcePeopleResource', SubResourcePeopleResource,
+             InternedPeopleResource, people)):
+        payload = make(count)
+        print('{:>28} {:>9.0f}B {:>11.0f}B {:>9.0f}B'.format(
+            name,
+            bytes_per_item(build_old_layout, plain, payload, count),
+            bytes_per_item(build_resources, plain, payload, count),
+            bytes_per_item(build_resources, interned, payload, count)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
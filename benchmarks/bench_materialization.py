@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Compare building list responses in the calling thread against building
+them in a pool of worker processes, to find where parallel
+materialization starts to pay off.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/bench_materialization.py [workers]
+"""
+
+import sys
+import time
+
+from beckett.converters import build_resources
+from beckett.parallel import ParallelMaterializer
+from beckett.resources import BaseResource, SubResource
+
+SIZES = (1000, 5000, 20000, 50000, 100000)
+
+
+class TagSubResource(SubResource):
+
+    class Meta(SubResource.Meta):
+        name = 'Tag'
+        identifier = 'name'
+        attributes = ('name', 'colour')
+
+
+class OrderResource(BaseResource):
+
+    class Meta(BaseResource.Meta):
+        name = 'Order'
+        attributes = ('id', 'status', 'total', 'created')
+        attribute_types = {
+            'total': 'decimal',
+            'created': 'datetime',
+        }
+        subresources = {
+            'tags': TagSubResource,
+        }
+
+
+def make_items(count):
+    return [
+        {
+            'id': i,
+            'status': 'shipped',
+            'total': '{}.99'.format(i % 500),
+            'created': '2016-06-{:02d}T10:00:00Z'.format(i % 28 + 1),
+            'tags': [
+                {'name': 'tag-{}'.format(j), 'colour': 'red'}
+                for j in range(5)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(function, size, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        # Building resources converts the items in place,
+        # so each run gets a fresh copy.
+        items = make_items(size)
+        start = time.time()
+        function(OrderResource, items)
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def main(workers):
+    materializer = ParallelMaterializer(workers, threshold=0)
+    # Start the workers before timing anything
+    materializer.build_resources(OrderResource, make_items(workers * 4))
+    print('{:>8} {:>10} {:>10} {:>8}'.format(
+        'items', 'thread', 'processes', 'speedup'))
+    for size in SIZES:
+        serial = best_of(build_resources, size)
+        parallel = best_of(materializer.build_resources, size)
+        print('{:>8} {:>9.3f}s {:>9.3f}s {:>7.2f}x'.format(
+            size, serial, parallel, serial / parallel))
+    materializer.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Compare caching a materialized list response with pickle against a
+snapshot, loaded in bulk or read lazily from a memory mapped file.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/bench_snapshots.py [items]
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from beckett import snapshots
+from beckett.converters import build_resources
+from beckett.resources import BaseResource
+
+
+class ProductResource(BaseResource):
+
+    class Meta(BaseResource.Meta):
+        name = 'Product'
+        attributes = ('id', 'name', 'status', 'price', 'created')
+        attribute_types = {
+            'price': 'decimal',
+            'created': 'datetime',
+        }
+
+
+def make_products(count):
+    return build_resources(ProductResource, [
+        {
+            'id': i,
+            'name': 'product-{}'.format(i % 1000),
+            'status': 'in_stock',
+            'price': '{}.99'.format(i % 500),
+            'created': '2016-06-{:02d}T10:00:00Z'.format(i % 28 + 1),
+        }
+        for i in range(count)
+    ])
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return result, time.time() - start
+
+
+def main(count):
+    products = make_products(count)
+    pickled, pickle_dump = timed(
+        pickle.dumps, products, pickle.HIGHEST_PROTOCOL)
+    _, pickle_load = timed(pickle.loads, pickled)
+    snapshot, snapshot_dump = timed(snapshots.dumps, products)
+    _, snapshot_load = timed(snapshots.loads, snapshot, ProductResource)
+
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(snapshot)
+    view, view_open = timed(snapshots.SnapshotView, path, ProductResource)
+    _, view_get = timed(lambda: [view[i] for i in range(0, count, 997)])
+    view.close()
+    os.remove(path)
+
+    print('{} products'.format(count))
+    print('{:>10} {:>10} {:>10} {:>10}'.format('', 'bytes', 'dump', 'load'))
+    print('{:>10} {:>10} {:>9.3f}s {:>9.3f}s'.format(
+        'pickle', len(pickled), pickle_dump, pickle_load))
+    print('{:>10} {:>10} {:>9.3f}s {:>9.3f}s'.format(
+        'snapshot', len(snapshot), snapshot_dump, snapshot_load))
+    print('View opened in {:.4f}s, {} random reads in {:.4f}s'.format(
+        view_open, len(range(0, count, 997)), view_get))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
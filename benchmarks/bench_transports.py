@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the default requests transport (HTTP/1.1) with the HTTP/2
+transport for concurrent fan-out against local stub servers, counting
+the time taken and the connections each one opens.
+
+Requires the httpx and h2 packages.
+
+Usage:
+
+    PYTHONPATH=. python benchmarks/bench_transports.py [requests] [latency]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from beckett import clients, resources
+from beckett.transports import HTTP2Transport
+
+from tests.server import H2StubServer, StubServer
+
+CONCURRENCY = (1, 10, 50)
+
+
+class ItemResource(resources.BaseResource):
+
+    class Meta(resources.BaseResource.Meta):
+        name = 'Item'
+        attributes = ('id', 'name')
+
+
+def make_client(base_url, transport=None):
+    class Meta(clients.BaseClient.Meta):
+        name = 'bench_client'
+        resources = (ItemResource,)
+    Meta.base_url = base_url
+    Meta.transport = transport
+    return type('BenchClient', (clients.BaseClient,), {'Meta': Meta})()
+
+
+def run(client, total, concurrency):
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(
+            lambda uid: client.get_item(uid=uid), range(1, total + 1)))
+    return time.time() - start
+
+
+def main(total, latency):
+    body = {'id': 1, 'name': 'item'}
+    print('{:>12} {:>12} {:>10} {:>12}'.format(
+        'transport', 'concurrency', 'seconds', 'connections'))
+    for concurrency in CONCURRENCY:
+        with StubServer(body=body, delay=latency) as server:
+            client = make_client(server.url)
+            seconds = run(client, total, concurrency)
+            client.close()
+        print('{:>12} {:>12} {:>9.3f}s {:>12}'.format(
+            'HTTP/1.1', concurrency, seconds, server.connections))
+        with H2StubServer(body=body, delay=latency) as server:
+            client = make_client(
+                server.url, HTTP2Transport(max_connections=1, http1=False))
+            seconds = run(client, total, concurrency)
+            client.close()
+        print('{:>12} {:>12} {:>9.3f}s {:>12}'.format(
+            'HTTP/2', concurrency, seconds, server.connections))
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    )
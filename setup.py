@@ -14,7 +14,8 @@ with open('README.rst') as readme_file:
 requirements = [
     'requests==2.10.0',
     'inflect==0.2.5',
-    'six==1.10.0'
+    'six==1.10.0',
+    'futures==3.0.5; python_version < "3.0"'
 ]
 
 test_requirements = [
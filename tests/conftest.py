@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+# Coroutines are a syntax error before Python 3.5
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append('test_async_resources.py')
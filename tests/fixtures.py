@@ -178,3 +178,289 @@ class SubResourcePeopleResource(resources.BaseResource):
         subresources = {
             "author": AuthorSubResource
         }
+
+
+# Typed attribute tests
+
+class TypedProductResource(resources.BaseResource):
+
+    class Meta(resources.BaseResource.Meta):
+        name = 'Product'
+        identifier = 'id'
+        attributes = (
+            'id',
+            'price',
+            'created',
+            'stock',
+        )
+        attribute_types = {
+            'id': 'int',
+            'price': 'decimal',
+            'created': 'datetime',
+            'stock': lambda v: v * 10,
+        }
+        methods = (
+            'get',
+        )
+
+
+class LazyTypedProductResource(TypedProductResource):
+
+    class Meta(TypedProductResource.Meta):
+        lazy_attribute_types = True
+
+
+class InternedProductResource(resources.BaseResource):
+
+    class Meta(resources.BaseResource.Meta):
+        name = 'Product'
+        identifier = 'id'
+        attributes = (
+            'id',
+            'status',
+            'country',
+        )
+        intern_fields = ('status', 'country')
+        methods = (
+            'get',
+        )
+
+
+class TypedProductTestClient(clients.BaseClient):
+
+    class Meta(clients.BaseClient.Meta):
+        name = 'test_typed_client'
+        base_url = 'http://dev/api'
+        resources = (
+            TypedProductResource,
+        )
+
+
+# Compression tests
+
+class CompressedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        request_compression = 'gzip'
+        request_compression_threshold = 64
+
+
+class CompressedBlogTestClient(clients.BaseClient):
+
+    class Meta(clients.BaseClient.Meta):
+        name = 'test_compressed_blog_client'
+        base_url = 'http://dev/api'
+        accept_encoding = ('gzip', 'deflate')
+        resources = (
+            CompressedBlogResource,
+        )
+
+
+# Parallel materialization tests
+
+class ParallelTestClient(clients.BaseClient):
+
+    class Meta(clients.BaseClient.Meta):
+        name = 'test_parallel_client'
+        base_url = 'http://dev/api'
+        materialization_workers = 2
+        parallel_materialization_threshold = 10
+        materialization_chunk_size = 3
+        resources = (
+            SubResourcePeopleResource,
+        )
+
+
+# Hypermedia expansion tests
+
+class HypermediaCountriesResource(resources.HypermediaResource):
+
+    class Meta(resources.HypermediaResource.Meta):
+        name = 'Countries'
+        resource_name = 'countries'
+        base_url = 'http://dev/api'
+        identifier = 'name'
+        attributes = (
+            'name',
+        )
+
+
+class HypermediaWritersResource(resources.HypermediaResource):
+
+    class Meta(resources.HypermediaResource.Meta):
+        name = 'Writers'
+        resource_name = 'writers'
+        base_url = 'http://dev/api'
+        identifier = 'name'
+        attributes = (
+            'name',
+            'country',
+        )
+        related_resources = (
+            HypermediaCountriesResource,
+        )
+
+
+class HypermediaBooksResource(resources.HypermediaResource):
+
+    class Meta(resources.HypermediaResource.Meta):
+        name = 'Books'
+        resource_name = 'books'
+        base_url = 'http://dev/api'
+        identifier = 'title'
+        attributes = (
+            'title',
+            'writers',
+        )
+        related_resources = (
+            HypermediaWritersResource,
+        )
+
+
+class HypermediaBooksTestClient(clients.BaseClient):
+
+    class Meta(clients.BaseClient.Meta):
+        name = 'test_hyper_books_client'
+        base_url = 'http://dev/api'
+        resources = (
+            HypermediaBooksResource,
+        )
+
+
+# Identity map tests
+
+class IdentityMapBlogTestClient(clients.BaseClient):
+
+    class Meta(clients.BaseClient.Meta):
+        name = 'test_identity_blog_client'
+        base_url = 'http://dev/api'
+        identity_map_size = 2
+        resources = (
+            BlogResource,
+        )
+
+
+# Response cache tests
+
+class CachedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        cache_ttl = 60
+
+
+class RevalidatedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        cache_ttl = 0.1
+        cache_hard_ttl = 60
+
+
+class CachedBlogTestClient(clients.BaseClient):
+
+    class Meta(clients.BaseClient.Meta):
+        name = 'test_cached_blog_client'
+        base_url = 'http://dev/api'
+        resources = (
+            CachedBlogResource,
+        )
+
+
+# Incremental sync tests
+
+class SyncedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        sync_param = 'updated_since'
+        sync_field = 'updated'
+        sync_deleted_field = 'deleted'
+
+
+class TypedSyncedBlogResource(SyncedBlogResource):
+
+    class Meta(SyncedBlogResource.Meta):
+        attributes = BlogResource.Meta.attributes + ('updated',)
+        attribute_types = {
+            'updated': 'datetime',
+        }
+
+
+class TokenSyncedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        sync_param = 'token'
+        sync_token_key = 'next_token'
+
+
+# Scheduling tests
+
+class BulkBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        priority = 'bulk'
+
+
+# Timeout and deadline tests
+
+class TimeoutBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        connect_timeout = 1
+        read_timeout = 0.2
+
+
+def make_client(base_url, resource, **meta):
+    """
+    Build a client for a single resource against a base_url,
+    such as a local StubServer.
+    """
+    attributes = dict(
+        name='test_{}_client'.format(resource.Meta.name.lower()),
+        base_url=base_url,
+        resources=(resource,),
+    )
+    attributes.update(meta)
+    Meta = type('Meta', (clients.BaseClient.Meta,), attributes)
+    return type('StubTestClient', (clients.BaseClient,), {'Meta': Meta})()
+
+
+# Hedging tests
+
+class HedgedBlogResource(BlogResource):
+
+    class Meta(BlogResource.Meta):
+        hedge_after = 0.05
+
+
+# Serializer tests
+
+class RawAuthorSubResource(AuthorSubResource):
+
+    class Meta(AuthorSubResource.Meta):
+        keep_raw_data = True
+
+
+class RawTypedProductResource(TypedProductResource):
+
+    class Meta(TypedProductResource.Meta):
+        keep_raw_data = True
+
+
+class RawLazyTypedProductResource(RawTypedProductResource):
+
+    class Meta(RawTypedProductResource.Meta):
+        lazy_attribute_types = True
+
+
+class RawInternedProductResource(InternedProductResource):
+
+    class Meta(InternedProductResource.Meta):
+        keep_raw_data = True
+
+
+class RawPeopleResource(SubResourcePeopleResource):
+
+    class Meta(SubResourcePeopleResource.Meta):
+        keep_raw_data = True
+        subresources = {
+            'author': RawAuthorSubResource
+        }
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+"""
+A small local HTTP server for tests that need real sockets,
+such as timeouts and changing latency.
+"""
+
+import json
+import socket
+import threading
+import time
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.socketserver import ThreadingMixIn
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    # Keep connections alive between requests
+    protocol_version = 'HTTP/1.1'
+    # Send responses straight away, rather than waiting for the
+    # delayed ACK of the headers on a kept alive connection
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            number = server.requests
+            server.paths.append(self.path)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            self._reply(number)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _reply(self, number):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        delay = server.delay
+        if callable(delay):
+            delay = delay(number)
+        time.sleep(delay)
+        status, body = server.status, server.body
+        if callable(body):
+            body = body(self.path)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """
+    Serves `body` as JSON with `status` after sleeping for `delay`
+    seconds. All three can be changed while the server is running.
+    `delay` can also be a function of the request number, counting from 1.
+    `max_active` is the most requests it has handled at once.
+
+    Usage:
+
+        with StubServer(body={'id': 1}) as server:
+            requests.get(server.url + '/blogs/1')
+    """
+
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, body=None, status=200, delay=0.0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.body = body if body is not None else {}
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self.paths = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get_request(self):
+        with self.lock:
+            self.connections += 1
+        return HTTPServer.get_request(self)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class H2StubServer(object):
+    """
+    A plain text HTTP/2 server that serves `body` as JSON after `delay`
+    seconds, counting the connections and requests it receives.
+    Requires the h2 package.
+
+    Usage:
+
+        with H2StubServer(body={'id': 1}) as server:
+            ...
+    """
+
+    def __init__(self, body=None, delay=0.0):
+        self.body = body if body is not None else {}
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen(16)
+        self._running = False
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self._socket.getsockname()[1])
+
+    def __enter__(self):
+        self._running = True
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._running = False
+        self._socket.close()
+
+    def _accept(self):
+        while self._running:
+            try:
+                connection, _ = self._socket.accept()
+            except socket.error:
+                return
+            with self.lock:
+                self.connections += 1
+            thread = threading.Thread(target=self._serve, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _respond(self, h2_connection, connection, send_lock, stream_id):
+        time.sleep(self.delay)
+        data = json.dumps(self.body).encode('utf-8')
+        with send_lock:
+            h2_connection.send_headers(stream_id, [
+                (':status', '200'),
+                ('content-type', 'application/json'),
+                ('content-length', str(len(data))),
+            ])
+            h2_connection.send_data(stream_id, data, end_stream=True)
+            connection.sendall(h2_connection.data_to_send())
+
+    def _serve(self, connection):
+        import h2.config
+        import h2.connection
+        import h2.events
+        h2_connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False))
+        send_lock = threading.Lock()
+        with send_lock:
+            h2_connection.initiate_connection()
+            connection.sendall(h2_connection.data_to_send())
+        while self._running:
+            try:
+                data = connection.recv(65535)
+            except socket.error:
+                break
+            if not data:
+                break
+            with send_lock:
+                events = h2_connection.receive_data(data)
+                connection.sendall(h2_connection.data_to_send())
+            for event in events:
+                if isinstance(event, h2.events.StreamEnded):
+                    with self.lock:
+                        self.requests += 1
+                    thread = threading.Thread(
+                        target=self._respond,
+                        args=(h2_connection, connection, send_lock,
+                              event.stream_id))
+                    thread.daemon = True
+                    thread.start()
+        connection.close()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_async_resources
+----------------------------------
+
+Tests for `beckett.async_resources` module.
+"""
+
+import asyncio
+import inspect
+import json
+
+import pytest
+
+import requests
+
+from beckett.transports import BaseTransport
+
+httpx = pytest.importorskip('httpx')
+
+from beckett.async_resources import AsyncHypermediaResource  # noqa: E402
+
+
+class AsyncCountriesResource(AsyncHypermediaResource):
+
+    class Meta(AsyncHypermediaResource.Meta):
+        name = 'Countries'
+        resource_name = 'countries'
+        base_url = 'http://dev/api'
+        identifier = 'name'
+        attributes = (
+            'name',
+        )
+
+
+class AsyncWritersResource(AsyncHypermediaResource):
+
+    class Meta(AsyncHypermediaResource.Meta):
+        name = 'Writers'
+        resource_name = 'writers'
+        base_url = 'http://dev/api'
+        identifier = 'name'
+        attributes = (
+            'name',
+            'country',
+        )
+        related_resources = (
+            AsyncCountriesResource,
+        )
+
+
+class AsyncBooksResource(AsyncHypermediaResource):
+
+    class Meta(AsyncHypermediaResource.Meta):
+        name = 'Books'
+        resource_name = 'books'
+        base_url = 'http://dev/api'
+        identifier = 'title'
+        related_concurrency = 2
+        attributes = (
+            'title',
+            'writers',
+        )
+        related_resources = (
+            AsyncWritersResource,
+        )
+
+
+WRITERS = {
+    '/api/writers/1': {
+        'name': 'Ernest', 'country': 'http://dev/api/countries/us'},
+    '/api/writers/2': {
+        'name': 'Scott', 'country': 'http://dev/api/countries/us'},
+    '/api/writers/3': {
+        'name': 'Gertrude', 'country': 'http://dev/api/countries/us'},
+    '/api/countries/us': {'name': 'United States'},
+}
+
+
+class FakeAPI(object):
+    """
+    Serves WRITERS after a short sleep, counting the requests
+    and the most that were in flight at once.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def __call__(self, request):
+        self.paths.append(request.url.path)
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        data = json.dumps(WRITERS[request.url.path]).encode('utf-8')
+        return httpx.Response(200, stream=httpx.ByteStream(data))
+
+
+def make_books(api):
+    instance = AsyncBooksResource(
+        title='A Moveable Feast',
+        writers=[
+            'http://dev/api/writers/1',
+            'http://dev/api/writers/2',
+            'http://dev/api/writers/3',
+            'http://dev/api/writers/1',
+        ])
+    instance.async_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(api))
+    return instance
+
+
+def test_related_getters_are_coroutines():
+    """
+    Related getters return awaitables, and the resources they return
+    share the client of the resource that fetched them.
+    """
+    api = FakeAPI()
+
+    async def traverse():
+        async with make_books(api) as instance:
+            call = instance.get_writers()
+            assert inspect.iscoroutine(call)
+            writers = await call
+            country = await writers[0].get_countries()
+            assert writers[0].async_client is instance.async_client
+            return writers, country
+
+    writers, country = asyncio.run(traverse())
+    assert [x.name for x in writers] == [
+        'Ernest', 'Scott', 'Gertrude', 'Ernest']
+    assert isinstance(writers[0], AsyncWritersResource)
+    assert isinstance(country[0], AsyncCountriesResource)
+    assert country[0].name == 'United States'
+
+
+def test_related_lists_are_gathered_under_the_concurrency_cap():
+    """
+    List valued links are fetched concurrently, at most
+    Meta.related_concurrency at a time.
+    """
+    api = FakeAPI()
+
+    async def traverse():
+        async with make_books(api) as instance:
+            return await instance.get_writers()
+
+    asyncio.run(traverse())
+    assert len(api.paths) == 4
+    assert api.most_in_flight == 2
+
+
+def test_expand_fetches_each_url_once():
+    """
+    expand() walks the graph on the event loop, fetching every URL once
+    """
+    api = FakeAPI()
+
+    async def traverse():
+        async with make_books(api) as instance:
+            return await instance.expand(depth=2)
+
+    instance = asyncio.run(traverse())
+    assert sorted(api.paths) == [
+        '/api/countries/us', '/api/writers/1', '/api/writers/2',
+        '/api/writers/3']
+    first, second, third, again = instance.writers
+    assert first is again
+    assert first.country is third.country
+    assert first.country.name == 'United States'
+
+
+def test_only_the_fetching_resource_closes_the_shared_client():
+    """
+    Closing a related resource leaves the client of the graph open
+    """
+    api = FakeAPI()
+
+    async def traverse():
+        async with make_books(api) as instance:
+            writers = await instance.get_writers()
+            await writers[0].aclose()
+            assert not instance.async_client.is_closed
+            await writers[1].get_countries()
+            client = instance.async_client
+        return client
+
+    assert asyncio.run(traverse()).is_closed
+
+
+def test_transports_declared_on_the_meta_send_async_requests():
+    """
+    A transport on the Meta is used instead of httpx
+    """
+    sent = []
+
+    class Transport(BaseTransport):
+
+        def send(self, prepared_request, timeout=None):
+            sent.append(prepared_request.url)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = json.dumps(
+                {'name': 'United States'}).encode('utf-8')
+            return response
+
+    class CountriesResource(AsyncCountriesResource):
+
+        class Meta(AsyncCountriesResource.Meta):
+            transport = Transport
+
+    class WritersResource(AsyncWritersResource):
+
+        class Meta(AsyncWritersResource.Meta):
+            related_resources = (CountriesResource,)
+            transport = Transport
+
+    writer = WritersResource(
+        name='Ernest', country='http://dev/api/countries/us')
+    country = asyncio.run(writer.get_countries())
+    assert sent == ['http://dev/api/countries/us']
+    assert country[0].name == 'United States'
+    assert writer.async_client is None
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_balancing
+----------------------------------
+
+Tests for `beckett.balancing` module.
+"""
+
+import json
+import socket
+import time
+
+from beckett.balancing import LoadBalancer
+from beckett.deadlines import Deadline
+from beckett.exceptions import InvalidStatusCodeError
+from beckett.transports import ReplayTransport, exchange_key
+
+import pytest
+
+import requests
+
+from .fixtures import BlogResource, make_client
+from .server import StubServer
+
+
+def closed_url():
+    """
+    The URL of a local port that nothing listens on.
+    """
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:{}'.format(port)
+
+
+def test_round_robin_spreads_requests():
+    """
+    Requests go to every base_url in turn
+    """
+    body = {'id': 1, 'title': 'blog title'}
+    with StubServer(body=body) as first, StubServer(body=body) as second:
+        client = make_client([first.url, second.url], BlogResource)
+        for _ in range(10):
+            assert client.get_blog(uid=1)[0].title == 'blog title'
+    assert first.requests == 5
+    assert second.requests == 5
+    assert first.paths[0] == '/blogs/1'
+
+
+def test_connection_errors_fail_over_and_eject_the_host():
+    """
+    A host that refuses connections is skipped, then ejected
+    """
+    dead = closed_url()
+    with StubServer(body={'id': 1, 'title': 'blog title'}) as live:
+        client = make_client(
+            [dead, live.url], BlogResource, max_host_failures=1)
+        for _ in range(4):
+            assert client.get_blog(uid=1)[0].title == 'blog title'
+    assert live.requests == 4
+    assert [e.url for e in client.balancer.healthy()] == [live.url]
+
+
+def test_server_errors_fail_over_idempotent_requests_only():
+    """
+    GETs are sent again to another host after a 5xx, POSTs are not
+    """
+    body = {'id': 1, 'title': 'blog title'}
+    with StubServer(body=body, status=503) as failing, \
+            StubServer(body=body) as live:
+        client = make_client([failing.url, live.url], BlogResource)
+        client.balancer.choose = lambda exclude=(): [
+            e for e in client.balancer.endpoints if e not in exclude][0]
+        assert client.get_blog(uid=1)[0].title == 'blog title'
+        with pytest.raises(InvalidStatusCodeError):
+            client.post_blog(data={'title': 'blog title'})
+    assert failing.requests == 2
+    assert live.requests == 1
+
+
+def test_failover_with_transports_other_than_requests(tmpdir):
+    """
+    Responses that were not read from a socket can be discarded
+    when failing over
+    """
+    path = tmpdir.join('blogs.jsonl')
+    path.write(''.join(json.dumps({
+        'key': exchange_key('GET', url + '/blogs/1', None),
+        'status': status,
+        'headers': [['Content-Type', 'application/json']],
+        'content': json.dumps({'id': 1, 'title': 'blog title'}),
+        'base64': False,
+        'elapsed': 0,
+    }) + '\n' for url, status in (
+        ('http://a/api', 503), ('http://b/api', 200))))
+    client = make_client(
+        ['http://a/api', 'http://b/api'], BlogResource,
+        transport=ReplayTransport(str(path)))
+    client.balancer.choose = lambda exclude=(): [
+        e for e in client.balancer.endpoints if e not in exclude][0]
+    assert client.get_blog(uid=1)[0].title == 'blog title'
+
+
+def test_failover_keeps_to_the_deadline():
+    """
+    Each attempt only gets what is left of the deadline, and there are
+    no more attempts once it has run out
+    """
+    balancer = LoadBalancer(['http://a/api', 'http://b/api', 'http://c/api'])
+    timeouts = []
+
+    def send(request, timeout=None):
+        timeouts.append(timeout)
+        time.sleep(0.1)
+        raise requests.exceptions.ConnectTimeout(request=request)
+
+    prepared = requests.Request('GET', 'http://a/api/blogs/1').prepare()
+    started = time.time()
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        balancer.send(
+            send, prepared, timeout=(0.15, 0.15), deadline=Deadline(0.15))
+    assert time.time() - started < 0.3
+    assert len(timeouts) == 2
+    assert timeouts[0] == (0.15, 0.15)
+    assert timeouts[1][0] < 0.1
+
+
+def test_ewma_prefers_the_faster_host():
+    """
+    The latency weighted policy sends most requests to the fast host
+    """
+    body = {'id': 1, 'title': 'blog title'}
+    with StubServer(body=body, delay=0.05) as slow, \
+            StubServer(body=body) as fast:
+        client = make_client(
+            [slow.url, fast.url], BlogResource, load_balancing='ewma')
+        for _ in range(20):
+            client.get_blog(uid=1)
+    assert fast.requests > 15
+
+
+def test_ewma_does_not_prefer_hosts_that_fail_fast():
+    """
+    Failed requests count as slow, however quickly they failed
+    """
+    balancer = LoadBalancer(['http://a', 'http://b'], policy='ewma')
+    failing, working = balancer.endpoints
+    for _ in range(2):
+        balancer.start(working)
+        balancer.finish(working, 0.2, ok=True)
+        balancer.start(failing)
+        balancer.finish(failing, 0.001, ok=False)
+    assert failing.latency > working.latency
+    assert all(balancer.choose() is working for _ in range(4))
+
+
+def test_unknown_policies_are_rejected():
+    with pytest.raises(ValueError):
+        LoadBalancer(['http://a', 'http://b'], policy='random')
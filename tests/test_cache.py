@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `beckett.cache` module.
+"""
+
+import itertools
+import threading
+import time
+
+from beckett.cache import (
+    ResponseCache, collection_tag, item_tag, response_tags, url_tag
+)
+
+import responses
+
+from .fixtures import (
+    CachedBlogResource, CachedBlogTestClient, HypermediaBooksResource,
+    HypermediaWritersResource, RevalidatedBlogResource, make_client
+)
+from .server import StubServer
+
+
+def _add_blog_responses():
+    responses.add(responses.GET, 'http://dev/api/blogs/1',
+                  body='{"id": 1, "title": "blog title"}',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/blogs/2',
+                  body='{"id": 2, "title": "other title"}',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/blogs',
+                  body='[{"id": 1, "title": "blog title"}]',
+                  status=200,
+                  content_type='application/json')
+
+
+def test_cache_entries_expire():
+    """
+    Entries are not returned once their ttl has passed
+    """
+    cache = ResponseCache()
+    cache.set('http://dev/api/blogs/1', ['x'], 60)
+    assert cache.get('http://dev/api/blogs/1') == ['x']
+    cache.set('http://dev/api/blogs/1', ['x'], 0)
+    assert cache.get('http://dev/api/blogs/1') is None
+    assert len(cache) == 0
+
+
+def test_stale_entries_are_returned_until_their_hard_ttl():
+    """
+    Entries with a hard_ttl are returned as stale once their ttl has
+    passed, and expire once their hard_ttl has passed too.
+    """
+    cache = ResponseCache()
+    cache.set('http://dev/api/blogs/1', ['x'], 60, hard_ttl=120)
+    assert cache.lookup('http://dev/api/blogs/1') == (['x'], False)
+    cache.set('http://dev/api/blogs/1', ['x'], 0, hard_ttl=60)
+    assert cache.lookup('http://dev/api/blogs/1') == (['x'], True)
+    assert cache.get('http://dev/api/blogs/1') == ['x']
+    cache.set('http://dev/api/blogs/1', ['x'], 0, hard_ttl=0)
+    assert cache.lookup('http://dev/api/blogs/1') is None
+
+
+def test_stale_responses_are_refreshed_in_the_background():
+    """
+    Once past its cache_ttl, a response is returned straight away
+    and refreshed once in the background.
+    """
+    versions = itertools.count(1)
+    with StubServer(
+            body=lambda path: {'id': 1, 'title': next(versions)},
+            delay=0.2) as server:
+        with make_client(server.url, RevalidatedBlogResource) as client:
+            assert client.get_blog(uid=1)[0].title == 1
+            time.sleep(0.15)
+            started = time.time()
+            assert client.get_blog(uid=1)[0].title == 1
+            assert client.get_blog(uid=1)[0].title == 1
+            assert time.time() - started < 0.1
+            time.sleep(0.3)
+            assert server.requests == 2
+            assert client.get_blog(uid=1)[0].title == 2
+
+
+def test_response_tags_include_hypermedia_links():
+    """
+    Cached responses depend on the URLs their resources link to
+    """
+    book = HypermediaBooksResource(
+        title='Fiesta', writers=['http://dev/api/writers/1'])
+    tags = response_tags(
+        HypermediaBooksResource, 'http://dev/api/books', None, [book])
+    assert collection_tag('http://dev/api/books') in tags
+    assert item_tag(HypermediaBooksResource, 'Fiesta') in tags
+    assert url_tag('http://dev/api/writers/1') in tags
+    assert item_tag(HypermediaWritersResource, 1) not in tags
+
+
+@responses.activate
+def test_client_caches_get_calls():
+    """
+    GET calls to resources with a cache_ttl are only made once
+    """
+    _add_blog_responses()
+    client = CachedBlogTestClient()
+    first = client.get_blog(uid=1)
+    second = client.get_blog(uid=1)
+    assert len(responses.calls) == 1
+    assert second[0] is first[0]
+    assert isinstance(second[0], CachedBlogResource)
+
+
+@responses.activate
+def test_writes_evict_only_dependent_entries():
+    """
+    Writing to a resource evicts its item, its collection pages
+    and nothing else.
+    """
+    _add_blog_responses()
+    responses.add(responses.PATCH, 'http://dev/api/blogs/1',
+                  body='{"id": 1, "title": "new title"}',
+                  status=200,
+                  content_type='application/json')
+    client = CachedBlogTestClient()
+    client.get_blog(uid=1)
+    client.get_blog(uid=2)
+    client.get_blog(page=None, uid=None, fields=['title'])
+    assert len(client.response_cache) == 3
+    client.patch_blog(uid=1, data={'title': 'new title'})
+    assert len(client.response_cache) == 1
+    assert client.response_cache.get('http://dev/api/blogs/2')
+    calls = len(responses.calls)
+    client.get_blog(uid=2)
+    assert len(responses.calls) == calls
+    client.get_blog(uid=1)
+    assert len(responses.calls) == calls + 1
+
+
+def test_responses_fetched_across_an_invalidation_are_not_cached():
+    cache = ResponseCache()
+    tags = [item_tag(CachedBlogResource, 1)]
+    generation = cache.generation()
+    cache.invalidate(item_tag(CachedBlogResource, 2))
+    assert cache.set('a', ['old'], 60, tags, generation=generation)
+    generation = cache.generation()
+    cache.invalidate(*tags)
+    assert not cache.set('a', ['old'], 60, tags, generation=generation)
+    assert cache.get('a') is None
+
+
+def test_forgotten_invalidations_are_assumed_to_matter():
+    cache = ResponseCache(maxsize=2)
+    generation = cache.generation()
+    for uid in range(3):
+        cache.invalidate(item_tag(CachedBlogResource, uid))
+    assert not cache.set('a', ['old'], 60, generation=generation)
+
+
+def test_writes_during_a_get_keep_its_response_out_of_the_cache():
+    """
+    A GET that was in flight while a write finished does not cache
+    the data from before the write
+    """
+    with StubServer(body={'id': 1, 'title': 'blog title'},
+                    delay=lambda number: 0.3 if number == 1 else 0) as server:
+        client = make_client(server.url, CachedBlogResource)
+        reader = threading.Thread(target=lambda: client.get_blog(uid=1))
+        reader.start()
+        started = time.time()
+        while server.requests < 1:
+            assert time.time() - started < 2
+            time.sleep(0.001)
+        client.put_blog(uid=1, data={'title': 'new title'})
+        reader.join()
+        assert client.response_cache.get(server.url + '/blogs/1') is None
+        client.get_blog(uid=1)
+    assert server.requests == 3
@@ -9,18 +9,22 @@ Tests for `beckett.clients` module.
 """
 
 import json
+from concurrent.futures import Future
 
-from beckett.exceptions import InvalidStatusCodeError, MissingUidException
+from beckett.exceptions import (
+    ClientClosedError, InvalidStatusCodeError, MissingUidException
+)
 
 import pytest
 
 import responses
 
 from .fixtures import (
-    BlogResource, BlogTestClient,
+    BlogResource, BlogTestClient, HedgedBlogResource,
     NoDefaultsClient, NoDefaultsResource,
-    PlainTestClient
+    PlainTestClient, make_client
 )
+from .server import StubServer
 
 
 @responses.activate
@@ -297,3 +301,97 @@ def test_client_no_defaults():
     assert responses.calls[0].request.method == 'GET'
     assert isinstance(result, list)
     assert isinstance(result[0], NoDefaultsResource)
+
+
+@responses.activate
+def test_custom_client_get_sparse_fields():
+    """
+    Passing fields requests a projection and only renders those fields
+    """
+    client = BlogTestClient()
+    responses.add(responses.GET, 'http://dev/api/blogs/1',
+                  body='''
+                    {"id": 1, "title": "blog title",
+                     "slug": "blog-title",
+                     "content": "This is some content"}''',
+                  status=200,
+                  content_type='application/json')
+    result = client.get_blog(uid=1, fields=['title'])
+    assert responses.calls[0].request.url == (
+        'http://dev/api/blogs/1?fields=title')
+    resource = result[0]
+    assert resource.title == 'blog title'
+    # The identifier is always kept
+    assert resource.id == 1
+    assert not hasattr(resource, 'content')
+
+
+@responses.activate
+def test_custom_client_sparse_fields_with_custom_url():
+    """
+    The projection query is appended to any existing query
+    """
+    client = BlogTestClient()
+    responses.add(responses.GET, 'http://dev/api/blogs',
+                  body='[{"id": 1, "title": "blog title"}]',
+                  status=200,
+                  content_type='application/json')
+    client.get_blog(page=2, fields=('title', 'slug'))
+    assert responses.calls[0].request.url == (
+        'http://dev/api/blogs?page=2&fields=title,slug')
+
+
+def test_submit_methods_are_opt_in():
+    """
+    submit_ variants are only generated when the Meta asks for them
+    """
+    assert not hasattr(BlogTestClient(), 'submit_get_blog')
+    client = make_client('http://dev/api', BlogResource, submit_methods=True)
+    for method in ('get', 'post', 'put', 'patch', 'delete'):
+        assert hasattr(client, 'submit_{}_blog'.format(method))
+
+
+def test_submit_methods_overlap_on_the_client_pool():
+    """
+    submit_ variants return Futures, run at most executor_workers
+    calls at once, and the client closes its pool on exit.
+    """
+    with StubServer(body={'id': 1, 'title': 'blog title'},
+                    delay=0.2) as server:
+        with make_client(server.url, BlogResource, submit_methods=True,
+                         executor_workers=2) as client:
+            futures = [client.submit_get_blog(uid=i) for i in range(1, 5)]
+            assert all(isinstance(f, Future) for f in futures)
+            results = [f.result() for f in futures]
+        assert client._executor is None
+    assert [r[0].title for r in results] == ['blog title'] * 4
+    # The calls overlapped, two at a time
+    assert server.max_active == 2
+    assert server.connections <= 2
+
+
+def test_submitted_hedged_calls_do_not_starve_the_pool():
+    """
+    Hedged requests are sent on their own pool, so submitted calls
+    waiting for them cannot take every thread they need
+    """
+    with StubServer(body={'id': 1, 'title': 'blog title'},
+                    delay=0.1) as server:
+        with make_client(server.url, HedgedBlogResource, submit_methods=True,
+                         executor_workers=2, hedge_budget=1) as client:
+            futures = [client.submit_get_blog(uid=i) for i in range(1, 5)]
+            results = [f.result(timeout=5) for f in futures]
+    assert [r[0].title for r in results] == ['blog title'] * 4
+
+
+def test_closed_clients_do_not_restart_their_pools():
+    """
+    The thread pools cannot be used once the client is closed
+    """
+    client = make_client('http://dev/api', BlogResource, submit_methods=True)
+    client.get_executor()
+    client.close()
+    with pytest.raises(ClientClosedError):
+        client.get_executor()
+    with pytest.raises(ClientClosedError):
+        client.submit_get_blog(uid=1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_compression
+----------------------------------
+
+Tests for `beckett.compression` module.
+"""
+
+import gzip
+import io
+import json
+import zlib
+
+from beckett.compression import compress_request, decompress_body
+from beckett.transports import exchange_key
+
+import pytest
+
+import requests
+
+import responses
+
+from .fixtures import CompressedBlogTestClient
+
+
+def _prepare(body):
+    return requests.Request(
+        method='POST', url='http://dev/api/blogs', data=body).prepare()
+
+
+def test_small_bodies_are_not_compressed():
+    """
+    Bodies under the threshold are sent as they are
+    """
+    request = _prepare(b'{"a": 1}')
+    compress_request(request, 'gzip', 1024)
+    assert request.body == b'{"a": 1}'
+    assert 'Content-Encoding' not in request.headers
+
+
+def test_deflate_compression():
+    """
+    Bodies over the threshold are compressed and labelled
+    """
+    body = json.dumps({'content': 'x' * 500}).encode('utf-8')
+    request = _prepare(body)
+    compress_request(request, 'deflate', 100)
+    assert request.headers['Content-Encoding'] == 'deflate'
+    assert request.headers['Content-Length'] == str(len(request.body))
+    assert zlib.decompress(request.body) == body
+
+
+def test_gzip_compression_is_deterministic(monkeypatch):
+    """
+    The same body always compresses to the same bytes, and recorded
+    exchanges are keyed by the decoded body.
+    """
+    body = json.dumps({'content': 'x' * 500}).encode('utf-8')
+    bodies = []
+    for clock in (1000.0, 2000.0):
+        monkeypatch.setattr(gzip.time, 'time', lambda: clock)
+        request = _prepare(body)
+        compress_request(request, 'gzip', 100)
+        bodies.append(request.body)
+    assert bodies[0] == bodies[1]
+    assert decompress_body(bodies[0], 'gzip') == body
+    assert exchange_key('POST', 'http://dev/api/blogs', bodies[0], 'gzip') == (
+        exchange_key('POST', 'http://dev/api/blogs', body))
+
+
+def test_unknown_compression():
+    """
+    Unknown encodings raise a ValueError
+    """
+    with pytest.raises(ValueError):
+        compress_request(_prepare(b'x' * 10), 'lzma', 1)
+
+
+@responses.activate
+def test_client_compresses_large_bodies_and_counts_bytes():
+    """
+    Large POST bodies are gzipped and the transfer stats record both
+    the wire and decoded sizes.
+    """
+    client = CompressedBlogTestClient()
+    responses.add(responses.POST, 'http://dev/api/blogs',
+                  body='{"id": 1, "title": "blog title"}',
+                  status=201,
+                  content_type='application/json')
+    data = {'title': 'blog title', 'content': 'content ' * 100}
+    result = client.post_blog(data=data)
+    assert result[0].title == 'blog title'
+    request = responses.calls[0].request
+    assert request.headers['Content-Encoding'] == 'gzip'
+    assert request.headers['Accept-Encoding'] == 'gzip, deflate'
+    decoded = gzip.GzipFile(fileobj=io.BytesIO(request.body)).read()
+    assert json.loads(decoded.decode('utf-8')) == data
+    stats = client.transfer_stats.as_dict()
+    assert stats['requests'] == 1
+    assert stats['bytes_sent'] == len(request.body)
+    assert stats['bytes_sent_decoded'] == len(decoded)
+    assert stats['bytes_sent'] < stats['bytes_sent_decoded']
+    assert stats['bytes_received_decoded'] == len(
+        '{"id": 1, "title": "blog title"}')
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_converters
+----------------------------------
+
+Tests for `beckett.converters` module.
+"""
+
+import datetime
+import decimal
+import json
+import threading
+
+from beckett.converters import build_resources, get_converters, to_datetime
+from beckett.exceptions import AttributeConversionError
+
+import pytest
+
+import responses
+
+from .fixtures import (
+    InternedProductResource, LazyTypedProductResource, TypedProductResource,
+    TypedProductTestClient
+)
+
+
+def test_to_datetime_parses_iso_8601():
+    """
+    ISO 8601 strings with and without offsets are parsed
+    """
+    result = to_datetime('2016-06-13T10:20:30.5Z')
+    assert result.year == 2016
+    assert result.microsecond == 500000
+    assert result.utcoffset() == datetime.timedelta(0)
+    result = to_datetime('2016-06-13T10:20:30+01:00')
+    assert result.utcoffset() == datetime.timedelta(hours=1)
+    assert to_datetime('2016-06-13').hour == 0
+
+
+def test_typed_attributes_are_converted():
+    """
+    Declared attribute types are converted when a resource is built
+    """
+    instance = TypedProductResource(
+        id='3', price=10.1, created='2016-06-13T10:20:30Z', stock=2)
+    assert instance.id == 3
+    assert instance.price == decimal.Decimal('10.1')
+    assert isinstance(instance.created, datetime.datetime)
+    assert instance.stock == 20
+
+
+def test_converters_are_compiled_once_per_class():
+    """
+    The converter pipeline is cached on each resource class
+    """
+    assert get_converters(TypedProductResource) is get_converters(
+        TypedProductResource)
+    assert get_converters(LazyTypedProductResource).lazy
+
+
+def test_lazy_typed_attributes_convert_on_access():
+    """
+    Lazily typed attributes are held raw until they are first accessed
+    """
+    instance = LazyTypedProductResource(id='3', price='1.50')
+    assert 'price' not in instance.__dict__
+    assert instance.price == decimal.Decimal('1.50')
+    assert instance.__dict__['price'] == decimal.Decimal('1.50')
+    assert not hasattr(instance, 'created')
+
+
+def test_lazy_typed_attributes_can_be_read_from_several_threads():
+    """
+    A thread reading an attribute while another converts it still
+    gets its value
+    """
+    converting = threading.Event()
+    release = threading.Event()
+
+    def slow_int(value):
+        if not converting.is_set():
+            converting.set()
+            release.wait(5)
+        return int(value)
+
+    class SlowProductResource(LazyTypedProductResource):
+
+        class Meta(LazyTypedProductResource.Meta):
+            attribute_types = {'stock': slow_int}
+
+    instance = SlowProductResource(id=1, stock='7')
+    results = []
+    thread = threading.Thread(target=lambda: results.append(instance.stock))
+    thread.start()
+    assert converting.wait(5)
+    assert instance.stock == 7
+    release.set()
+    thread.join(5)
+    assert results == [7]
+    assert not instance._unconverted
+
+
+def test_bad_values_raise_conversion_errors():
+    """
+    Values that cannot be converted raise AttributeConversionError
+    """
+    with pytest.raises(AttributeConversionError) as error:
+        TypedProductResource(id='not a number')
+    assert error.value.field == 'id'
+
+
+@responses.activate
+def test_list_responses_are_converted_once():
+    """
+    List responses are converted in one batch, and custom
+    callables are only applied once per value.
+    """
+    client = TypedProductTestClient()
+    responses.add(responses.GET, 'http://dev/api/products/1',
+                  body='''[
+                    {"id": "1", "price": "9.99", "stock": 1,
+                     "created": "2016-06-13T10:20:30Z"},
+                    {"id": "2", "price": "9.99", "stock": 2,
+                     "created": "2016-06-13T10:20:30Z"}]''',
+                  status=200,
+                  content_type='application/json')
+    result = client.get_product(uid=1)
+    assert [x.id for x in result] == [1, 2]
+    assert [x.stock for x in result] == [10, 20]
+    assert result[0].price == decimal.Decimal('9.99')
+    # Repeated raw values share the same converted object
+    assert result[0].created is result[1].created
+
+
+def test_intern_fields_share_string_values():
+    """
+    Instances built from separately decoded payloads share the
+    string objects of their interned fields.
+    """
+    first = json.loads('{"id": 1, "status": "active", "country": "GB"}')
+    second = json.loads('{"id": 2, "status": "active", "country": "GB"}')
+    assert first['status'] is not second['status']
+    a = InternedProductResource(**first)
+    b = build_resources(InternedProductResource, [second])[0]
+    assert a.status is b.status
+    assert a.country is b.country
+
+
+def test_instances_share_their_attribute_layout():
+    """
+    Attributes are set in declared order whatever the payload order,
+    and batch conversion leaves no marker on the instances.
+    """
+    a = TypedProductResource(stock=1, id='1', price='1.0')
+    b = build_resources(
+        TypedProductResource, [{'price': '2.0', 'stock': 2, 'id': '2'}])[0]
+    assert [k for k in a.__dict__ if not k.startswith('_')] == [
+        'id', 'price', 'stock']
+    assert list(b.__dict__) == list(a.__dict__)
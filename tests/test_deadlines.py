@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_deadlines
+----------------------------------
+
+Tests for `beckett.deadlines` module.
+"""
+
+import time
+
+from beckett.deadlines import Deadline, request_timeout
+from beckett.exceptions import DeadlineExceededError
+
+import pytest
+
+from .fixtures import (
+    BlogResource, HypermediaBooksResource, TimeoutBlogResource, make_client
+)
+from .server import StubServer
+
+
+def test_request_timeout_uses_the_smallest_budget():
+    """
+    Timeouts come from the resource Meta, capped by any deadline
+    """
+    assert request_timeout(BlogResource) is None
+    assert request_timeout(TimeoutBlogResource) == (1, 0.2)
+    connect, read = request_timeout(TimeoutBlogResource, Deadline(0.5))
+    assert connect <= 0.5
+    assert read == 0.2
+
+
+def test_read_timeouts_raise_deadline_exceeded():
+    """
+    A slow response raises DeadlineExceededError with its timing
+    """
+    with StubServer(body={'id': 1}, delay=0.5) as server:
+        client = make_client(server.url, TimeoutBlogResource)
+        with pytest.raises(DeadlineExceededError) as error:
+            client.get_blog(uid=1)
+    assert error.value.timeout == (1, 0.2)
+    assert 0.2 <= error.value.elapsed < 0.5
+    assert error.value.url == server.url + '/blogs/1'
+    assert error.value.deadline is None
+
+
+def test_deadlines_span_several_calls():
+    """
+    A deadline is shared by every call it is passed to, and records
+    the time each one took.
+    """
+    with StubServer(body={'id': 1}, delay=0.15) as server:
+        client = make_client(server.url, BlogResource)
+        deadline = Deadline(0.25)
+        client.get_blog(uid=1, deadline=deadline)
+        with pytest.raises(DeadlineExceededError) as error:
+            client.get_blog(uid=2, deadline=deadline)
+            client.get_blog(uid=3, deadline=deadline)
+    assert error.value.deadline == 0.25
+    assert len(error.value.timings) == 2
+    assert error.value.timings[0][0] == server.url + '/blogs/1'
+
+
+def test_expired_deadlines_stop_hypermedia_fan_out():
+    """
+    Related calls are not made once the deadline has run out
+    """
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    instance = HypermediaBooksResource(
+        title='Fiesta', writers=['http://dev/api/writers/1'])
+    with pytest.raises(DeadlineExceededError) as error:
+        instance.get_writers(deadline=deadline)
+    assert error.value.elapsed >= 0.02
+    assert error.value.timings == []
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_hedging
+----------------------------------
+
+Tests for `beckett.hedging` module.
+"""
+
+import time
+
+from beckett.hedging import HedgeBudget, LatencyTracker
+
+from .fixtures import BlogResource, HedgedBlogResource, make_client
+from .server import StubServer
+
+
+def test_latency_tracker_percentiles():
+    """
+    Percentiles are only reported once there are enough samples
+    """
+    tracker = LatencyTracker()
+    for i in range(10):
+        tracker.record('key', i / 100.0)
+    assert tracker.percentile('key', 95) is None
+    for i in range(10, 100):
+        tracker.record('key', i / 100.0)
+    assert tracker.percentile('key', 95) == 0.94
+
+
+def test_hedge_budget_limits_hedges():
+    """
+    Only a share of requests can be hedged
+    """
+    budget = HedgeBudget(ratio=0.5)
+    budget.record_request()
+    assert not budget.try_acquire()
+    budget.record_request()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+    assert budget.hedged == 1
+
+
+def test_slow_requests_are_hedged():
+    """
+    A duplicate request is sent when the first is slow,
+    and the faster response wins.
+    """
+    with StubServer(body={'id': 1, 'title': 'blog title'},
+                    delay=lambda number: 1 if number == 1 else 0) as server:
+        client = make_client(
+            server.url, HedgedBlogResource, hedge_budget=1)
+        # Earn a token for the hedge
+        client.hedger.budget.record_request()
+        started = time.time()
+        result = client.get_blog(uid=1)
+        took = time.time() - started
+        assert server.requests == 2
+        client.close()
+    assert result[0].title == 'blog title'
+    assert took < 0.9
+    assert client.hedger.budget.hedged == 1
+
+
+def test_requests_are_not_hedged_without_budget():
+    """
+    With no budget left, slow requests are simply waited on
+    """
+    with StubServer(body={'id': 1}, delay=0.1) as server:
+        client = make_client(server.url, HedgedBlogResource, hedge_budget=0)
+        client.get_blog(uid=1)
+        assert server.requests == 1
+        plain = make_client(server.url, BlogResource)
+        plain.get_blog(uid=1)
+        assert server.requests == 2
+        client.close()
+    assert client.hedger.budget.hedged == 0
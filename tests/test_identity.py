@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_identity
+----------------------------------
+
+Tests for `beckett.identity` module.
+"""
+
+import gc
+
+from beckett.identity import IdentityMap
+
+import responses
+
+from .fixtures import BlogResource, IdentityMapBlogTestClient
+
+
+def test_identity_map_merges_in_place():
+    """
+    Merging a resource that is already mapped updates the mapped instance
+    """
+    identity_map = IdentityMap()
+    first = identity_map.merge(BlogResource(id=1, title='first'))
+    second = identity_map.merge(BlogResource(id='1', title='second'))
+    assert second is first
+    assert first.title == 'second'
+    assert identity_map.get(BlogResource, 1) is first
+
+
+def test_identity_map_is_bounded_by_weak_references():
+    """
+    Only the most recently used resources are kept alive by the map
+    """
+    identity_map = IdentityMap(maxsize=1)
+    identity_map.merge(BlogResource(id=1))
+    kept = identity_map.merge(BlogResource(id=2))
+    identity_map.merge(BlogResource(id=3))
+    gc.collect()
+    assert identity_map.get(BlogResource, 1) is None
+    # Still referenced here, so it can still be found
+    assert identity_map.get(BlogResource, 2) is kept
+    identity_map.invalidate(BlogResource)
+    assert len(identity_map) == 0
+
+
+@responses.activate
+def test_client_identity_map_and_invalidation():
+    """
+    Clients return the same instance for the same identifier until
+    it is changed through the client.
+    """
+    client = IdentityMapBlogTestClient()
+    responses.add(responses.GET, 'http://dev/api/blogs/1',
+                  body='{"id": 1, "title": "blog title"}',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/blogs',
+                  body='''[{"id": 1, "title": "new title"},
+                           {"id": 2, "title": "other"}]''',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.DELETE, 'http://dev/api/blogs/1',
+                  body='',
+                  status=204,
+                  content_type='application/json')
+    blog = client.get_blog(uid=1)[0]
+    listed = client.get_blog(page=1)
+    assert listed[0] is blog
+    assert blog.title == 'new title'
+    client.delete_blog(uid=1)
+    assert client.identity_map.get(BlogResource, 1) is None
+    assert client.get_blog(uid=1)[0] is not blog
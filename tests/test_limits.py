@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_limits
+----------------------------------
+
+Tests for `beckett.limits` module.
+"""
+
+import time
+
+from beckett.exceptions import DeadlineExceededError, InvalidStatusCodeError
+from beckett.limits import AdaptiveLimiter
+from beckett.resources import HypermediaResource
+
+import pytest
+
+from .fixtures import BlogResource, make_client
+from .server import StubServer
+
+
+def test_aimd_grows_additively_and_backs_off():
+    """
+    aimd adds one to the limit per limit's worth of busy successes,
+    and cuts it on errors and slow requests.
+    """
+    limiter = AdaptiveLimiter(
+        'aimd', initial_limit=4, latency_threshold=1.0)
+    for _ in range(4):
+        limiter.acquire()
+    # Keep the limit in use for a limit's worth of requests
+    for _ in range(5):
+        limiter.release(0.1)
+        limiter.acquire()
+    assert limiter.limit == 5
+    limiter.release(0.1, failed=True)
+    assert limiter.limit == 4
+    limiter.release(2.0)
+    limiter.release(2.0)
+    assert limiter.limit == 3
+    assert [d.reason for d in limiter.decisions] == [
+        'growth', 'error', 'latency']
+
+
+def test_quiet_clients_do_not_raise_their_limit():
+    """
+    The limit is only raised while at least half of it is in use
+    """
+    limiter = AdaptiveLimiter('aimd', initial_limit=10)
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 10
+
+
+def test_unknown_policies_are_rejected():
+    with pytest.raises(ValueError):
+        AdaptiveLimiter('fastest')
+
+
+def test_waiting_for_the_limit_times_out():
+    limiter = AdaptiveLimiter('aimd', initial_limit=1)
+    assert limiter.acquire(timeout=0.05)
+    started = time.time()
+    assert not limiter.acquire(timeout=0.05)
+    assert time.time() - started >= 0.05
+    assert limiter.in_flight == 1
+
+
+def test_requests_waiting_for_the_limit_keep_to_their_deadline():
+    """
+    A request that cannot be sent before its deadline runs out fails
+    without being sent
+    """
+    limiter = AdaptiveLimiter('aimd', initial_limit=1, min_limit=1)
+    limiter.acquire()
+    with StubServer(body={'id': 1, 'title': 'blog title'}) as server:
+        client = make_client(
+            server.url, BlogResource, concurrency_limit=limiter)
+        started = time.time()
+        with pytest.raises(DeadlineExceededError) as error:
+            client.get_blog(uid=1, deadline=0.1)
+        assert time.time() - started < 1
+        assert server.requests == 0
+    assert error.value.deadline == 0.1
+    assert error.value.elapsed >= 0.1
+
+
+def test_vegas_follows_the_latency_of_the_api():
+    """
+    vegas raises the limit while the API is fast, and lowers it once
+    its latency goes up.
+    """
+    with StubServer(body={'id': 1}, delay=0.005) as server:
+        with make_client(server.url, BlogResource, submit_methods=True,
+                         executor_workers=32, concurrency_limit='vegas',
+                         initial_concurrency=4) as client:
+            limiter = client.limiter
+            futures = [client.submit_get_blog(uid=1) for _ in range(400)]
+            [f.result() for f in futures]
+            peak = limiter.limit
+            assert peak > 4
+            server.delay = 0.1
+            futures = [client.submit_get_blog(uid=1) for _ in range(60)]
+            [f.result() for f in futures]
+    assert limiter.limit < peak
+    assert 'queueing' in [d.reason for d in limiter.decisions]
+
+
+def test_overloaded_responses_lower_the_limit():
+    """
+    Responses that say the API is overloaded count as failures
+    """
+    with StubServer(body={}, status=503) as server:
+        with make_client(server.url, BlogResource,
+                         concurrency_limit='aimd') as client:
+            for _ in range(3):
+                with pytest.raises(InvalidStatusCodeError):
+                    client.get_blog(uid=1)
+    assert client.limiter.limit == 7
+
+
+def test_hypermedia_resources_limit_their_related_calls():
+    """
+    Every instance of a HypermediaResource class shares one limiter,
+    which expand() waits for
+    """
+    with StubServer(body={'name': 'writer'}, delay=0.05) as server:
+
+        class Writers(HypermediaResource):
+
+            class Meta(HypermediaResource.Meta):
+                name = 'Writers'
+                resource_name = 'writers'
+                base_url = server.url
+                identifier = 'name'
+                attributes = ('name',)
+
+        class Books(HypermediaResource):
+
+            class Meta(HypermediaResource.Meta):
+                name = 'Books'
+                resource_name = 'books'
+                base_url = server.url
+                identifier = 'title'
+                attributes = ('title', 'writers')
+                related_resources = (Writers,)
+                concurrency_limit = 'aimd'
+                initial_concurrency = 2
+                max_concurrency = 2
+
+        urls = [server.url + '/writers/{}'.format(i) for i in range(8)]
+        book = Books(title='Fiesta', writers=urls)
+        assert book.limiter is Books(title='Other').limiter
+        assert book.limiter.limit == 2
+        book.expand()
+        assert server.requests == 8
+        assert server.max_active == 2
+        assert book.limiter.in_flight == 0
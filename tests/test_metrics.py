@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_metrics
+----------------------------------
+
+Tests for `beckett.metrics` module.
+"""
+
+import threading
+
+from beckett.exceptions import InvalidStatusCodeError
+from beckett.metrics import Counter, Histogram, MetricsRegistry
+
+import pytest
+
+from .fixtures import BlogResource, make_client
+from .server import StubServer
+
+
+def test_counters_add_up_every_thread():
+    counter = Counter('things_total', 'Things.', ('kind',))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(('a',))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value(('a',)) == 4000
+
+
+def test_shards_of_exited_threads_are_folded_together():
+    """
+    Metrics recorded from many short lived threads do not keep a shard
+    per thread, and keep their totals
+    """
+    counter = Counter('things_total', 'Things.')
+    histogram = Histogram('latency', 'Latency.', buckets=(0.1, 1.0))
+
+    def work():
+        counter.inc()
+        histogram.observe((), 0.5)
+
+    for _ in range(50):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    assert counter.value() == 50
+    assert histogram.count() == 50
+    assert len(counter._shards) <= 1
+    assert len(histogram._shards) <= 1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency', 'Latency.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe((), value)
+    samples = dict(
+        (name + dict(extra).get('le', ''), value)
+        for name, _, extra, value in histogram.samples())
+    assert samples == {
+        'latency_bucket0.1': 2,
+        'latency_bucket1': 3,
+        'latency_bucket+Inf': 4,
+        'latency_sum': 2.65,
+        'latency_count': 4,
+    }
+
+
+def test_clients_record_traffic_metrics():
+    """
+    Requests, errors, bytes, latency and materialized resources are
+    recorded per client and method, and exposed as text
+    """
+    metrics = MetricsRegistry()
+    with StubServer(body={'id': 1, 'title': 'blog title'}) as server:
+        client = make_client(server.url, BlogResource, metrics=metrics)
+        client.get_blog(uid=1)
+        client.get_blog(uid=2)
+        server.status = 404
+        with pytest.raises(InvalidStatusCodeError):
+            client.get_blog(uid=3)
+
+    labels = ('test_blog_client', 'get_blog')
+    assert metrics.requests.value(labels) == 3
+    assert metrics.errors.value(labels + ('404',)) == 1
+    assert metrics.in_flight.value(('test_blog_client',)) == 0
+    assert metrics.latency.count(labels) == 3
+    assert metrics.bytes_received.value(('test_blog_client',)) > 0
+    assert metrics.materialized.value(('test_blog_client', 'Blog')) == 2
+
+    text = metrics.expose()
+    assert '# TYPE beckett_requests_total counter' in text
+    assert ('beckett_requests_total{client="test_blog_client",'
+            'method="get_blog"} 3') in text
+    assert ('beckett_request_errors_total{client="test_blog_client",'
+            'method="get_blog",status="404"} 1') in text
+    assert ('beckett_request_duration_seconds_count{'
+            'client="test_blog_client",method="get_blog"} 3') in text
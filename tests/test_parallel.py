@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_parallel
+----------------------------------
+
+Tests for `beckett.parallel` module.
+"""
+
+import json
+
+from beckett.parallel import ParallelMaterializer
+
+import responses
+
+from .fixtures import (
+    AuthorSubResource, ParallelTestClient, SubResourcePeopleResource
+)
+
+
+def _people(count):
+    return [
+        {'slug': 'person-{}'.format(i), 'author': {'name': str(i)}}
+        for i in range(count)
+    ]
+
+
+def test_small_lists_are_built_in_thread():
+    """
+    Lists under the threshold never start the worker pool
+    """
+    materializer = ParallelMaterializer(2, threshold=100)
+    result = materializer.build_resources(
+        SubResourcePeopleResource, _people(5))
+    assert len(result) == 5
+    assert materializer._executor is None
+
+
+@responses.activate
+def test_large_lists_are_built_in_order():
+    """
+    Lists over the threshold are built by the workers and keep their order
+    """
+    client = ParallelTestClient()
+    responses.add(responses.GET, 'http://dev/api/peoples/1',
+                  body=json.dumps(_people(25)),
+                  status=200,
+                  content_type='application/json')
+    try:
+        result = client.get_people(uid=1)
+        assert client.materializer._executor is not None
+    finally:
+        client.close()
+    assert [x.slug for x in result] == [
+        'person-{}'.format(i) for i in range(25)]
+    assert isinstance(result[7].author, AuthorSubResource)
+    assert result[7].author.name == '7'
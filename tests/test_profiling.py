@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_profiling
+----------------------------------
+
+Tests for `beckett.profiling` module.
+"""
+
+import responses
+
+from beckett.profiling import CallProfiler, tracemalloc
+
+import pytest
+
+from .fixtures import BlogResource, BlogTestClient, make_client
+from .server import StubServer
+
+
+def test_profiling_is_off_by_default():
+    client = BlogTestClient()
+    assert client.profiler is None
+
+
+@responses.activate
+def test_sampled_calls_are_profiled_per_method():
+    """
+    Every sampled call is aggregated under its method name, with a
+    breakdown of its phases
+    """
+    responses.add(
+        responses.GET, 'http://dev/api/blogs/1',
+        json={'id': 1, 'title': 'blog title'}, status=200)
+    client = BlogTestClient()
+    client.profiler = CallProfiler(sample_rate=1.0)
+    for _ in range(3):
+        client.get_blog(uid=1)
+
+    assert client.profiler.methods() == ['get_blog']
+    phases = client.profiler.phases('get_blog')
+    assert set(['io', 'decode', 'build', 'set_attributes']) <= set(phases)
+    report = client.profiler.report()
+    assert report.startswith('get_blog - 3 sampled calls')
+    assert 'Top functions:' in report
+
+
+@pytest.mark.skipif(
+    tracemalloc is None, reason='Tracing allocations requires Python 3')
+def test_sample_rate_and_allocations():
+    """
+    Only a share of calls is sampled, and allocations can be traced
+    """
+    with StubServer(body=[{'id': i} for i in range(100)]) as server:
+        client = make_client(
+            server.url, BlogResource,
+            profile_sample_rate=0.5, profile_allocations=True)
+        client.profiler._random.seed(1)
+        for _ in range(20):
+            client.get_blog(uid=1)
+    calls = client.profiler._methods['get_blog'].calls
+    assert 0 < calls < 20
+    assert client.profiler.allocations('get_blog')
+    assert 'Top allocations:' in client.profiler.report()
@@ -15,7 +15,9 @@ import responses
 
 from tests.fixtures import (
     AuthorSubResource, HypermediaAuthorsResource,
-    HypermediaBlogsResource, PeopleResource, SubResourcePeopleResource
+    HypermediaBlogsResource, HypermediaBooksResource,
+    HypermediaCountriesResource, HypermediaWritersResource,
+    PeopleResource, SubResourcePeopleResource
 )
 
 
@@ -234,3 +236,66 @@ def test_a_list_of_sub_resource_generates_okay():
     assert instance.author[0].name == 'This is the subresource'
     assert instance.author[1].name == 'This is another subresource'
     assert instance.slug == 'this-is-the-resource'
+
+
+@responses.activate
+def test_hypermedia_expand_fetches_each_url_once():
+    """
+    expand() walks the graph breadth first, fetching every URL once
+    and sharing resources that are linked from several places.
+    """
+    responses.add(responses.GET, 'http://dev/api/writers/1',
+                  body='''{"name": "Ernest",
+                           "country": "http://dev/api/countries/us"}''',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/writers/2',
+                  body='''{"name": "Scott",
+                           "country": "http://dev/api/countries/us"}''',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/countries/us',
+                  body='{"name": "United States"}',
+                  status=200,
+                  content_type='application/json')
+    data = {
+        'title': 'A Moveable Feast',
+        'writers': [
+            'http://dev/api/writers/1',
+            'http://dev/api/writers/2',
+            'http://dev/api/writers/1',
+        ]
+    }
+    instance = HypermediaBooksResource(**data)
+    assert instance.expand(depth=2) is instance
+    assert len(responses.calls) == 3
+    first, second, again = instance.writers
+    assert isinstance(first, HypermediaWritersResource)
+    assert first is again
+    assert first.name == 'Ernest'
+    assert second.name == 'Scott'
+    assert isinstance(first.country, HypermediaCountriesResource)
+    assert first.country is second.country
+    assert first.country.name == 'United States'
+
+
+@responses.activate
+def test_hypermedia_expand_respects_depth_and_relations():
+    """
+    expand() only follows the requested relations, to the requested depth
+    """
+    responses.add(responses.GET, 'http://dev/api/writers/1',
+                  body='''{"name": "Ernest",
+                           "country": "http://dev/api/countries/us"}''',
+                  status=200,
+                  content_type='application/json')
+    instance = HypermediaBooksResource(
+        title='Fiesta', writers=['http://dev/api/writers/1'])
+    instance.expand(relations=['nothing'])
+    assert len(responses.calls) == 0
+    instance.expand(depth=1, relations=['writers'])
+    assert len(responses.calls) == 1
+    assert instance.writers[0].name == 'Ernest'
+    # The next level is left as a related method
+    assert not hasattr(instance.writers[0], 'country')
+    assert hasattr(instance.writers[0], 'get_countries')
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_scheduling
+----------------------------------
+
+Tests for `beckett.scheduling` module.
+"""
+
+import threading
+import time
+
+from beckett.exceptions import DeadlineExceededError
+from beckett.metrics import MetricsRegistry
+from beckett.scheduling import BULK, INTERACTIVE, RequestScheduler
+
+import pytest
+
+from .fixtures import BlogResource, BulkBlogResource, make_client
+from .server import StubServer
+
+
+def _wait_for(condition, timeout=2.0):
+    started = time.time()
+    while not condition():
+        assert time.time() - started < timeout
+        time.sleep(0.001)
+
+
+def test_free_slots_go_to_the_highest_weighted_queue():
+    """
+    Waiting requests are dispatched by weighted fair queuing
+    """
+    scheduler = RequestScheduler(1)
+    scheduler.acquire(BULK)
+    order = []
+
+    def send(priority):
+        scheduler.acquire(priority)
+        order.append(priority)
+        scheduler.release()
+
+    threads = []
+    for priority in [BULK] * 3 + [INTERACTIVE] * 3:
+        thread = threading.Thread(target=send, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: sum(scheduler.queue_depths().values()) == len(
+            threads))
+    assert scheduler.queue_depths() == {
+        'interactive': 3, 'default': 0, 'bulk': 3}
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    # Interactive requests finish sooner in virtual time, even though
+    # they were queued after the bulk requests
+    assert order == [INTERACTIVE] * 3 + [BULK] * 3
+    stats = scheduler.stats()
+    assert stats['bulk']['dispatched'] == 4
+    assert stats['interactive']['queued'] == 0
+
+
+def test_timed_out_waiters_give_up_their_turn():
+    """
+    A request that stops waiting leaves the queue, and the next one
+    gets the slot it would have had
+    """
+    scheduler = RequestScheduler(1)
+    scheduler.acquire()
+    assert scheduler.acquire(INTERACTIVE, timeout=0.05) is None
+    assert scheduler.queue_depths()[INTERACTIVE] == 0
+    granted = []
+    thread = threading.Thread(
+        target=lambda: granted.append(scheduler.acquire(BULK)))
+    thread.start()
+    _wait_for(lambda: scheduler.queue_depths()[BULK] == 1)
+    scheduler.release()
+    thread.join()
+    assert granted == [BULK]
+    assert scheduler.in_flight == 1
+
+
+def test_requests_waiting_to_be_scheduled_keep_to_their_deadline():
+    """
+    A request that is not given a slot before its deadline runs out
+    fails without being sent
+    """
+    scheduler = RequestScheduler(1)
+    scheduler.acquire()
+    with StubServer(body={'id': 1, 'title': 'blog title'}) as server:
+        client = make_client(
+            server.url, BlogResource, request_scheduler=scheduler)
+        with pytest.raises(DeadlineExceededError) as error:
+            client.get_blog(uid=1, deadline=0.1)
+        assert server.requests == 0
+    assert error.value.elapsed >= 0.1
+    assert scheduler.queue_depths()['default'] == 0
+
+
+def test_unknown_priorities_are_rejected():
+    with pytest.raises(ValueError):
+        RequestScheduler(1).acquire('urgent')
+
+
+def test_interactive_calls_keep_bounded_latency_under_bulk_load():
+    """
+    A backlog of bulk calls only delays interactive calls by a slot or
+    two, while the bulk calls use all of the remaining capacity.
+    """
+    metrics = MetricsRegistry()
+    with StubServer(body={'id': 1, 'title': 'blog title'},
+                    delay=0.05) as server:
+        with make_client(server.url, BulkBlogResource, submit_methods=True,
+                         executor_workers=40, request_scheduler=2,
+                         metrics=metrics) as client:
+            started = time.time()
+            bulk = [client.submit_get_blog(uid=1) for _ in range(30)]
+            _wait_for(lambda: client.scheduler.queue_depths()[BULK] > 20)
+            assert metrics.queued.value(
+                (client.Meta.name, BULK)) > 20
+            latencies = []
+            for _ in range(5):
+                sent = time.time()
+                client.get_blog(uid=1, priority=INTERACTIVE)
+                latencies.append(time.time() - sent)
+            [f.result() for f in bulk]
+            elapsed = time.time() - started
+    # Each interactive call waits for at most one bulk call to finish
+    assert max(latencies) < 0.2
+    # 35 calls of 50ms, two at a time
+    assert elapsed < 1.5
+    assert client.scheduler.in_flight == 0
+    assert metrics.queued.value((client.Meta.name, BULK)) == 0
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_serializers
+----------------------------------
+
+Tests for `beckett.serializers` module.
+"""
+
+import json
+
+from beckett.converters import build_resources
+from beckett.serializers import to_dict, to_json, to_msgpack
+
+import pytest
+
+from .fixtures import (
+    HypermediaAuthorsResource,
+    HypermediaBlogsResource,
+    RawInternedProductResource,
+    RawLazyTypedProductResource,
+    RawPeopleResource,
+    RawTypedProductResource,
+    SubResourcePeopleResource,
+    TypedProductResource
+)
+
+
+def people_data():
+    return {
+        'slug': 'the-resource',
+        'another_thing': 'another',
+        'author': {'name': 'the author'},
+        'not_an_attribute': 'ignored',
+    }
+
+
+def test_to_dict_includes_subresources():
+    """
+    Attributes and nested subresources are dumped, other data is not
+    """
+    instance = SubResourcePeopleResource(**people_data())
+    assert instance.to_dict() == {
+        'slug': 'the-resource',
+        'another_thing': 'another',
+        'author': {'name': 'the author'},
+    }
+    people = [instance, SubResourcePeopleResource(author=None)]
+    assert to_dict(people)[1] == {'author': None}
+
+
+def test_to_json_dumps_typed_values():
+    """
+    Typed attributes are dumped as JSON types, for a whole list at once
+    """
+    products = build_resources(TypedProductResource, [
+        {'id': '1', 'price': '9.99', 'created': '2017-01-02T03:04:05Z'},
+    ])
+    data = json.loads(to_json(products).decode('utf-8'))
+    assert data == [{
+        'id': 1, 'price': '9.99', 'created': '2017-01-02T03:04:05+00:00'
+    }]
+
+
+def test_related_links_are_dumped_as_urls():
+    instance = HypermediaBlogsResource(
+        name='blog', author='http://dev/api/authors/1')
+    assert instance.to_dict() == {
+        'name': 'blog', 'author': 'http://dev/api/authors/1'}
+
+
+def test_expanded_related_resources_are_dumped_whole():
+    """
+    Related resources hydrated by expand() are serialized in place of
+    their URLs
+    """
+    author = HypermediaAuthorsResource(name='the author', title='Dr')
+    instance = HypermediaBlogsResource(
+        name='blog', author='http://dev/api/authors/1')
+    instance.author = author
+    assert json.loads(to_json(instance).decode('utf-8')) == {
+        'name': 'blog', 'author': {'name': 'the author', 'title': 'Dr'}}
+
+
+def test_unchanged_resources_pass_their_raw_data_through():
+    """
+    With keep_raw_data, the data a resource was built from is returned
+    until the resource or one of its subresources is changed
+    """
+    instance = RawPeopleResource(**people_data())
+    raw = instance.to_dict()
+    assert raw == instance._raw_data
+    assert raw['not_an_attribute'] == 'ignored'
+    # Changing the result leaves the resource alone
+    raw['author']['name'] = 'changed'
+    assert instance._raw_data['author'] == {'name': 'the author'}
+    assert json.loads(to_json(instance).decode('utf-8')) == \
+        instance._raw_data
+
+    instance.author.name = 'another author'
+    data = instance.to_dict()
+    assert data is not instance._raw_data
+    assert data['author'] == {'name': 'another author'}
+
+    instance = RawPeopleResource(**people_data())
+    instance.slug = 'changed'
+    assert instance.to_dict()['slug'] == 'changed'
+
+
+@pytest.mark.parametrize('resource_class', [
+    RawTypedProductResource,
+    RawLazyTypedProductResource,
+    RawInternedProductResource,
+])
+def test_raw_data_is_kept_before_conversion(resource_class):
+    """
+    Typed and interned resources pass the data they were built from
+    through unconverted, however they were built
+    """
+    raw = {'id': '1', 'price': '1.50', 'stock': 2, 'status': 'live',
+           'extra': 'x'}
+    single = resource_class(**dict(raw))
+    built = build_resources(resource_class, [dict(raw)])[0]
+    assert single.to_dict() == raw
+    assert built.to_dict() == raw
+    assert json.loads(to_json([single, built]).decode('utf-8')) == \
+        [raw, raw]
+
+    built.id = 2
+    assert built.to_dict()['id'] == 2
+    assert 'extra' not in built.to_dict()
+
+
+def test_to_msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    instance = SubResourcePeopleResource(**people_data())
+    assert msgpack.unpackb(to_msgpack(instance), raw=False) == \
+        instance.to_dict()
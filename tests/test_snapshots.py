@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_snapshots
+----------------------------------
+
+Tests for `beckett.snapshots` module.
+"""
+
+import datetime
+import decimal
+
+from beckett import snapshots
+from beckett.converters import build_resources
+
+import pytest
+
+from .fixtures import (
+    BlogResource,
+    HypermediaBlogsResource,
+    SubResourcePeopleResource,
+    TypedProductResource
+)
+
+
+def test_snapshots_round_trip_resources():
+    """
+    Attributes, missing attributes and typed values survive a round trip
+    """
+    products = build_resources(TypedProductResource, [
+        {'id': '1', 'price': '9.99', 'created': '2017-01-02T03:04:05Z'},
+        {'id': '2', 'price': '9.99', 'stock': 3},
+    ])
+    loaded = snapshots.loads(snapshots.dumps(products), TypedProductResource)
+    assert [x.__dict__ for x in loaded] == [x.__dict__ for x in products]
+    assert loaded[0].price == decimal.Decimal('9.99')
+    assert isinstance(loaded[0].created, datetime.datetime)
+    assert not hasattr(loaded[1], 'created')
+    assert str(loaded[1]) == '<Product | 2>'
+
+
+def test_enums_and_nested_values_keep_their_types():
+    """
+    Enum members are converted back by the attribute's type, and dates
+    in lists and dictionaries are restored
+    """
+    enum = pytest.importorskip('enum')
+
+    class Color(enum.Enum):
+        RED = 'red'
+
+    class ColoredProductResource(TypedProductResource):
+
+        class Meta(TypedProductResource.Meta):
+            attributes = TypedProductResource.Meta.attributes + (
+                'color', 'dates')
+            attribute_types = dict(
+                TypedProductResource.Meta.attribute_types, color=Color)
+
+    day = datetime.date(2017, 1, 2)
+    products = build_resources(ColoredProductResource, [
+        {'id': '1', 'color': 'red', 'dates': [day, {'first': day}]},
+    ])
+    loaded = snapshots.loads(
+        snapshots.dumps(products), ColoredProductResource)
+    assert loaded[0].color is Color.RED
+    assert loaded[0].dates == [day, {'first': day}]
+
+    products[0].dates = [Color.RED]
+    with pytest.raises(TypeError):
+        snapshots.dumps(products)
+
+
+def test_repeated_values_are_stored_once():
+    blogs = [
+        BlogResource(id=i, title='the same long title ' * 10)
+        for i in range(1000)
+    ]
+    data = snapshots.dumps(blogs)
+    assert data.count(b'the same long title') == 10
+    loaded = snapshots.loads(data, BlogResource)
+    assert loaded[0].title is loaded[999].title
+    assert loaded[999].id == 999
+
+
+def test_subresources_are_nested():
+    people = [
+        SubResourcePeopleResource(slug='one', author={'name': 'first'}),
+        SubResourcePeopleResource(slug='many', author=[
+            {'name': 'second'}, {'name': 'third'}]),
+        SubResourcePeopleResource(slug='none'),
+    ]
+    loaded = snapshots.loads(
+        snapshots.dumps(people), SubResourcePeopleResource)
+    assert loaded[0].author.name == 'first'
+    assert [x.name for x in loaded[1].author] == ['second', 'third']
+    assert loaded[2].author is None
+    assert loaded[0].to_dict() == people[0].to_dict()
+
+
+def test_snapshot_views_read_lazily_from_a_file(tmpdir):
+    path = str(tmpdir.join('blogs.snapshot'))
+    snapshots.dump(
+        [BlogResource(id=i, title='blog {}'.format(i)) for i in range(100)],
+        path)
+    with snapshots.SnapshotView(path, BlogResource) as view:
+        assert len(view) == 100
+        assert view[42].title == 'blog 42'
+        assert view[-1].id == 99
+        assert [x.id for x in view[3:6]] == [3, 4, 5]
+        assert len(view.load()) == 100
+        with pytest.raises(IndexError):
+            view[100]
+
+
+def test_snapshots_load_without_casting_memoryviews(tmpdir, monkeypatch):
+    """
+    Index arrays are copied where memoryviews can not be cast, as on Py2
+    """
+    monkeypatch.setattr(snapshots, '_CAST', False)
+    people = [
+        SubResourcePeopleResource(slug='one', author={'name': 'first'}),
+        SubResourcePeopleResource(slug='many', author=[
+            {'name': 'second'}, {'name': 'third'}]),
+    ]
+    path = str(tmpdir.join('people.snapshot'))
+    snapshots.dump(people, path)
+    with snapshots.SnapshotView(path, SubResourcePeopleResource) as view:
+        assert [x.to_dict() for x in view.load()] == \
+            [x.to_dict() for x in people]
+        assert view[1].author[1].name == 'third'
+
+
+def test_hypermedia_resources_can_not_be_loaded():
+    blogs = [HypermediaBlogsResource(name='blog')]
+    with pytest.raises(TypeError):
+        snapshots.loads(snapshots.dumps(blogs), HypermediaBlogsResource)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_sync
+----------------------------------
+
+Tests for `beckett.sync` module.
+"""
+
+import json
+
+from beckett.sync import ADDED, DELETED, UPDATED, SyncedCollection
+
+import pytest
+
+import responses
+
+from .fixtures import (
+    BlogResource, BlogTestClient, SyncedBlogResource, TokenSyncedBlogResource,
+    TypedSyncedBlogResource
+)
+
+
+def _serve(pages):
+    """
+    Serve each page in turn, recording the URLs requested.
+    """
+    urls = []
+    pages = iter(pages)
+
+    def callback(request):
+        urls.append(request.url)
+        return (200, {}, json.dumps(next(pages)))
+
+    responses.add_callback(
+        responses.GET, 'http://dev/api/blogs', callback=callback,
+        content_type='application/json')
+    return urls
+
+
+@responses.activate
+def test_sync_merges_deltas_and_reports_changes():
+    """
+    Only the changes since the cursor are fetched, and merged into
+    the collection as added, updated and deleted changes.
+    """
+    urls = _serve([
+        [{'id': 1, 'title': 'first', 'updated': '2016-06-13T10:00:00Z'},
+         {'id': 2, 'title': 'second', 'updated': '2016-06-13T11:00:00Z'}],
+        [{'id': 2, 'title': 'edited', 'updated': '2016-06-14T09:00:00Z'},
+         {'id': 1, 'deleted': True, 'updated': '2016-06-14T10:00:00Z'},
+         {'id': 3, 'title': 'third', 'updated': '2016-06-14T08:00:00Z'}],
+    ])
+    blogs = SyncedCollection(BlogTestClient(), SyncedBlogResource)
+    seen = []
+    blogs.subscribe(seen.append)
+    assert [c.kind for c in blogs.sync()] == [ADDED, ADDED]
+    assert blogs.cursor == '2016-06-13T11:00:00Z'
+    changes = blogs.sync()
+    assert urls == [
+        'http://dev/api/blogs',
+        'http://dev/api/blogs?updated_since=2016-06-13T11%3A00%3A00Z',
+    ]
+    assert [(c.kind, c.key) for c in changes] == [
+        (UPDATED, '2'), (DELETED, '1'), (ADDED, '3')]
+    assert changes[1].resource.title == 'first'
+    assert seen[2:] == changes
+    assert blogs.cursor == '2016-06-14T10:00:00Z'
+    assert len(blogs) == 2
+    assert 1 not in blogs
+    assert blogs[2].title == 'edited'
+    assert [x.title for x in blogs] == ['edited', 'third']
+
+
+@responses.activate
+def test_typed_sync_fields_keep_their_wire_value_as_the_cursor():
+    """
+    The cursor is the value received, not the converted attribute, even
+    when deleted and live items are mixed
+    """
+    urls = _serve([
+        [{'id': 1, 'title': 'first', 'updated': '2016-06-13T10:00:00Z'},
+         {'id': 2, 'deleted': True, 'updated': '2016-06-13T11:00:00Z'}],
+        [],
+    ])
+    blogs = SyncedCollection(BlogTestClient(), TypedSyncedBlogResource)
+    blogs.sync()
+    assert blogs.cursor == '2016-06-13T11:00:00Z'
+    assert blogs[1].updated.year == 2016
+    blogs.sync()
+    assert urls[1] == (
+        'http://dev/api/blogs?updated_since=2016-06-13T11%3A00%3A00Z')
+
+
+@responses.activate
+def test_sync_tokens_are_used_as_the_cursor():
+    """
+    APIs that hand out sync tokens are asked for the changes
+    since the last token.
+    """
+    urls = _serve([
+        {'objects': [{'id': 1, 'title': 'first'}], 'next_token': 'abc'},
+        {'objects': [], 'next_token': 'def'},
+    ])
+    blogs = SyncedCollection(BlogTestClient(), TokenSyncedBlogResource)
+    blogs.sync()
+    assert blogs.sync() == []
+    assert urls[1] == 'http://dev/api/blogs?token=abc'
+    assert blogs.cursor == 'def'
+    assert blogs['1'].title == 'first'
+
+
+def test_sync_needs_a_sync_param():
+    """
+    Resources without a sync_param can not be synced
+    """
+    with pytest.raises(ValueError):
+        SyncedCollection(BlogTestClient(), BlogResource)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_tenancy
+----------------------------------
+
+Tests for `beckett.tenancy` module.
+"""
+
+from beckett.tenancy import TenantClientFactory
+
+import pytest
+
+import responses
+
+from .fixtures import (
+    BlogTestClient,
+    CachedBlogTestClient,
+    HypermediaBooksTestClient
+)
+
+
+def _add_blog_response():
+    responses.add(responses.GET, 'http://dev/api/blogs/1',
+                  body='{"id": 1, "title": "blog title"}',
+                  status=200,
+                  content_type='application/json')
+
+
+@responses.activate
+def test_tenants_send_their_own_headers():
+    """
+    Each tenant handle adds its headers to the client's headers
+    """
+    _add_blog_response()
+    factory = TenantClientFactory(BlogTestClient)
+    acme = factory.tenant('acme', {'Authorization': 'Bearer acme'})
+    globex = factory.tenant('globex', {'Authorization': 'Bearer globex'})
+    assert acme.get_blog(uid=1)[0].title == 'blog title'
+    globex.get_blog(uid=1)
+    first, second = [call.request.headers for call in responses.calls]
+    assert first['Authorization'] == 'Bearer acme'
+    assert second['Authorization'] == 'Bearer globex'
+    assert first['X-CLIENT'] == 'test_blog_client'
+
+
+@responses.activate
+def test_related_resources_are_fetched_with_the_tenants_headers():
+    """
+    HypermediaResources built by a handle send its headers when they
+    fetch their related resources
+    """
+    responses.add(responses.GET, 'http://dev/api/books/1',
+                  body='''{"title": "Fiesta",
+                           "writers": ["http://dev/api/writers/1"]}''',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/writers/1',
+                  body='''{"name": "Ernest",
+                           "country": "http://dev/api/countries/us"}''',
+                  status=200,
+                  content_type='application/json')
+    responses.add(responses.GET, 'http://dev/api/countries/us',
+                  body='{"name": "United States"}',
+                  status=200,
+                  content_type='application/json')
+    factory = TenantClientFactory(HypermediaBooksTestClient)
+    acme = factory.tenant('acme', {'Authorization': 'Bearer acme'})
+    book = acme.get_books(uid=1)[0]
+    writer = book.get_writers()[0]
+    writer.get_countries()
+    book.expand(depth=2)
+    assert len(responses.calls) == 5
+    for call in responses.calls:
+        assert call.request.headers['Authorization'] == 'Bearer acme'
+
+
+def test_tenants_share_the_client():
+    """
+    Handles share the generated methods and the connection pool
+    """
+    factory = TenantClientFactory(BlogTestClient, max_connections=4)
+    acme = factory.tenant('acme', {})
+    globex = factory.tenant('globex', {})
+    assert factory.tenant('acme') is acme
+    assert type(acme) is type(globex)
+    assert isinstance(acme, BlogTestClient)
+    assert 'get_blog' not in acme.__dict__
+    assert acme.session is globex.session is factory.client.session
+    adapter = acme.session.get_adapter('http://dev/api')
+    assert adapter._pool_maxsize == 4
+    assert acme.get_executor() is globex.get_executor()
+    factory.close()
+
+
+@responses.activate
+def test_tenants_have_their_own_caches():
+    """
+    Cached responses are never shared between tenants
+    """
+    _add_blog_response()
+    factory = TenantClientFactory(CachedBlogTestClient)
+    acme = factory.tenant('acme', {'Authorization': 'Bearer acme'})
+    globex = factory.tenant('globex', {'Authorization': 'Bearer globex'})
+    acme.get_blog(uid=1)
+    acme.get_blog(uid=1)
+    globex.get_blog(uid=1)
+    assert len(responses.calls) == 2
+
+
+def test_least_recently_used_tenants_are_dropped():
+    """
+    The factory keeps at most max_tenants handles
+    """
+    factory = TenantClientFactory(BlogTestClient, max_tenants=2)
+    acme = factory.tenant('acme', {})
+    factory.tenant('globex', {})
+    assert factory.tenant('acme') is acme
+    factory.tenant('initech', {})
+    assert len(factory) == 2
+    assert factory.tenant('acme') is acme
+    factory.forget('acme')
+    assert factory.tenant('acme', {}) is not acme
+
+
+def test_unknown_tenants_need_headers():
+    """
+    A tenant without a handle is not created without its headers
+    """
+    factory = TenantClientFactory(BlogTestClient, max_tenants=1)
+    with pytest.raises(KeyError):
+        factory.tenant('acme')
+    factory.tenant('acme', {'Authorization': 'Bearer acme'})
+    factory.tenant('globex', {'Authorization': 'Bearer globex'})
+    with pytest.raises(KeyError):
+        factory.tenant('acme')
+    factory.forget('globex')
+    with pytest.raises(KeyError):
+        factory.tenant('globex')
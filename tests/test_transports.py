@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_transports
+----------------------------------
+
+Tests for `beckett.transports` module.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from beckett.exceptions import UnrecordedRequestError
+from beckett.transports import (
+    BaseTransport, RecordingTransport, ReplayTransport, RequestsTransport
+)
+
+import pytest
+
+from .fixtures import BlogResource, HypermediaAuthorsResource, make_client
+from .server import H2StubServer, StubServer
+
+
+class CountingTransport(BaseTransport):
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.sent = []
+
+    def send(self, prepared_request, timeout=None):
+        self.sent.append(prepared_request.url)
+        return self.inner.send(prepared_request, timeout=timeout)
+
+
+def test_clients_send_through_their_transport():
+    """
+    A transport declared on the client Meta sends every request
+    """
+    with StubServer(body={'id': 1, 'title': 'blog title'}) as server:
+        client = make_client(server.url, BlogResource)
+        assert isinstance(client.transport, RequestsTransport)
+        client.transport = CountingTransport(client.transport)
+        result = client.get_blog(uid=1)
+    assert result[0].title == 'blog title'
+    assert client.transport.sent == [server.url + '/blogs/1']
+
+
+class ClosingTransport(BaseTransport):
+
+    def __init__(self):
+        self.closed = False
+
+    def send(self, prepared_request, timeout=None):
+        raise NotImplementedError
+
+    def close(self):
+        self.closed = True
+
+
+def test_clients_only_close_transports_they_built():
+    """
+    A transport instance declared on the Meta may be shared, so closing
+    a client leaves it open, while transports built by the client close
+    """
+    shared = ClosingTransport()
+    make_client('http://dev/api', BlogResource, transport=shared).close()
+    assert not shared.closed
+
+    client = make_client(
+        'http://dev/api', BlogResource, transport=ClosingTransport)
+    client.close()
+    assert client.transport.closed
+
+
+def test_hypermedia_resources_share_a_transport_per_class():
+    """
+    A transport factory on a HypermediaResource Meta is only called once
+    for all the instances of the class
+    """
+    built = []
+
+    def factory():
+        built.append(ClosingTransport())
+        return built[-1]
+
+    class AuthorsResource(HypermediaAuthorsResource):
+
+        class Meta(HypermediaAuthorsResource.Meta):
+            transport = factory
+
+    first = AuthorsResource(name='Ernest')
+    second = AuthorsResource(name='Gertrude')
+    assert len(built) == 1
+    assert first.transport is second.transport is built[0]
+    assert HypermediaAuthorsResource(name='Ezra').transport is not built[0]
+
+
+def test_http2_transport_multiplexes_requests():
+    """
+    Concurrent requests over HTTP/2 share a single connection
+    """
+    pytest.importorskip('h2')
+    httpx = pytest.importorskip('httpx')
+    from beckett.transports import HTTP2Transport
+
+    transport = HTTP2Transport(max_connections=1, http1=False)
+    with H2StubServer(body={'id': 1, 'title': 'blog title'},
+                      delay=0.05) as server:
+        client = make_client(
+            server.url, BlogResource, transport=transport)
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(
+                lambda uid: client.get_blog(uid=uid), range(1, 21)))
+        client.close()
+    assert len(results) == 20
+    assert results[0][0].title == 'blog title'
+    assert server.requests == 20
+    assert server.connections == 1
+    assert isinstance(transport.client, httpx.Client)
+    assert client.transfer_stats.as_dict()['requests'] == 20
+
+
+def test_recorded_exchanges_replay_without_the_network(tmpdir):
+    """
+    Exchanges recorded against an API are served again by a
+    ReplayTransport, in the order they were recorded
+    """
+    path = str(tmpdir.join('blogs.jsonl'))
+    bodies = iter([{'id': 1, 'title': 'first'}, {'id': 1, 'title': 'second'}])
+    with StubServer(body=lambda path: next(bodies)) as server:
+        client = make_client(
+            server.url, BlogResource,
+            transport=lambda: RecordingTransport(path))
+        client.get_blog(uid=1)
+        client.get_blog(uid=1)
+        client.close()
+
+    replay = ReplayTransport(path)
+    assert len(replay) == 2
+    client = make_client(server.url, BlogResource, transport=replay)
+    titles = [client.get_blog(uid=1)[0].title for _ in range(3)]
+    assert titles == ['first', 'second', 'second']
+    with pytest.raises(UnrecordedRequestError):
+        client.get_blog(uid=2)
+
+
+def test_replay_adds_synthetic_latency(tmpdir):
+    """
+    A ReplayTransport can delay every response
+    """
+    path = str(tmpdir.join('blogs.jsonl'))
+    with StubServer(body={'id': 1, 'title': 'blog title'}) as server:
+        client = make_client(
+            server.url, BlogResource,
+            transport=lambda: RecordingTransport(path))
+        client.get_blog(uid=1)
+        client.close()
+
+    client = make_client(
+        server.url, BlogResource,
+        transport=ReplayTransport(path, latency=0.05))
+    started = time.time()
+    result = client.get_blog(uid=1)
+    assert time.time() - started >= 0.05
+    assert result[0].title == 'blog title'
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_urls
+----------------------------------
+
+Tests for `beckett.urls` module.
+"""
+
+from beckett.urls import add_query, encode_query, quote_value
+
+from .fixtures import PeopleResource
+
+
+def test_quote_value_only_encodes_when_needed():
+    assert quote_value(123) == '123'
+    assert quote_value('some-slug_1.0~') == 'some-slug_1.0~'
+    assert quote_value('a b/c') == 'a%20b%2Fc'
+    assert quote_value(u'caf\xe9') == 'caf%C3%A9'
+
+
+def test_encode_query():
+    """
+    None values are skipped and lists repeat their key
+    """
+    query = encode_query(
+        [('id', 123), ('country', None), ('tag', ['a&b', 'c'])])
+    assert query == 'id=123&tag=a%26b&tag=c'
+
+
+def test_add_query():
+    assert add_query('http://dev/api/blogs', {'page': 2}) == \
+        'http://dev/api/blogs?page=2'
+    assert add_query('http://dev/api/blogs?page=2', {'size': 10}) == \
+        'http://dev/api/blogs?page=2&size=10'
+    assert add_query('http://dev/api/blogs', {'page': None}) == \
+        'http://dev/api/blogs'
+
+
+def test_resource_urls_are_built_once_per_base_url():
+    """
+    get_resource_url caches the validated URL, and get_url
+    percent-encodes the uid
+    """
+    url = PeopleResource.get_resource_url(PeopleResource, 'http://dev/api')
+    assert url == 'http://dev/api/peoples'
+    assert PeopleResource.__dict__['_resource_urls'] == {
+        'http://dev/api': url}
+    assert PeopleResource.get_url(url=url, uid='a b') == \
+        'http://dev/api/peoples/a%20b'
+    assert PeopleResource.get_url(url=url, uid=None) == url